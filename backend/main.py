@@ -1,6 +1,6 @@
 from fastapi import FastAPI, Request, Body
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse, Response
 from fastapi.exceptions import RequestValidationError
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
@@ -11,6 +11,16 @@ import threading
 import time
 import json
 import os
+import pathlib
+import asyncio
+import queue
+import sqlite3
+import zlib
+import multiprocessing
+from collections import OrderedDict, deque, namedtuple
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 
 # Firebase Admin SDK
 try:
@@ -48,43 +58,25 @@ else:
     print("Warning: pyzbar not available. QR code detection will use OpenCV fallback.")
     print("To enable ZBar on Windows, install ZBar DLL from: https://github.com/mchehab/zbar")
 
-# EasyOCR for car plate detection (lazy import)
-EASYOCR_AVAILABLE = False
-easyocr_reader = None
-easyocr_init_error = None
+# EasyOCR for car plate detection runs in worker processes (see plate_ocr.py)
+import plate_ocr
 
-def _try_load_easyocr():
-    """Try to load EasyOCR for car plate recognition."""
-    global easyocr_init_error
-    try:
-        print("[EasyOCR] Attempting to import easyocr...")
-        import easyocr
-        print("[EasyOCR] Import successful, initializing reader (this may take a minute on first run)...")
-        # Initialize EasyOCR reader (English only for license plates)
-        # This will download models on first run, which can take time
-        reader = easyocr.Reader(['en'], gpu=False, verbose=False)
-        print("[EasyOCR] Reader initialized successfully!")
-        easyocr_init_error = None
-        return reader, True
-    except ImportError as e:
-        error_msg = f"EasyOCR not installed: {str(e)}"
-        print(f"[EasyOCR] ERROR: {error_msg}")
-        print("[EasyOCR] Install with: pip install easyocr")
-        easyocr_init_error = error_msg
-        return None, False
-    except Exception as e:
-        error_msg = f"EasyOCR initialization failed: {type(e).__name__}: {str(e)}"
-        print(f"[EasyOCR] ERROR: {error_msg}")
-        traceback.print_exc()
-        easyocr_init_error = error_msg
-        return None, False
+@asynccontextmanager
+async def lifespan(app):
+    # Background services start with the server rather than at import, so
+    # importing the app (tests, tools) spawns no threads or OCR processes
+    # and Firebase fakes can be injected first
+    occupancy_recorder.start()
+    for thread in (occupancy_monitor_thread, area_config_watch_thread, visitor_qr_detect_thread):
+        if thread.ident is None:
+            thread.start()
+    # Load the model at startup instead of on the first guard's scan
+    plate_ocr_pool.start_warm_up()
+    visitor_index.start()
+    yield
 
-# Try to load EasyOCR (lazy - will initialize when first needed)
-# Don't initialize at startup to avoid blocking server startup
-easyocr_reader, EASYOCR_AVAILABLE = None, False
-print("[EasyOCR] EasyOCR will be initialized on first use (lazy loading)")
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Mount static files for assets
 assets_path = os.path.join(os.path.dirname(__file__), 'assets')
@@ -131,61 +123,153 @@ async def global_exception_handler(request: Request, exc: Exception):
 # === Load parking area configurations ===
 AREA_CONFIGS = {}
 DEFAULT_AREA = None
+AREA_CONFIG_VERSION = 0  # Bumped on every load so compiled geometry is rebuilt
+AREA_ALIAS_INDEX = {}  # Normalized name / alias -> key in AREA_CONFIGS, rebuilt on load
+
+# Substring matches are only computed once per distinct requested name
+MAX_AREA_FUZZY_ENTRIES = 256
+area_fuzzy_cache = {}  # (AREA_CONFIG_VERSION, normalized name) -> key or None
+unknown_area_warnings = set()  # Names already reported, so bad input logs once
+MAX_UNKNOWN_AREA_WARNINGS = 256
+
+
+def normalize_area_name(area_name: str):
+    """Case- and whitespace-insensitive form of an area name."""
+    return ' '.join(str(area_name).split()).lower()
+
+
+def build_area_alias_index(configs):
+    """Map exact names, normalized names, declared aliases and names without the
+    zone suffix (e.g. "DTAR" for "DTAR (WC)") to their area key."""
+    index = {}
+    ambiguous = set()
+    # Derived names are added first so exact names and declared aliases win
+    for key in configs:
+        short = normalize_area_name(key.split('(')[0])
+        if short and short != normalize_area_name(key):
+            if short in index and index[short] != key:
+                ambiguous.add(short)
+            index[short] = key
+    for short in ambiguous:
+        del index[short]
+    for key, config in configs.items():
+        for alias in config.get('aliases', []):
+            index[normalize_area_name(alias)] = key
+    for key in configs:
+        index[normalize_area_name(key)] = key
+        index[key] = key
+    return index
+
+
+AREA_CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'areas.json')
+
+
+def demo_area_configs():
+    """Fallback configuration used when areas.json is missing or invalid."""
+    return {
+        "Demo": {
+            'slots': [
+                [(42,51), (202,51), (202,396), (42,396)],
+                [(215,51), (366,51), (366,396), (215,396)],
+                [(390,51), (534,51), (534,396), (390,396)],
+                [(553,51), (704,51), (704,396), (553,396)],
+                [(726,51), (872,51), (872,396), (726,396)],
+                [(894,51), (1043,51), (1043,396), (894,396)],
+                [(1063,51), (1213,51), (1213,396), (1063,396)],
+                [(42,455), (202,455), (202,784), (42,784)],
+                [(215,455), (366,455), (366,784), (215,784)],
+                [(390,455), (534,455), (534,784), (390,784)],
+                [(553,455), (704,455), (704,784), (553,784)],
+                [(726,455), (872,455), (872,784), (726,784)],
+                [(894,455), (1043,455), (1043,784), (894,784)],
+                [(1063,455), (1213,455), (1213,784), (1063,784)]
+            ],
+            'camera_index': 0,
+            'frame_width': 1920,
+            'frame_height': 1080,
+            'aliases': []
+        }
+    }
+
+
+def parse_area_configs(data):
+    """Validate areas.json content and return {area name: config}.
+
+    Raises ValueError describing the first problem found.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('areas'), list):
+        raise ValueError("areas.json must contain an 'areas' list")
+    configs = {}
+    for position, area in enumerate(data['areas']):
+        area_name = area.get('name') if isinstance(area, dict) else None
+        if not isinstance(area_name, str) or not area_name.strip():
+            raise ValueError(f"Area #{position + 1} has no name")
+        if area_name in configs:
+            raise ValueError(f"Duplicate area name '{area_name}'")
+        # Convert slot polygons from JSON format to list of tuples
+        slots = []
+        for slot in area.get('slots', []):
+            polygon = slot.get('polygon', []) if isinstance(slot, dict) else []
+            if len(polygon) < 3 or any(len(pt) != 2 for pt in polygon):
+                raise ValueError(f"Area '{area_name}' slot {len(slots) + 1} needs a polygon of at least 3 [x, y] points")
+            # Convert [[x,y], [x,y], ...] to [(x,y), (x,y), ...]
+            slot_coords = [(int(pt[0]), int(pt[1])) for pt in polygon]
+            slots.append(slot_coords)
+        frame_width = int(area.get('frame_width', 1920))
+        frame_height = int(area.get('frame_height', 1080))
+        if frame_width <= 0 or frame_height <= 0:
+            raise ValueError(f"Area '{area_name}' has an invalid frame size")
+        aliases = area.get('aliases', [])
+        if not isinstance(aliases, list) or not all(isinstance(alias, str) for alias in aliases):
+            raise ValueError(f"Area '{area_name}' aliases must be a list of strings")
+        configs[area_name] = {
+            'slots': slots,
+            'camera_index': int(area.get('camera_index', 0)),
+            'frame_width': frame_width,
+            'frame_height': frame_height,
+            'aliases': list(aliases)
+        }
+    if not configs:
+        raise ValueError("areas.json does not define any areas")
+    return configs
+
+
+def read_area_config_file(config_path=None):
+    """Read and validate areas.json."""
+    with open(config_path or AREA_CONFIG_PATH, 'r') as f:
+        return parse_area_configs(json.load(f))
+
+
+def apply_area_configs(configs):
+    """Swap in a new set of area configurations.
+
+    Each global is rebound to a fresh object rather than mutated, so readers
+    that already picked up the old dict keep a consistent view. The version
+    is bumped last: anything keyed on the new version sees the new configs.
+    """
+    global AREA_CONFIGS, DEFAULT_AREA, AREA_CONFIG_VERSION, AREA_ALIAS_INDEX
+    AREA_CONFIGS = configs
+    AREA_ALIAS_INDEX = build_area_alias_index(configs)
+    DEFAULT_AREA = next(iter(configs), None)
+    area_fuzzy_cache.clear()
+    unknown_area_warnings.clear()
+    AREA_CONFIG_VERSION += 1
+
 
 def load_area_configs():
     """Load parking area configurations from areas.json."""
-    global AREA_CONFIGS, DEFAULT_AREA
+    configs = None
     try:
-        config_path = os.path.join(os.path.dirname(__file__), 'areas.json')
-        if os.path.exists(config_path):
-            with open(config_path, 'r') as f:
-                data = json.load(f)
-                for area in data.get('areas', []):
-                    area_name = area['name']
-                    # Convert slot polygons from JSON format to list of tuples
-                    slots = []
-                    for slot in area.get('slots', []):
-                        polygon = slot.get('polygon', [])
-                        # Convert [[x,y], [x,y], ...] to [(x,y), (x,y), ...]
-                        slot_coords = [(int(pt[0]), int(pt[1])) for pt in polygon]
-                        slots.append(slot_coords)
-                    AREA_CONFIGS[area_name] = {
-                        'slots': slots,
-                        'camera_index': area.get('camera_index', 0),
-                        'frame_width': area.get('frame_width', 1920),
-                        'frame_height': area.get('frame_height', 1080)
-                    }
-                    if DEFAULT_AREA is None:
-                        DEFAULT_AREA = area_name
-            print(f"Loaded {len(AREA_CONFIGS)} parking area configurations: {list(AREA_CONFIGS.keys())}")
+        if os.path.exists(AREA_CONFIG_PATH):
+            configs = read_area_config_file()
+            print(f"Loaded {len(configs)} parking area configurations: {list(configs.keys())}")
         else:
-            print(f"Warning: areas.json not found at {config_path}. Using default configuration.")
-            # Fallback to default configuration
-            DEFAULT_AREA = "Demo"
-            AREA_CONFIGS["Demo"] = {
-                'slots': [
-                    [(42,51), (202,51), (202,396), (42,396)],
-                    [(215,51), (366,51), (366,396), (215,396)],
-                    [(390,51), (534,51), (534,396), (390,396)],
-                    [(553,51), (704,51), (704,396), (553,396)],
-                    [(726,51), (872,51), (872,396), (726,396)],
-                    [(894,51), (1043,51), (1043,396), (894,396)],
-                    [(1063,51), (1213,51), (1213,396), (1063,396)],
-                    [(42,455), (202,455), (202,784), (42,784)],
-                    [(215,455), (366,455), (366,784), (215,784)],
-                    [(390,455), (534,455), (534,784), (390,784)],
-                    [(553,455), (704,455), (704,784), (553,784)],
-                    [(726,455), (872,455), (872,784), (726,784)],
-                    [(894,455), (1043,455), (1043,784), (894,784)],
-                    [(1063,455), (1213,455), (1213,784), (1063,784)]
-                ],
-                'camera_index': 0,
-                'frame_width': 1920,
-                'frame_height': 1080
-            }
+            print(f"Warning: areas.json not found at {AREA_CONFIG_PATH}. Using default configuration.")
     except Exception as e:
         print(f"Error loading area configurations: {e}")
         traceback.print_exc()
+    # Fallback to default configuration
+    apply_area_configs(configs or demo_area_configs())
 
 # Load configurations on startup
 load_area_configs()
@@ -208,31 +292,73 @@ if FIREBASE_AVAILABLE:
         print(f"Error initializing Firebase: {e}")
         FIREBASE_AVAILABLE = False
 
-def get_parking_spaces_for_area(area_name: str):
-    """Get parking spaces configuration for a specific area."""
-    # Try exact match first
-    if area_name in AREA_CONFIGS:
-        return AREA_CONFIGS[area_name]['slots']
-    
-    # Try case-insensitive match
-    area_name_lower = area_name.lower()
-    for key in AREA_CONFIGS.keys():
-        if key.lower() == area_name_lower:
-            return AREA_CONFIGS[key]['slots']
-    
-    # Try partial match (e.g., "DTAR (WC)" matches "DTAR")
-    for key in AREA_CONFIGS.keys():
-        if area_name_lower in key.lower() or key.lower() in area_name_lower:
-            return AREA_CONFIGS[key]['slots']
-    
+def lookup_area(area_name: str):
+    """Return the AREA_CONFIGS key for a requested name, or None if it is unknown."""
+    if not area_name:
+        return None
+    # Exact names and aliases are a single dict lookup
+    key = AREA_ALIAS_INDEX.get(area_name)
+    if key is not None:
+        return key
+    normalized = normalize_area_name(area_name)
+    key = AREA_ALIAS_INDEX.get(normalized)
+    if key is not None:
+        return key
+
+    # Try partial match (e.g., "DTAR (WC)" matches "DTAR"), cached per name
+    cache_key = (AREA_CONFIG_VERSION, normalized)
+    if cache_key in area_fuzzy_cache:
+        return area_fuzzy_cache[cache_key]
+    key = None
+    # Very short fragments would match almost anything
+    candidates = AREA_CONFIGS.keys() if len(normalized) >= 3 else ()
+    for candidate in candidates:
+        candidate_lower = normalize_area_name(candidate)
+        if normalized in candidate_lower or candidate_lower in normalized:
+            key = candidate
+            break
+    if len(area_fuzzy_cache) >= MAX_AREA_FUZZY_ENTRIES:
+        area_fuzzy_cache.clear()
+    area_fuzzy_cache[cache_key] = key
+    return key
+
+
+def unknown_area_error(area_name: str):
+    """Error message for an area name that matches no configuration."""
+    return f"Unknown parking area '{area_name}'. Known areas: {', '.join(AREA_CONFIGS.keys())}"
+
+
+def resolve_area_name(area_name: str):
+    """Resolve a requested area name to its key in AREA_CONFIGS, falling back to the default area."""
+    key = lookup_area(area_name)
+    if key is not None:
+        return key
+
+    # Only report each bad name once instead of on every request
+    report = area_name not in unknown_area_warnings
+    if report:
+        if len(unknown_area_warnings) >= MAX_UNKNOWN_AREA_WARNINGS:
+            unknown_area_warnings.clear()
+        unknown_area_warnings.add(area_name)
+
     # Default to first available area or Demo
     if DEFAULT_AREA and DEFAULT_AREA in AREA_CONFIGS:
-        print(f"Warning: Area '{area_name}' not found. Using default area '{DEFAULT_AREA}'.")
-        return AREA_CONFIGS[DEFAULT_AREA]['slots']
+        if report:
+            print(f"Warning: Area '{area_name}' not found. Using default area '{DEFAULT_AREA}'.")
+        return DEFAULT_AREA
     
-    # Last resort: return empty list
-    print(f"Error: No configuration found for area '{area_name}' and no default available.")
-    return []
+    # Last resort: no area
+    if report:
+        print(f"Error: No configuration found for area '{area_name}' and no default available.")
+    return None
+
+def get_parking_spaces_for_area(area_name: str):
+    """Get parking spaces configuration for a specific area."""
+    key = resolve_area_name(area_name)
+    config = AREA_CONFIGS.get(key) if key is not None else None
+    if config is None:
+        return []
+    return config['slots']
 
 # === Base image size (same resolution you used when defining coordinates) ===
 BASE_WIDTH = 1245
@@ -249,33 +375,180 @@ PARKING_SPACES = [
     [(1092,487), (1187,487), (1187,707), (1092,707)]
 ]
 
+# === Background camera capture ===
+CAPTURE_BUFFER_SIZE = 8  # Frames kept per camera (newest last); enough for a plate burst
+STALE_FRAME_SECONDS = 2.0  # Frames older than this count as a failed read
+
+
+class CameraCapture:
+    """Background reader that keeps the newest frames of one camera device.
+
+    A single thread per physical device drains the driver continuously into a
+    small ring buffer of (sequence, timestamp, frame) entries, so consumers
+    never wait on camera I/O or see a stale driver buffer. isOpened() and
+    read() mirror cv2.VideoCapture so existing call sites keep working;
+    frames are shared between consumers and must not be modified in place.
+    """
+
+    def __init__(self, device_index, capture, buffer_size=CAPTURE_BUFFER_SIZE):
+        self.device_index = device_index
+        self.capture = capture
+        self.frames = deque(maxlen=buffer_size)
+        self.frame_count = 0
+        self.read_failures = 0
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(
+            target=self._run, name=f"camera-capture-{self.device_index}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+        try:
+            self.capture.release()
+        except Exception as e:
+            print(f"Error releasing camera {self.device_index}: {e}")
+
+    def _run(self):
+        while self.running:
+            try:
+                success, frame = self.capture.read()
+            except Exception as e:
+                print(f"Error reading from camera {self.device_index}: {e}")
+                success, frame = False, None
+            if not success or frame is None:
+                self.read_failures += 1
+                time.sleep(0.05)
+                continue
+            now = time.time()
+            with self.condition:
+                self.frame_count += 1
+                self.frames.append((self.frame_count, now, frame))
+                self.condition.notify_all()
+
+    def isOpened(self):
+        return self.running and self.capture is not None and self.capture.isOpened()
+
+    def latest(self):
+        """Return (sequence, timestamp, frame) of the newest frame or None."""
+        with self.condition:
+            return self.frames[-1] if self.frames else None
+
+    def read(self):
+        """Return (success, frame) for the newest frame without touching the device."""
+        entry = self.latest()
+        if entry is None or time.time() - entry[1] > STALE_FRAME_SECONDS:
+            return False, None
+        return True, entry[2]
+
+    def burst(self, count, timeout=1.0):
+        """Return up to count recent, non-stale frames (oldest first).
+
+        Uses the ring buffer first and waits up to timeout for newer frames
+        when it holds fewer than count.
+        """
+        deadline = time.time() + timeout
+        with self.condition:
+            while True:
+                now = time.time()
+                fresh = [entry for entry in self.frames if now - entry[1] <= STALE_FRAME_SECONDS]
+                remaining = deadline - now
+                if len(fresh) >= count or remaining <= 0 or not self.running:
+                    return [entry[2] for entry in fresh[-count:]]
+                self.condition.wait(remaining)
+
+    def wait_for_frame(self, after_sequence, timeout=1.0):
+        """Block until a frame newer than after_sequence arrives, then return it."""
+        with self.condition:
+            if not self.frames or self.frames[-1][0] <= after_sequence:
+                self.condition.wait(timeout)
+            if self.frames and self.frames[-1][0] > after_sequence:
+                return self.frames[-1]
+            return None
+
+    def status(self):
+        entry = self.latest()
+        return {
+            "camera_index": self.device_index,
+            "connected": self.isOpened(),
+            "frames_captured": self.frame_count,
+            "read_failures": self.read_failures,
+            "last_frame_age": round(time.time() - entry[1], 3) if entry else None
+        }
+
+
+# One capture thread per physical device, shared by parking, QR and plate features
+camera_captures = {}
+camera_captures_lock = threading.Lock()
+
+
+def open_camera_device(idx, width=1280, height=720):
+    """Open a camera device (DirectShow first for Windows webcams) and test a read."""
+    try:
+        device = cv2.VideoCapture(idx, cv2.CAP_DSHOW)
+        if device.isOpened():
+            # Test read to ensure it's working
+            ret, _ = device.read()
+            if ret:
+                device.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+                device.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+                return device
+        device.release()
+    except Exception as e:
+        print(f"Error testing camera {idx}: {e}")
+    return None
+
+
+def get_camera_capture(idx, open_device=True, width=1280, height=720):
+    """Return the running capture for a device, opening it on first use.
+
+    The requested resolution only applies when this call opens the device.
+    """
+    with camera_captures_lock:
+        capture = camera_captures.get(idx)
+        if capture is not None and capture.isOpened():
+            return capture
+        if not open_device:
+            return None
+        device = open_camera_device(idx, width, height)
+        if device is None:
+            return None
+        capture = CameraCapture(idx, device)
+        capture.start()
+        camera_captures[idx] = capture
+        return capture
+
+
 # === Initialize camera (iVCam on Windows) ===
-# Try DirectShow backend first for Windows webcams
 def init_camera():
     # iVCam usually appears as camera index 0 or 1
     for idx in [0, 1]:
-        cap = cv2.VideoCapture(idx, cv2.CAP_DSHOW)
-        if cap.isOpened():
-            # Test read to ensure it's working
-            ret, _ = cap.read()
-            if ret:
-                cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-                cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-                return cap, idx
-            cap.release()
+        capture = get_camera_capture(idx)
+        if capture is not None:
+            return capture, idx
     # Fallback to default backend
-    cap = cv2.VideoCapture(0)
-    if cap.isOpened():
-        return cap, 0
+    device = cv2.VideoCapture(0)
+    if device.isOpened():
+        capture = CameraCapture(0, device)
+        capture.start()
+        with camera_captures_lock:
+            camera_captures[0] = capture
+        return capture, 0
     return None, None
 
 cap, camera_index = init_camera()
-camera_lock = threading.Lock()  # Lock for thread-safe camera access
 
 # Global variables to store frozen frame and results (when confirm is clicked)
 frozen_frame = None  # Processed frame with overlays (for display)
 frozen_raw_frame = None  # Raw frame without overlays (for analysis)
-frozen_analysis = None  # Store (occupied_count, empty_count, statuses, assigned_spot_no)
 frozen_frame_lock = threading.Lock()
 
 if cap is None:
@@ -285,22 +558,128 @@ else:
 
 
 def read_frame_safe():
-    """Thread-safe frame reading."""
+    """Return the newest captured frame without waiting on the camera."""
     try:
-        with camera_lock:
-            if cap is None or not cap.isOpened():
-                return False, None
-            try:
-                success, frame = cap.read()
-                return success, frame
-            except Exception as e:
-                print(f"Error reading from camera: {e}")
-                return False, None
+        if cap is None or not cap.isOpened():
+            return False, None
+        return cap.read()
     except Exception as e:
         print(f"Error in read_frame_safe: {e}")
         return False, None
 
 
+# === Multi-camera pool ===
+# Each area in areas.json names the camera that watches it. Every distinct
+# device is opened once and shared by all areas that reference it. An area
+# whose device is not open has no camera: its polygons only fit that view, so
+# another camera's frame never stands in for it. The monitor retries missing
+# devices every AREA_CAMERA_RETRY_INTERVAL seconds.
+AREA_CAMERA_RETRY_INTERVAL = 10.0
+area_camera_indexes = {}  # area name -> camera index
+analysis_executor = ThreadPoolExecutor(
+    max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="area-analysis")
+
+
+def init_area_cameras():
+    """Open every camera referenced in areas.json and map areas to devices."""
+    global area_camera_indexes
+    mapping = {}
+    opened = {}
+    for area_name, config in list(AREA_CONFIGS.items()):
+        idx = config.get('camera_index', 0)
+        mapping[area_name] = idx
+        if idx not in opened:
+            capture = get_camera_capture(idx, width=config.get('frame_width', 1280),
+                                         height=config.get('frame_height', 720))
+            opened[idx] = capture is not None
+            if capture is None:
+                print(f"Warning: Camera {idx} for area '{area_name}' is not available")
+    area_camera_indexes = mapping
+    print(f"Area cameras: {mapping}")
+
+
+def reopen_area_cameras():
+    """Try again to open area cameras whose device is not running."""
+    for area_name, idx in list(area_camera_indexes.items()):
+        if get_camera_capture(idx, open_device=False) is not None:
+            continue
+        config = AREA_CONFIGS.get(area_name, {})
+        capture = get_camera_capture(idx, width=config.get('frame_width', 1280),
+                                     height=config.get('frame_height', 720))
+        if capture is not None:
+            print(f"Camera {idx} for area '{area_name}' reconnected")
+
+
+def get_area_camera(area_name: str = None):
+    """Return the capture watching an area, or the main camera without an area.
+
+    Returns None when the area's own camera is not open.
+    """
+    if not area_name:
+        return cap
+    key = resolve_area_name(area_name)
+    idx = area_camera_indexes.get(key)
+    if idx is None and key in AREA_CONFIGS:
+        idx = AREA_CONFIGS[key].get('camera_index', 0)
+    if idx is None:
+        return None
+    return get_camera_capture(idx, open_device=False)
+
+
+ANALYSIS_FRAME_SIZE = (960, 540)  # Processing size (width, height) for area analysis
+
+
+def prepare_analysis_frame(frame):
+    """Crop the iVCam logo and resize a raw frame to the processing size."""
+    if frame is None or frame.size == 0 or len(frame.shape) < 2:
+        return None
+    # Crop iVCam logo if needed
+    if frame.shape[0] > 100:
+        frame = frame[60:-40, :]
+    if frame.size == 0:
+        return None
+    # Resize to match processing size
+    return cv2.resize(frame, ANALYSIS_FRAME_SIZE)
+
+
+def read_area_frame(area_name: str = None):
+    """Return (success, frame) from the area's camera, ready for analysis."""
+    camera = get_area_camera(area_name)
+    if camera is None or not camera.isOpened():
+        return False, None
+    success, frame = camera.read()
+    if not success or frame is None:
+        return False, None
+    frame = prepare_analysis_frame(frame)
+    return frame is not None, frame
+
+
+def analyze_all_areas(area_names=None):
+    """Analyze several areas concurrently, reading each camera once.
+
+    Returns {area name: (occupied_count, empty_count, statuses)}, with None
+    for areas whose camera has no frame.
+    """
+    names = list(area_names) if area_names else list(AREA_CONFIGS)
+    frames = {}  # camera index -> prepared frame, shared by areas on the same device
+    futures = {}
+    for name in names:
+        camera = get_area_camera(name)
+        if camera is None or not camera.isOpened():
+            futures[name] = None
+            continue
+        if camera.device_index not in frames:
+            success, frame = camera.read()
+            frames[camera.device_index] = prepare_analysis_frame(frame) if success else None
+        frame = frames[camera.device_index]
+        futures[name] = (analysis_executor.submit(analyze_parking_incremental, frame, name)
+                         if frame is not None else None)
+    return {name: (future.result() if future is not None else None) for name, future in futures.items()}
+
+
+init_area_cameras()
+
+
 def scale_points(points, frame_w, frame_h):
     """Scale polygon coordinates based on actual camera size."""
     scale_x = frame_w / BASE_WIDTH
@@ -308,61 +687,210 @@ def scale_points(points, frame_w, frame_h):
     return [(int(x * scale_x), int(y * scale_y)) for x, y in points]
 
 
-def analyze_parking(frame, area_name: str = None):
-    """Analyze parking spots and return counts without drawing."""
-    try:
-        if frame is None or frame.size == 0:
-            raise ValueError("Invalid frame")
-        
-        # Validate frame dimensions
-        if len(frame.shape) < 2:
-            raise ValueError("Frame has invalid dimensions")
-        
-        # Convert to grayscale, handling different input formats
-        if len(frame.shape) == 3:
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        elif len(frame.shape) == 2:
-            gray = frame.copy()
-        else:
-            raise ValueError("Unsupported frame format")
-            
-        frame_h, frame_w = gray.shape
-        
-        if frame_h <= 0 or frame_w <= 0:
-            raise ValueError("Invalid frame dimensions")
+# === Compiled slot geometry ===
+# Scaled polygons, bounding boxes and ROI masks only depend on the slot layout
+# and the frame size, so they are built once per (area, width, height) and
+# reused until areas.json is reloaded or the resolution changes.
+MAX_SLOT_GEOMETRY_ENTRIES = 64
+GRAY_LEVELS = np.arange(256, dtype=np.int64)
+GRAY_LEVELS_SQUARED = GRAY_LEVELS * GRAY_LEVELS
+slot_geometry_cache = {}
+slot_geometry_lock = threading.Lock()
+
+
+def compile_slot_geometry(parking_spaces, frame_w, frame_h):
+    """Build per-slot ROIs and a shared slot label map for a frame size."""
+    slots = []
+    for space in parking_spaces:
+        pts = np.array(scale_points(space, frame_w, frame_h), np.int32)
+        x, y, w, h = cv2.boundingRect(pts)
+        roi_mask = None
+        # Boxes starting off-frame are treated as empty, same as before
+        if w > 0 and h > 0 and x >= 0 and y >= 0:
+            # Clip to the frame so the ROI matches slicing the full image
+            w = min(w, frame_w - x)
+            h = min(h, frame_h - y)
+            if w > 0 and h > 0:
+                mask = np.zeros((h, w), np.uint8)
+                cv2.fillPoly(mask, [pts - np.array([x, y], np.int32)], 255)
+                roi_mask = mask.astype(bool)
+        slots.append({
+            'points': pts,
+            'bbox': (x, y, w, h),
+            'mask': roi_mask
+        })
+
+    # Rasterize every slot into one label image (0 = no slot, i + 1 = slot i)
+    # covering only the union of the slot boxes
+    boxes = [slot['bbox'] for slot in slots if slot['mask'] is not None]
+    labels = None
+    region = (0, 0, 0, 0)
+    overlapping = False
+    if boxes:
+        x0 = min(bx for bx, _, _, _ in boxes)
+        y0 = min(by for _, by, _, _ in boxes)
+        x1 = max(bx + bw for bx, _, bw, _ in boxes)
+        y1 = max(by + bh for _, by, _, bh in boxes)
+        region = (x0, y0, x1, y1)
+        labels = np.zeros((y1 - y0, x1 - x0), np.intp)
+        for idx, slot in enumerate(slots):
+            if slot['mask'] is None:
+                continue
+            x, y, w, h = slot['bbox']
+            sub = labels[y - y0:y - y0 + h, x - x0:x - x0 + w]
+            if np.any(sub[slot['mask']]):
+                overlapping = True
+            sub[slot['mask']] = idx + 1
+        # Pre-shift labels so label * 256 + gray indexes a per-slot histogram
+        labels = labels.ravel() * 256
+
+    return {
+        'slots': slots,
+        'labels': labels,
+        'region': region,
+        # A pixel can only carry one label, so overlapping slots use the per-slot path
+        'overlapping': overlapping
+    }
+
+
+def get_slot_geometry(area_name, frame_w, frame_h):
+    """Return compiled slot geometry for an area at the given frame size."""
+    key = (AREA_CONFIG_VERSION, area_name, frame_w, frame_h)
+    geometry = slot_geometry_cache.get(key)
+    if geometry is not None:
+        return geometry
+
+    with slot_geometry_lock:
+        geometry = slot_geometry_cache.get(key)
+        if geometry is not None:
+            return geometry
 
-        # Get parking spaces for the specified area
         parking_spaces = get_parking_spaces_for_area(area_name) if area_name else PARKING_SPACES
         if not parking_spaces:
             print(f"Warning: No parking spaces found for area '{area_name}'. Using default.")
             parking_spaces = PARKING_SPACES
 
-        total_spots = len(parking_spaces)
+        geometry = compile_slot_geometry(parking_spaces, frame_w, frame_h)
+        # Drop entries for old config versions / resolutions instead of growing forever
+        if len(slot_geometry_cache) >= MAX_SLOT_GEOMETRY_ENTRIES:
+            slot_geometry_cache.clear()
+        slot_geometry_cache[key] = geometry
+        return geometry
+
+
+def is_slot_occupied(gray, slot):
+    """Check a single compiled slot using only the pixels inside its box."""
+    roi_mask = slot['mask']
+    if roi_mask is None:
+        return False
+    x, y, w, h = slot['bbox']
+    pixels = gray[y:y+h, x:x+w][roi_mask]
+    # Detect texture/variance
+    nonzero = pixels[pixels != 0]
+    if len(nonzero) == 0:
+        return False
+    return bool(np.var(nonzero) > 300)
+
+
+def compute_slot_statuses(gray, geometry):
+    """Return per-slot occupancy for a grayscale frame in one vectorized pass.
+
+    A single np.bincount over label * 256 + gray builds a gray-level
+    histogram for every slot at once. Pixel count, sum and sum of squares of
+    the non-zero values come from the histograms, and the same
+    variance > 300 rule is applied using exact integer math.
+    """
+    slots = geometry['slots']
+    if geometry['labels'] is None:
+        return [False] * len(slots)
+    if geometry['overlapping']:
+        return [is_slot_occupied(gray, slot) for slot in slots]
+
+    x0, y0, x1, y1 = geometry['region']
+    values = gray[y0:y1, x0:x1].ravel()
+    bins = len(slots) + 1
+
+    hist = np.bincount(geometry['labels'] + values, minlength=bins * 256).reshape(bins, 256)
+    # Zero pixels are ignored, same as the masked crop in the reference
+    hist[:, 0] = 0
+    counts = hist.sum(axis=1)
+    sums = hist @ GRAY_LEVELS
+    sq_sums = hist @ GRAY_LEVELS_SQUARED
+
+    # var = sq_sums / n - (sums / n) ** 2, compared as n * sq_sums - sums ** 2 > 300 * n ** 2
+    occupied = (counts > 0) & (counts * sq_sums - sums * sums > 300 * counts * counts)
+    return [bool(o) for o in occupied[1:]]
+
+
+def _prepare_gray(frame):
+    """Validate a frame and return its grayscale version."""
+    if frame is None or frame.size == 0:
+        raise ValueError("Invalid frame")
+    
+    # Validate frame dimensions
+    if len(frame.shape) < 2:
+        raise ValueError("Frame has invalid dimensions")
+    
+    # Convert to grayscale, handling different input formats
+    if len(frame.shape) == 3:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    elif len(frame.shape) == 2:
+        gray = frame
+    else:
+        raise ValueError("Unsupported frame format")
+    
+    frame_h, frame_w = gray.shape
+    if frame_h <= 0 or frame_w <= 0:
+        raise ValueError("Invalid frame dimensions")
+    return gray
+
+
+def _default_analysis(area_name):
+    """Fallback analysis result (everything empty) for an area."""
+    parking_spaces = get_parking_spaces_for_area(area_name) if area_name else PARKING_SPACES
+    total_default = len(parking_spaces) if parking_spaces else 14
+    return 0, total_default, [False] * total_default
+
+
+def analyze_parking(frame, area_name: str = None):
+    """Analyze parking spots and return counts without drawing."""
+    try:
+        gray = _prepare_gray(frame)
+        frame_h, frame_w = gray.shape
+
+        # Get compiled slot geometry for the specified area
+        geometry = get_slot_geometry(area_name, frame_w, frame_h)
+        statuses = compute_slot_statuses(gray, geometry)
+
+        occupied_count = sum(statuses)
+        empty_count = len(statuses) - occupied_count
+        return occupied_count, empty_count, statuses
+    except Exception as e:
+        print(f"Error in analyze_parking: {e}")
+        # Return default values on error
+        return _default_analysis(area_name)
+
+
+def analyze_parking_reference(frame, area_name: str = None):
+    """Per-slot reference implementation of analyze_parking.
+
+    Checks each slot separately through its own ROI. Kept to validate the
+    vectorized engine against and as the fallback for overlapping slots.
+    """
+    try:
+        gray = _prepare_gray(frame)
+        frame_h, frame_w = gray.shape
+
+        # Get compiled slot geometry for the specified area
+        geometry = get_slot_geometry(area_name, frame_w, frame_h)
+
+        total_spots = len(geometry['slots'])
         occupied_count = 0
         statuses = []
 
-        for idx, space in enumerate(parking_spaces):
+        for idx, slot in enumerate(geometry['slots']):
             try:
-                pts = np.array(scale_points(space, frame_w, frame_h), np.int32)
-                mask = np.zeros(gray.shape, np.uint8)
-                cv2.fillPoly(mask, [pts], 255)
-
-                spot_gray = cv2.bitwise_and(gray, gray, mask=mask)
-                x, y, w, h = cv2.boundingRect(pts)
-                
-                # Ensure valid crop dimensions
-                if w > 0 and h > 0 and x >= 0 and y >= 0:
-                    spot_crop = spot_gray[y:y+h, x:x+w]
-                    # Detect texture/variance
-                    nonzero = spot_crop[np.nonzero(spot_crop)]
-                    if len(nonzero) > 0:
-                        variance = np.var(nonzero)
-                        occupied = variance > 300
-                    else:
-                        occupied = False
-                else:
-                    occupied = False
-
+                occupied = is_slot_occupied(gray, slot)
                 if occupied:
                     occupied_count += 1
 
@@ -374,39 +902,143 @@ def analyze_parking(frame, area_name: str = None):
         empty_count = total_spots - occupied_count
         return occupied_count, empty_count, statuses
     except Exception as e:
-        print(f"Error in analyze_parking: {e}")
+        print(f"Error in analyze_parking_reference: {e}")
         # Return default values on error
-        parking_spaces = get_parking_spaces_for_area(area_name) if area_name else PARKING_SPACES
-        total_default = len(parking_spaces) if parking_spaces else 14
-        return 0, total_default, [False] * total_default
+        return _default_analysis(area_name)
 
 
-def detect_parking(frame, area_name: str = None):
-    """Detect occupancy and draw info on a frame."""
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    frame_h, frame_w = gray.shape
+# === Incremental occupancy ===
+# Consecutive frames of a parking lot are nearly identical. Each analysis
+# stream keeps a low-resolution copy of the frame it last analyzed and only
+# re-evaluates slots whose region changed by more than a threshold.
+INCREMENTAL_SCALE = 8  # Downscale factor for the change check
+SLOT_CHANGE_THRESHOLD = 3.0  # Mean absolute gray-level change that marks a slot dirty
+FULL_REFRESH_FRAMES = 30  # Force a full analysis this often to bound drift below the threshold
 
-    # Get parking spaces for the specified area
-    parking_spaces = get_parking_spaces_for_area(area_name) if area_name else PARKING_SPACES
-    if not parking_spaces:
-        print(f"Warning: No parking spaces found for area '{area_name}'. Using default.")
-        parking_spaces = PARKING_SPACES
+incremental_states = {}  # state key -> last analyzed frame/statuses
+incremental_states_lock = threading.Lock()
+incremental_stats = {
+    "frames": 0,
+    "frames_skipped": 0,
+    "slots": 0,
+    "slots_skipped": 0
+}
+incremental_stats_lock = threading.Lock()
 
-    total_spots = len(parking_spaces)
-    occupied_count = 0
 
-    for idx, space in enumerate(parking_spaces):
-        pts = np.array(scale_points(space, frame_w, frame_h), np.int32)
-        mask = np.zeros(gray.shape, np.uint8)
-        cv2.fillPoly(mask, [pts], 255)
+def _record_incremental_stats(frames_skipped, slots, slots_skipped):
+    with incremental_stats_lock:
+        incremental_stats["frames"] += 1
+        incremental_stats["frames_skipped"] += frames_skipped
+        incremental_stats["slots"] += slots
+        incremental_stats["slots_skipped"] += slots_skipped
 
-        spot_gray = cv2.bitwise_and(gray, gray, mask=mask)
-        x, y, w, h = cv2.boundingRect(pts)
-        spot_crop = spot_gray[y:y+h, x:x+w]
 
-        # Detect texture/variance
-        variance = np.var(spot_crop[np.nonzero(spot_crop)])
-        occupied = variance > 300
+def _small_slot_boxes(geometry, small_w, small_h):
+    """Slot boxes at the low-resolution scale as (x0, y0, x1, y1, area) arrays."""
+    boxes = np.array([slot['bbox'] for slot in geometry['slots']], dtype=np.int64).reshape(-1, 4)
+    x0 = np.clip(boxes[:, 0] // INCREMENTAL_SCALE, 0, small_w - 1)
+    y0 = np.clip(boxes[:, 1] // INCREMENTAL_SCALE, 0, small_h - 1)
+    # At least one low-resolution pixel per slot
+    x1 = np.clip(-(-(boxes[:, 0] + boxes[:, 2]) // INCREMENTAL_SCALE), x0 + 1, small_w)
+    y1 = np.clip(-(-(boxes[:, 1] + boxes[:, 3]) // INCREMENTAL_SCALE), y0 + 1, small_h)
+    return x0, y0, x1, y1, (x1 - x0) * (y1 - y0)
+
+
+def analyze_parking_incremental(frame, area_name: str = None, state_key=None):
+    """Incremental analyze_parking for a continuous stream of frames.
+
+    state_key identifies the stream (defaults to the area name). Frames where
+    no slot region changed reuse the previous result; otherwise only the
+    changed slots are recomputed.
+    """
+    try:
+        gray = _prepare_gray(frame)
+        frame_h, frame_w = gray.shape
+        geometry = get_slot_geometry(area_name, frame_w, frame_h)
+        slots = geometry['slots']
+        small_w = max(1, frame_w // INCREMENTAL_SCALE)
+        small_h = max(1, frame_h // INCREMENTAL_SCALE)
+        # Cropping to a whole multiple of the scale keeps INTER_AREA on its fast path
+        small = cv2.resize(gray[:small_h * INCREMENTAL_SCALE, :small_w * INCREMENTAL_SCALE],
+                           (small_w, small_h), interpolation=cv2.INTER_AREA)
+
+        key = area_name if state_key is None else state_key
+        with incremental_states_lock:
+            state = incremental_states.get(key)
+            if state is not None:
+                state['frames'] += 1
+            if state is None or state['geometry'] is not geometry or state['frames'] >= FULL_REFRESH_FRAMES:
+                # First frame, new config, new resolution or periodic refresh: full analysis
+                state = {
+                    'frames': 0,
+                    'geometry': geometry,
+                    'boxes': _small_slot_boxes(geometry, small_w, small_h),
+                    'reference': small,
+                    'statuses': compute_slot_statuses(gray, geometry),
+                    'lock': threading.Lock()
+                }
+                incremental_states[key] = state
+                statuses = list(state['statuses'])
+                _record_incremental_stats(0, len(slots), 0)
+                occupied_count = sum(statuses)
+                return occupied_count, len(statuses) - occupied_count, statuses
+
+        with state['lock']:
+            # Mean absolute change per slot box from an integral image of the diff
+            x0, y0, x1, y1, box_area = state['boxes']
+            diff = cv2.absdiff(small, state['reference'])
+            integral = cv2.integral(diff)
+            change = (integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]) / box_area
+            changed = np.flatnonzero(change > SLOT_CHANGE_THRESHOLD)
+
+            statuses = state['statuses']
+            if len(changed) == 0:
+                _record_incremental_stats(1, len(slots), len(slots))
+            else:
+                if len(changed) * 2 > len(slots):
+                    # Most of the lot changed; one vectorized pass is cheaper
+                    fresh = compute_slot_statuses(gray, geometry)
+                    dirty = set(changed.tolist())
+                    statuses = [fresh[idx] if idx in dirty else statuses[idx]
+                                for idx in range(len(slots))]
+                else:
+                    statuses = list(statuses)
+                    for idx in changed:
+                        statuses[idx] = is_slot_occupied(gray, slots[idx])
+                # The re-evaluated slots become the new reference for later frames
+                reference = state['reference'].copy()
+                for idx in changed:
+                    reference[y0[idx]:y1[idx], x0[idx]:x1[idx]] = small[y0[idx]:y1[idx], x0[idx]:x1[idx]]
+                state['reference'] = reference
+                state['statuses'] = statuses
+                _record_incremental_stats(0, len(slots), len(slots) - len(changed))
+
+        statuses = list(statuses)
+        occupied_count = sum(statuses)
+        return occupied_count, len(statuses) - occupied_count, statuses
+    except Exception as e:
+        print(f"Error in analyze_parking_incremental: {e}")
+        # Return default values on error
+        return _default_analysis(area_name)
+
+
+def detect_parking(frame, area_name: str = None, statuses=None):
+    """Detect occupancy (unless statuses are given) and draw info on a frame."""
+    frame_h, frame_w = frame.shape[:2]
+
+    # Get compiled slot geometry for the specified area
+    geometry = get_slot_geometry(area_name, frame_w, frame_h)
+    if statuses is None:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        statuses = compute_slot_statuses(gray, geometry)
+
+    total_spots = len(statuses)
+    occupied_count = 0
+
+    for idx, slot in enumerate(geometry['slots']):
+        pts = slot['points']
+        occupied = statuses[idx]
 
         if occupied:
             occupied_count += 1
@@ -418,10 +1050,10 @@ def detect_parking(frame, area_name: str = None):
         cv2.polylines(frame, [pts], True, color, 2)
         # Draw spot number (no 1, no 2, etc.)
         spot_label = f"no {spot_number}"
-        cv2.putText(frame, spot_label, (pts[0][0], pts[0][1] - 30),
+        cv2.putText(frame, spot_label, (int(pts[0][0]), int(pts[0][1]) - 30),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
         # Draw status (Empty/Occupied)
-        cv2.putText(frame, label, (pts[0][0], pts[0][1] - 10),
+        cv2.putText(frame, label, (int(pts[0][0]), int(pts[0][1]) - 10),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
 
     # --- Display total count on screen ---
@@ -433,267 +1065,1143 @@ def detect_parking(frame, area_name: str = None):
     return frame
 
 
-def generate_frames():
-    """Generate MJPEG video stream."""
-    if cap is None or not cap.isOpened():
-        # Create error frame
-        error_frame = np.zeros((480, 640, 3), dtype=np.uint8)
-        cv2.putText(error_frame, "Camera not connected!", (50, 240),
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-        ret, buffer = cv2.imencode('.jpg', error_frame)
-        if ret:
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-        return
-    
-    while True:
-        # Check if we have a frozen frame (from confirm button)
-        with frozen_frame_lock:
-            global frozen_frame
-            if frozen_frame is not None:
-                # Use frozen frame instead of reading from camera
-                frame = frozen_frame.copy()
-            else:
-                # Read from camera as normal
-                success, frame = read_frame_safe()
-                if not success or frame is None:
-                    print("Warning: Failed to read frame from camera")
-                    break
+# === Live event stream ===
+# Occupancy changes, QR detections and plate detections are pushed to
+# Server-Sent Events clients as they happen instead of being polled.
+EVENT_QUEUE_SIZE = 100  # Per-client backlog before the oldest events are dropped
+EVENT_KEEPALIVE_SECONDS = 15
 
-                # === CROP OUT iVCam logo area (adjust these pixel values) ===
-                # If the logo is on top and bottom, remove about 60px top and 40px bottom
-                if frame.shape[0] > 100:  # Make sure we have enough rows
-                    frame = frame[60:-40, :]
 
-                # === Optionally resize for smoother display ===
-                frame = cv2.resize(frame, (960, 540))
+class EventHub:
+    """Fans out events published from worker threads to async SSE clients."""
 
-                # Run detection
-                frame = detect_parking(frame)
+    def __init__(self, queue_size=EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.lock = threading.Lock()
 
-        # Encode frame as JPEG
-        ret, buffer = cv2.imencode('.jpg', frame)
-        if not ret:
-            continue
-        frame_bytes = buffer.tobytes()
+    def subscribe(self):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.queue_size))
+        with self.lock:
+            self.subscribers.add(subscriber)
+        return subscriber
 
-        # Stream as multipart MJPEG
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-        
-        # Small delay to prevent high CPU usage
-        time.sleep(0.033)  # ~30 FPS
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
 
+    def publish(self, event_type, data, area=None):
+        """Queue an event for every subscriber; safe to call from any thread."""
+        with self.lock:
+            subscribers = list(self.subscribers)
+        if not subscribers:
+            return
+        message = format_sse(event_type, data)
+        for loop, event_queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, event_queue, (event_type, area, message))
+            except RuntimeError:
+                # Event loop already closed; the client is gone
+                self.unsubscribe((loop, event_queue))
 
-class AssignRequest(BaseModel):
-    area: str = "Demo"
+    @staticmethod
+    def _deliver(event_queue, event):
+        if event_queue.full():
+            # Slow client: drop the oldest event rather than grow without bound
+            event_queue.get_nowait()
+        event_queue.put_nowait(event)
 
 
-class ReserveRequest(BaseModel):
-    area: str
-    spot_number: str = ""  # Optional, not required anymore
+def format_sse(event_type, data):
+    """Encode one Server-Sent Events message."""
+    return f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
 
 
-@app.post("/reset-camera")
-def reset_camera():
-    """Reset frozen frame to restart camera feed."""
-    with frozen_frame_lock:
-        global frozen_frame, frozen_raw_frame, frozen_analysis
-        frozen_frame = None
-        frozen_raw_frame = None
-        frozen_analysis = None
-    return {"success": True, "message": "Camera feed restarted"}
+event_hub = EventHub()
 
 
-@app.get("/health")
-def health():
-    """Check if camera is connected."""
-    try:
-        if cap is None or not cap.isOpened():
-            return JSONResponse(
-                status_code=200,
-                content={"status": "error", "message": "Camera not connected. Ensure iVCam is running."}
-            )
-        return JSONResponse(
-            status_code=200,
-            content={"status": "ok", "camera_index": camera_index}
-        )
-    except Exception as e:
-        print(f"Error in /health: {e}")
-        return JSONResponse(
-            status_code=500,
-            content={"status": "error", "error": str(e)}
-        )
+# === Occupancy history (SQLite) ===
+# Slot status transitions are recorded in data.db by a single writer thread.
+# Publishers only enqueue the new statuses, so recording never slows analysis;
+# the writer diffs them against the last known state and inserts the changes
+# in batches. WAL mode lets the query endpoints read while it writes.
+# The same writer folds every sample into per-minute/hour/day rollups, which
+# are all the reporting endpoint ever reads.
+DB_PATH = os.environ.get('PARKING_DB_PATH') or os.path.join(os.path.dirname(__file__), 'data.db')
+HISTORY_QUEUE_SIZE = 10000
+HISTORY_BATCH_SIZE = 500
+HISTORY_FLUSH_SECONDS = 0.5
+ROLLUP_GRANULARITIES = ('minute', 'hour', 'day')
+MINUTE_ROLLUP_RETENTION_DAYS = 7  # Hour and day rollups are kept forever
 
+SCHEMA_STATEMENTS = (
+    """CREATE TABLE IF NOT EXISTS slots (
+        area TEXT,
+        slot_id TEXT,
+        status TEXT,
+        updated_at REAL,
+        PRIMARY KEY(area, slot_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS bookings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT,
+        area TEXT,
+        slot_id TEXT,
+        status TEXT,
+        created_at REAL
+    )""",
+    """CREATE TABLE IF NOT EXISTS slot_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        area TEXT NOT NULL,
+        slot_id TEXT NOT NULL,
+        status TEXT NOT NULL,
+        recorded_at REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_slot_events_area_slot_time ON slot_events(area, slot_id, recorded_at)",
+    "CREATE INDEX IF NOT EXISTS idx_slot_events_time ON slot_events(recorded_at)",
+    """CREATE TABLE IF NOT EXISTS occupancy_rollups (
+        granularity TEXT NOT NULL,
+        area TEXT NOT NULL,
+        bucket_start REAL NOT NULL,
+        samples INTEGER NOT NULL,
+        occupied_sum INTEGER NOT NULL,
+        free_sum INTEGER NOT NULL,
+        peak_occupied INTEGER NOT NULL,
+        min_free INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        PRIMARY KEY(granularity, area, bucket_start)
+    )""",
+    """CREATE TABLE IF NOT EXISTS slot_rollups (
+        granularity TEXT NOT NULL,
+        area TEXT NOT NULL,
+        slot_id TEXT NOT NULL,
+        bucket_start REAL NOT NULL,
+        samples INTEGER NOT NULL,
+        occupied_samples INTEGER NOT NULL,
+        PRIMARY KEY(granularity, area, slot_id, bucket_start)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_slot_rollups_bucket ON slot_rollups(granularity, area, bucket_start)",
+)
 
-@app.get("/api/parking/availability/{area}")
-def get_parking_availability(area: str):
-    """Get parking availability for a specific area (for Flutter app)."""
+# Constant SQL text so sqlite3's statement cache reuses the prepared statements
+INSERT_SLOT_EVENT_SQL = "INSERT INTO slot_events (area, slot_id, status, recorded_at) VALUES (?, ?, ?, ?)"
+UPSERT_SLOT_SQL = "INSERT OR REPLACE INTO slots (area, slot_id, status, updated_at) VALUES (?, ?, ?, ?)"
+UPSERT_OCCUPANCY_ROLLUP_SQL = (
+    "INSERT INTO occupancy_rollups (granularity, area, bucket_start, samples, occupied_sum, free_sum, "
+    "peak_occupied, min_free, total) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(granularity, area, bucket_start) DO UPDATE SET "
+    "samples = samples + excluded.samples, "
+    "occupied_sum = occupied_sum + excluded.occupied_sum, "
+    "free_sum = free_sum + excluded.free_sum, "
+    "peak_occupied = MAX(peak_occupied, excluded.peak_occupied), "
+    "min_free = MIN(min_free, excluded.min_free), "
+    "total = excluded.total"
+)
+UPSERT_SLOT_ROLLUP_SQL = (
+    "INSERT INTO slot_rollups (granularity, area, slot_id, bucket_start, samples, occupied_samples) "
+    "VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(granularity, area, slot_id, bucket_start) DO UPDATE SET "
+    "samples = samples + excluded.samples, "
+    "occupied_samples = occupied_samples + excluded.occupied_samples"
+)
+
+
+def init_database(path=None):
+    """Switch data.db to WAL mode and create the schema; run once at startup."""
+    conn = sqlite3.connect(path or DB_PATH, timeout=10)
     try:
-        # Check if we have frozen analysis results (from confirm button)
+        # WAL mode is stored in the database file, so later connections inherit it
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            for statement in SCHEMA_STATEMENTS:
+                conn.execute(statement)
+    finally:
+        conn.close()
+
+
+def open_database(path=None):
+    """Open a writer connection to data.db (the schema comes from init_database)."""
+    conn = sqlite3.connect(path or DB_PATH, timeout=10, check_same_thread=False)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+db_read_local = threading.local()  # One read-only connection per request thread
+
+
+def read_database():
+    """Return this thread's read-only connection to data.db, opening it on first use."""
+    conn = getattr(db_read_local, 'conn', None)
+    if conn is None or db_read_local.path != DB_PATH:
+        uri = pathlib.Path(DB_PATH).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=10)
+        db_read_local.conn = conn
+        db_read_local.path = DB_PATH
+    return conn
+
+
+def rollup_bucket_start(timestamp, granularity):
+    """Start of the minute, hour or (local) day containing a Unix time."""
+    if granularity == 'minute':
+        return float(int(timestamp // 60) * 60)
+    if granularity == 'hour':
+        return float(int(timestamp // 3600) * 3600)
+    day = time.localtime(timestamp)
+    return time.mktime((day.tm_year, day.tm_mon, day.tm_mday, 0, 0, 0, 0, 0, -1))
+
+
+def slot_status_name(is_occupied):
+    """Status string stored in the database for a slot."""
+    return "occupied" if is_occupied else "available"
+
+
+class OccupancyRecorder:
+    """Writer thread that persists slot status transitions."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.queue = queue.Queue(maxsize=HISTORY_QUEUE_SIZE)
+        self.last_status = {}  # (area, slot_id) -> status, owned by the writer thread
+        self.written = 0
+        self.dropped = 0
+        self.last_prune = 0.0
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name="occupancy-recorder", daemon=True)
+
+    def start(self):
+        if self.thread.ident is None:
+            self.thread.start()
+
+    def record(self, area, statuses, timestamp):
+        """Queue an area's statuses (one rollup sample); never blocks the caller."""
         try:
-            with frozen_frame_lock:
-                global frozen_analysis
-                if frozen_analysis is not None:
-                    # Use stored analysis results from when confirm was clicked
-                    # frozen_analysis is a tuple: (occupied_count, empty_count, statuses, assigned_spot_no)
-                    if len(frozen_analysis) == 4:
-                        occupied_count, empty_count, statuses, assigned_spot_no = frozen_analysis
-                    else:
-                        # Backward compatibility: if old format, extract assigned_spot_no separately
-                        occupied_count, empty_count, statuses = frozen_analysis[:3]
-                        assigned_spot_no = None
-                        # Calculate assigned spot if not stored
-                        for i, is_occupied in enumerate(statuses):
-                            if not is_occupied:
-                                assigned_spot_no = str(i + 1)
-                                break
-                    
-                    slot_statuses_list = [bool(s) for s in statuses] if statuses else []
-                    parking_spaces = get_parking_spaces_for_area(area)
-                    total_spots = len(parking_spaces) if parking_spaces else len(statuses) if statuses else 14
-                    
-                    # Debug: Print what we're returning
-                    print(f"DEBUG: Returning frozen analysis for area '{area}': empty={empty_count}, occupied={occupied_count}, total={total_spots}, assigned_spot_no={assigned_spot_no}")
-                    
-                    response_content = {
-                        "success": True,
-                        "area": area,
-                        "available": int(empty_count),
-                        "available_slots": int(empty_count),
-                        "empty": int(empty_count),  # Explicitly return "empty" for frontend
-                        "occupied": int(occupied_count),
-                        "total": int(total_spots),
-                        "slot_statuses": slot_statuses_list
-                    }
-                    
-                    # Add assigned spot number if available
-                    if assigned_spot_no is not None:
-                        response_content["assigned_spot_no"] = assigned_spot_no
-                    
-                    return JSONResponse(
-                        status_code=200,
-                        content=response_content
-                    )
+            self.queue.put_nowait((area, tuple(statuses), timestamp))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        try:
+            conn = open_database(self.path)
+            # Resume from the stored state so a restart does not log fake transitions
+            for area, slot_id, status in conn.execute("SELECT area, slot_id, status FROM slots"):
+                self.last_status[(area, slot_id)] = status
         except Exception as e:
-            print(f"Warning: Error accessing frozen_analysis: {e}")
-            # Continue to live camera fallback
-        
-        # If no frozen analysis, return message to click Confirm first
-        print(f"DEBUG: No frozen_analysis found for area '{area}'. User needs to click 'Confirm' on backend first.")
-        return JSONResponse(
-            status_code=200,
-            content={
-                "success": False,
-                "area": area,
-                "available": 0,
-                "occupied": 0,
-                "empty": 0,
-                "error": "Please click 'Confirm' button on backend console first to scan parking area",
-                "message": "Click 'Confirm' on backend to scan parking area"
+            self.error = str(e)
+            print(f"Occupancy history disabled, could not open {self.path or DB_PATH}: {e}")
+            return
+
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.time() + HISTORY_FLUSH_SECONDS
+            while len(batch) < HISTORY_BATCH_SIZE:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(conn, batch)
+            except Exception as e:
+                self.error = str(e)
+                print(f"Error writing occupancy history: {e}")
+
+    def _write(self, conn, batch):
+        events = []
+        area_rollups = {}  # (granularity, area, bucket) -> [samples, occupied, free, peak, min free, total]
+        slot_rollups = {}  # (granularity, area, slot_id, bucket) -> [samples, occupied samples]
+        for area, statuses, timestamp in batch:
+            occupied_count = sum(statuses)
+            free_count = len(statuses) - occupied_count
+            for granularity in ROLLUP_GRANULARITIES:
+                bucket = rollup_bucket_start(timestamp, granularity)
+                rollup = area_rollups.get((granularity, area, bucket))
+                if rollup is None:
+                    area_rollups[(granularity, area, bucket)] = [
+                        1, occupied_count, free_count, occupied_count, free_count, len(statuses)]
+                else:
+                    rollup[0] += 1
+                    rollup[1] += occupied_count
+                    rollup[2] += free_count
+                    rollup[3] = max(rollup[3], occupied_count)
+                    rollup[4] = min(rollup[4], free_count)
+                    rollup[5] = len(statuses)
+                for i, is_occupied in enumerate(statuses):
+                    counts = slot_rollups.setdefault((granularity, area, str(i + 1), bucket), [0, 0])
+                    counts[0] += 1
+                    counts[1] += int(is_occupied)
+            for i, is_occupied in enumerate(statuses):
+                slot_id = str(i + 1)
+                status = slot_status_name(is_occupied)
+                if self.last_status.get((area, slot_id)) != status:
+                    self.last_status[(area, slot_id)] = status
+                    events.append((area, slot_id, status, timestamp))
+        with conn:
+            if events:
+                conn.executemany(INSERT_SLOT_EVENT_SQL, events)
+                conn.executemany(UPSERT_SLOT_SQL, events)
+            conn.executemany(UPSERT_OCCUPANCY_ROLLUP_SQL,
+                             [key + tuple(values) for key, values in area_rollups.items()])
+            conn.executemany(UPSERT_SLOT_ROLLUP_SQL,
+                             [key + tuple(values) for key, values in slot_rollups.items()])
+            if time.time() - self.last_prune > 3600:
+                cutoff = time.time() - MINUTE_ROLLUP_RETENTION_DAYS * 86400
+                conn.execute("DELETE FROM occupancy_rollups WHERE granularity = 'minute' AND bucket_start < ?", (cutoff,))
+                conn.execute("DELETE FROM slot_rollups WHERE granularity = 'minute' AND bucket_start < ?", (cutoff,))
+                self.last_prune = time.time()
+        self.written += len(events)
+        self.error = None
+
+    def status(self):
+        return {
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "error": self.error
+        }
+
+
+def query_area_status_at(area, at):
+    """Slot statuses of an area as recorded at time `at`: {slot_id: (status, since)}."""
+    conn = read_database()
+    # SQLite returns the row holding MAX(recorded_at) for the bare columns
+    rows = conn.execute(
+        "SELECT slot_id, status, MAX(recorded_at) FROM slot_events "
+        "WHERE area = ? AND recorded_at <= ? GROUP BY slot_id",
+        (area, at)
+    ).fetchall()
+    return {slot_id: (status, since) for slot_id, status, since in rows}
+
+
+def query_utilization(area, granularity, start, end):
+    """Read rollups for [start, end): (bucket rows, per-slot rows) for one area or all."""
+    area_filter = "AND area = ?" if area else ""
+    params = (granularity, start, end) + ((area,) if area else ())
+    conn = read_database()
+    buckets = conn.execute(
+        "SELECT area, bucket_start, samples, occupied_sum, free_sum, peak_occupied, min_free, total "
+        "FROM occupancy_rollups WHERE granularity = ? AND bucket_start >= ? AND bucket_start < ? "
+        f"{area_filter} ORDER BY area, bucket_start",
+        params
+    ).fetchall()
+    slots = conn.execute(
+        "SELECT area, slot_id, SUM(samples), SUM(occupied_samples) "
+        "FROM slot_rollups WHERE granularity = ? AND bucket_start >= ? AND bucket_start < ? "
+        f"{area_filter} GROUP BY area, slot_id",
+        params
+    ).fetchall()
+    return buckets, slots
+
+
+def query_transitions(area, start, end, limit):
+    """Recorded transitions in [start, end], oldest first."""
+    conn = read_database()
+    if area:
+        return conn.execute(
+            "SELECT area, slot_id, status, recorded_at FROM slot_events "
+            "WHERE area = ? AND recorded_at BETWEEN ? AND ? ORDER BY recorded_at, id LIMIT ?",
+            (area, start, end, limit)
+        ).fetchall()
+    return conn.execute(
+        "SELECT area, slot_id, status, recorded_at FROM slot_events "
+        "WHERE recorded_at BETWEEN ? AND ? ORDER BY recorded_at, id LIMIT ?",
+        (start, end, limit)
+    ).fetchall()
+
+
+try:
+    init_database()
+except Exception as e:
+    print(f"Error initializing {DB_PATH}: {e}")
+
+occupancy_recorder = OccupancyRecorder()
+
+
+# === Reservations ===
+# Holds live in memory per area, each area behind its own lock, and are
+# mirrored to the bookings table. A spot is picked and its booking row written
+# under the area's lock, so concurrent reserves never hand out the same spot
+# while reserves for different areas proceed independently.
+RESERVATION_HOLD_SECONDS = 600  # A held spot is released if unused for this long
+
+Hold = namedtuple('Hold', ['booking_id', 'area', 'spot', 'user_id', 'created_at', 'expires_at'])
+
+
+class ReservationEngine:
+    """Per-area spot holds backed by the bookings table."""
+
+    def __init__(self, path=None, hold_seconds=RESERVATION_HOLD_SECONDS):
+        self.path = path
+        self.hold_seconds = hold_seconds
+        self.holds = {}  # area -> {spot: Hold}
+        self.revisions = {}  # area -> number of changes to its holds, for ETags
+        self.area_locks = {}
+        self.area_locks_lock = threading.Lock()
+        self.local = threading.local()  # One SQLite connection per thread
+
+    def _conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = open_database(self.path)
+            self.local.conn = conn
+        return conn
+
+    def _lock(self, area):
+        lock = self.area_locks.get(area)
+        if lock is None:
+            with self.area_locks_lock:
+                lock = self.area_locks.setdefault(area, threading.Lock())
+        return lock
+
+    def load(self):
+        """Restore unexpired holds from the bookings table."""
+        now = time.time()
+        conn = self._conn()
+        expired = []
+        rows = conn.execute(
+            "SELECT id, user_id, area, slot_id, created_at FROM bookings WHERE status = 'held'").fetchall()
+        for booking_id, user_id, area, spot, created_at in rows:
+            expires_at = created_at + self.hold_seconds
+            if expires_at <= now:
+                expired.append(booking_id)
+            else:
+                self.holds.setdefault(area, {})[spot] = Hold(booking_id, area, spot, user_id, created_at, expires_at)
+        self._set_status(expired, 'expired')
+        print(f"Reservations: restored {len(rows) - len(expired)} active holds")
+
+    def _set_status(self, booking_ids, status):
+        if not booking_ids:
+            return
+        conn = self._conn()
+        with conn:
+            conn.executemany("UPDATE bookings SET status = ? WHERE id = ? AND status = 'held'",
+                             [(status, booking_id) for booking_id in booking_ids])
+
+    def _expire(self, area, now):
+        """Drop expired holds for an area; the caller holds the area lock."""
+        area_holds = self.holds.get(area)
+        if not area_holds:
+            return []
+        expired = [hold for hold in area_holds.values() if hold.expires_at <= now]
+        for hold in expired:
+            del area_holds[hold.spot]
+        if expired:
+            self._changed(area)
+        return [hold.booking_id for hold in expired]
+
+    def _changed(self, area):
+        # Caller holds the area lock
+        self.revisions[area] = self.revisions.get(area, 0) + 1
+
+    def hold_state(self, area):
+        """(spot numbers currently held, hold revision) for an area."""
+        with self._lock(area):
+            expired = self._expire(area, time.time())
+            state = frozenset(self.holds.get(area, {})), self.revisions.get(area, 0)
+        self._set_status(expired, 'expired')
+        return state
+
+    def held_spots(self, area):
+        """Spot numbers currently held in an area."""
+        return set(self.hold_state(area)[0])
+
+    def reserve(self, area, statuses, user_id=None, spot_number=None):
+        """Hold a free spot, preferring spot_number. Returns (hold or None, free spots left).
+
+        A user who already holds a spot in the area gets the same hold back.
+        """
+        now = time.time()
+        with self._lock(area):
+            expired = self._expire(area, now)
+            area_holds = self.holds.setdefault(area, {})
+            free = [str(i + 1) for i, is_occupied in enumerate(statuses)
+                    if not is_occupied and str(i + 1) not in area_holds]
+            hold = None
+            if user_id:
+                hold = next((h for h in area_holds.values() if h.user_id == user_id), None)
+            if hold is None and free:
+                spot = spot_number if spot_number in free else free[0]
+                # Only this area waits on the insert; other areas use their own locks
+                conn = self._conn()
+                with conn:
+                    booking_id = conn.execute(
+                        "INSERT INTO bookings (user_id, area, slot_id, status, created_at) VALUES (?, ?, ?, 'held', ?)",
+                        (user_id, area, spot, now)
+                    ).lastrowid
+                hold = Hold(booking_id, area, spot, user_id, now, now + self.hold_seconds)
+                area_holds[spot] = hold
+                free.remove(spot)
+                self._changed(area)
+        self._set_status(expired, 'expired')
+        return hold, len(free)
+
+    def cancel(self, area, booking_id=None, user_id=None, spot_number=None):
+        """Release the holds matching any of the given identifiers; returns them."""
+        if booking_id is None and not user_id and not spot_number:
+            return []
+        with self._lock(area):
+            area_holds = self.holds.get(area, {})
+            released = [
+                hold for hold in area_holds.values()
+                if (booking_id is not None and hold.booking_id == booking_id)
+                or (user_id and hold.user_id == user_id)
+                or (spot_number and hold.spot == spot_number)
+            ]
+            for hold in released:
+                del area_holds[hold.spot]
+            if released:
+                self._changed(area)
+        self._set_status([hold.booking_id for hold in released], 'cancelled')
+        return released
+
+    def status(self):
+        now = time.time()
+        return {
+            "hold_seconds": self.hold_seconds,
+            "active_holds": {
+                area: sum(1 for hold in list(area_holds.values()) if hold.expires_at > now)
+                for area, area_holds in list(self.holds.items())
             }
+        }
+
+
+reservations = ReservationEngine()
+try:
+    reservations.load()
+except Exception as e:
+    print(f"Error loading reservations: {e}")
+
+
+# === Occupancy snapshots ===
+# A background monitor keeps analyzing every configured area and publishes an
+# immutable snapshot per area. Writers copy the dict and rebind it, so request
+# handlers read the current snapshot lock-free without touching the camera.
+OCCUPANCY_INTERVAL = 1.0  # Seconds between analysis rounds
+
+AreaSnapshot = namedtuple('AreaSnapshot', [
+    'area', 'occupied', 'empty', 'total', 'statuses', 'assigned_spot_no', 'timestamp', 'version',
+    'slot_versions'
+])
+
+# Versions restart with the process, so ETags carry the start time as well
+SNAPSHOT_EPOCH = int(time.time())
+
+area_snapshots = {}  # area name -> AreaSnapshot
+withdrawn_area_snapshots = {}  # area name -> last snapshot while its camera is down
+area_camera_errors = {}  # area name -> why it has no snapshot
+console_snapshot = None  # Console layout (PARKING_SPACES) on the main camera
+snapshot_publish_lock = threading.Lock()  # Serializes writers only
+
+
+def build_snapshot(area, statuses, previous=None, timestamp=None):
+    """Create a snapshot; the version only moves when slot statuses change."""
+    statuses = tuple(bool(s) for s in statuses)
+    occupied_count = sum(statuses)
+    # Auto-assign first available parking spot number (indexed from 1)
+    assigned_spot_no = None
+    for i, is_occupied in enumerate(statuses):
+        if not is_occupied:
+            assigned_spot_no = str(i + 1)
+            break
+    if previous is None:
+        version = 1
+    elif previous.statuses != statuses:
+        version = previous.version + 1
+    else:
+        version = previous.version
+    # Version at which each slot last changed, for since_version queries
+    if previous is None or len(previous.statuses) != len(statuses):
+        slot_versions = (version,) * len(statuses)
+    else:
+        slot_versions = tuple(
+            old_version if old == new else version
+            for old, new, old_version in zip(previous.statuses, statuses, previous.slot_versions)
         )
-        
-        # COMMENTED OUT: Live camera analysis removed - user must click Confirm first
-        # This ensures consistent results and prevents incorrect values
-        # If you want live camera, uncomment below:
-        """
-        # If no frozen frame, use live camera
-        if cap is None or not cap.isOpened():
-            return JSONResponse(
-                status_code=200,
-                content={
-                    "success": False,
-                    "area": area,
-                    "available": 0,
-                    "occupied": 0,
-                    "empty": 0,
-                    "error": "Camera not connected"
-                }
-            )
-        
-        success, frame = read_frame_safe()
-        if not success or frame is None:
-            return JSONResponse(
-                status_code=200,
-                content={
-                    "success": False,
-                    "area": area,
-                    "available": 0,
-                    "occupied": 0,
-                    "empty": 0,
-                    "error": "Failed to read frame"
-                }
-            )
-        
-        # Crop iVCam logo if needed
+    return AreaSnapshot(
+        area=area,
+        occupied=occupied_count,
+        empty=len(statuses) - occupied_count,
+        total=len(statuses),
+        statuses=statuses,
+        assigned_spot_no=assigned_spot_no,
+        timestamp=timestamp or time.time(),
+        version=version,
+        slot_versions=slot_versions
+    )
+
+
+def snapshot_etag(snapshot, scope=None, hold_revision=0):
+    """ETag for a snapshot; it only changes when the slot statuses or holds change.
+
+    Area snapshots are scoped by a hash of the area name, so two areas at the
+    same version never share an ETag.
+    """
+    if scope is None:
+        scope = f"{zlib.crc32(snapshot.area.encode()):08x}-" if snapshot.area else ""
+    return f'"{scope}{SNAPSHOT_EPOCH}-{snapshot.version}.{hold_revision}"'
+
+
+def snapshot_cursor(snapshot):
+    """since cursor for a snapshot: "<epoch>-<version>"."""
+    return f"{SNAPSHOT_EPOCH}-{snapshot.version}"
+
+
+def parse_since(since):
+    """(epoch, version) from a since cursor or an availability ETag, or None."""
+    token = since.strip()
+    if token.startswith('W/'):
+        token = token[2:]
+    # ETags add an area scope before and a hold revision after the cursor
+    parts = token.strip('"').split('-')
+    if len(parts) < 2:
+        return None
+    epoch, version = parts[-2], parts[-1].split('.')[0]
+    if not (epoch.isdigit() and version.isdigit()):
+        return None
+    return int(epoch), int(version)
+
+
+def etag_matches(request: Request, etag):
+    """True when the request's If-None-Match header covers the given ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == '*' or candidate == etag:
+            return True
+    return False
+
+
+def publish_area_snapshot(area, statuses, timestamp=None):
+    """Publish a new snapshot for an area and return it."""
+    global area_snapshots
+    with snapshot_publish_lock:
+        # Versions carry on from before a camera outage, so ETags never repeat
+        withdrawn = withdrawn_area_snapshots.pop(area, None)
+        previous = area_snapshots.get(area) or withdrawn
+        snapshot = build_snapshot(area, statuses, previous, timestamp)
+        snapshots = dict(area_snapshots)
+        snapshots[area] = snapshot
+        area_snapshots = snapshots
+        area_camera_errors.pop(area, None)
+    # Every round is a rollup sample; the recorder only stores actual transitions
+    occupancy_recorder.record(area, snapshot.statuses, snapshot.timestamp)
+    if previous is None or withdrawn is not None or previous.version != snapshot.version:
+        event_hub.publish("occupancy", snapshot_content(area, snapshot), area=area)
+    return snapshot
+
+
+def withdraw_area_snapshot(area, error):
+    """Stop serving an area's snapshot while its camera is unavailable."""
+    global area_snapshots
+    with snapshot_publish_lock:
+        area_camera_errors[area] = error
+        snapshot = area_snapshots.get(area)
+        if snapshot is None:
+            return
+        snapshots = dict(area_snapshots)
+        del snapshots[area]
+        area_snapshots = snapshots
+        withdrawn_area_snapshots[area] = snapshot
+    print(f"Area '{area}': {error}")
+
+
+def publish_console_snapshot(statuses, timestamp=None):
+    """Publish a new snapshot for the console layout and return it."""
+    global console_snapshot
+    with snapshot_publish_lock:
+        previous = console_snapshot
+        snapshot = build_snapshot(None, statuses, previous, timestamp)
+        console_snapshot = snapshot
+    if previous is None or previous.version != snapshot.version:
+        event_hub.publish("status", {
+            "occupied": snapshot.occupied,
+            "empty": snapshot.empty,
+            "available": snapshot.empty,
+            "version": snapshot.version
+        })
+    return snapshot
+
+
+def get_area_snapshot(area_name: str):
+    """Return the latest snapshot for an area, or None if it has not been analyzed yet."""
+    key = resolve_area_name(area_name)
+    if key is None:
+        return None
+    return area_snapshots.get(key)
+
+
+def run_occupancy_round():
+    """Analyze all configured areas and the console layout once."""
+    results = analyze_all_areas()
+    for area_name, result in results.items():
+        if result is not None:
+            publish_area_snapshot(area_name, result[2])
+        elif get_area_camera(area_name) is None:
+            idx = area_camera_indexes.get(area_name, AREA_CONFIGS.get(area_name, {}).get('camera_index', 0))
+            withdraw_area_snapshot(area_name, f"Camera {idx} for this area is not connected")
+
+    success, frame = read_area_frame()
+    if success:
+        _, _, statuses = analyze_parking_incremental(frame, state_key="console")
+        publish_console_snapshot(statuses)
+
+
+def occupancy_monitor_loop():
+    """Keep per-area snapshots current and reconnect missing area cameras."""
+    retry_at = time.time() + AREA_CAMERA_RETRY_INTERVAL
+    while True:
+        started = time.time()
         try:
-            if len(frame.shape) >= 2 and frame.shape[0] > 100:
-                frame = frame[60:-40, :]
+            if started >= retry_at:
+                retry_at = started + AREA_CAMERA_RETRY_INTERVAL
+                reopen_area_cameras()
+            run_occupancy_round()
         except Exception as e:
-            print(f"Error cropping frame in /api/parking/availability: {e}")
-            # Continue with original frame
-        
-        # Validate frame after crop
-        if frame is None or frame.size == 0 or len(frame.shape) < 2:
-            return JSONResponse(
-                status_code=200,
-                content={
-                    "success": False,
-                    "area": area,
-                    "available": 0,
-                    "occupied": 0,
-                    "empty": 0,
-                    "error": "Invalid frame after crop"
-                }
-            )
-        
-        # Resize to match processing size
+            print(f"Error in occupancy monitor: {e}")
+            traceback.print_exc()
+        time.sleep(max(0.0, OCCUPANCY_INTERVAL - (time.time() - started)))
+
+
+occupancy_monitor_thread = threading.Thread(
+    target=occupancy_monitor_loop, name="occupancy-monitor", daemon=True)
+
+
+# === areas.json hot reload ===
+# A watcher polls areas.json; a changed file is validated and its geometry is
+# compiled off the request path before the configs are swapped in. Analyses
+# already running finish on the old geometry, the next ones use the new one.
+AREA_CONFIG_POLL_INTERVAL = 2.0  # Seconds between areas.json checks
+
+area_config_reload_lock = threading.Lock()
+area_config_reload_status = {"version": AREA_CONFIG_VERSION, "loaded_at": time.time(), "error": None}
+
+
+def area_config_signature():
+    """(mtime, size) of areas.json, or None if it does not exist."""
+    try:
+        stat = os.stat(AREA_CONFIG_PATH)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def precompile_area_geometry(configs, version):
+    """Compile slot geometry for new configs at the analysis size under their version."""
+    frame_w, frame_h = ANALYSIS_FRAME_SIZE
+    compiled = {
+        (version, area_name, frame_w, frame_h): compile_slot_geometry(config['slots'], frame_w, frame_h)
+        for area_name, config in configs.items()
+    }
+    with slot_geometry_lock:
+        if len(slot_geometry_cache) + len(compiled) > MAX_SLOT_GEOMETRY_ENTRIES:
+            slot_geometry_cache.clear()
+        slot_geometry_cache.update(compiled)
+
+
+def reload_area_configs():
+    """Reload areas.json if valid; the current configs stay active otherwise.
+
+    Returns (success, message).
+    """
+    global area_snapshots, area_config_reload_status
+    with area_config_reload_lock:
         try:
-            frame = cv2.resize(frame, (960, 540))
+            configs = read_area_config_file()
+            precompile_area_geometry(configs, AREA_CONFIG_VERSION + 1)
         except Exception as e:
-            print(f"Error resizing frame in /api/parking/availability: {e}")
-            return JSONResponse(
-                status_code=200,
-                content={
-                    "success": False,
-                    "area": area,
-                    "available": 0,
-                    "occupied": 0,
-                    "empty": 0,
-                    "error": f"Resize error: {str(e)}"
-                }
-            )
-        
+            area_config_reload_status = dict(area_config_reload_status, error=str(e))
+            print(f"Error reloading areas.json, keeping current configuration: {e}")
+            return False, str(e)
+
+        apply_area_configs(configs)
+        # Open cameras for new areas and drop snapshots of removed ones
+        init_area_cameras()
+        with snapshot_publish_lock:
+            area_snapshots = {name: snapshot for name, snapshot in area_snapshots.items() if name in configs}
+            for removed in set(withdrawn_area_snapshots) - set(configs):
+                del withdrawn_area_snapshots[removed]
+            for removed in set(area_camera_errors) - set(configs):
+                del area_camera_errors[removed]
+        area_config_reload_status = {"version": AREA_CONFIG_VERSION, "loaded_at": time.time(), "error": None}
+        message = f"Reloaded {len(configs)} parking area configurations: {list(configs.keys())}"
+        print(message)
+        return True, message
+
+
+def area_config_watch_loop():
+    """Reload areas.json whenever it changes on disk."""
+    last_signature = area_config_signature()
+    while True:
+        time.sleep(AREA_CONFIG_POLL_INTERVAL)
         try:
-            occupied_count, empty_count, statuses = analyze_parking(frame, area_name=area)
-            slot_statuses_list = [bool(s) for s in statuses] if statuses else []
-            parking_spaces = get_parking_spaces_for_area(area)
-            total_spots = len(parking_spaces) if parking_spaces else 14
-            
-            # Debug: Print what we're returning
-            print(f"DEBUG: Returning live camera analysis for area '{area}': empty={empty_count}, occupied={occupied_count}, total={total_spots}")
-            
+            signature = area_config_signature()
+            # A broken file is reported once and retried when it changes again
+            if signature is not None and signature != last_signature:
+                last_signature = signature
+                reload_area_configs()
+        except Exception as e:
+            print(f"Error in areas.json watcher: {e}")
+            traceback.print_exc()
+
+
+area_config_watch_thread = threading.Thread(
+    target=area_config_watch_loop, name="area-config-watcher", daemon=True)
+
+
+def encode_mjpeg_part(frame):
+    """JPEG-encode a frame as one multipart MJPEG part (None if encoding fails)."""
+    ret, buffer = cv2.imencode('.jpg', frame)
+    if not ret:
+        return None
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+
+
+class FrameBroadcaster:
+    """Renders and JPEG-encodes each frame once and fans it out to all viewers.
+
+    A render thread runs while at least one client is subscribed. Every
+    client only ever receives the newest encoded frame, so a slow viewer
+    skips frames instead of building up a queue or slowing the others down.
+    """
+
+    def __init__(self, name, render, interval=0.033, idle_timeout=5.0):
+        self.name = name
+        self.render = render  # Returns a BGR frame to publish, or None to skip
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self.condition = threading.Condition()
+        self.sequence = 0
+        self.payload = None
+        self.last_frame = None
+        self.subscribers = 0
+        self.last_unsubscribe = 0
+        self.frames_encoded = 0
+        self.thread = None
+
+    def _ensure_running(self):
+        # Caller holds self.condition
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(
+                target=self._run, name=f"broadcast-{self.name}", daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                if self.subscribers == 0 and time.time() - self.last_unsubscribe > self.idle_timeout:
+                    self.thread = None
+                    return
+            started = time.time()
+            try:
+                frame = self.render()
+                # Re-publishing the same object (e.g. a frozen frame) needs no new encode
+                if frame is not None and frame is not self.last_frame:
+                    part = encode_mjpeg_part(frame)
+                    if part is not None:
+                        with self.condition:
+                            self.last_frame = frame
+                            self.payload = part
+                            self.sequence += 1
+                            self.frames_encoded += 1
+                            self.condition.notify_all()
+            except Exception as e:
+                print(f"Error rendering {self.name} frame: {e}")
+                traceback.print_exc()
+            time.sleep(max(0.0, self.interval - (time.time() - started)))
+
+    def stream(self):
+        """Yield the newest encoded frame to one client until it disconnects."""
+        with self.condition:
+            self.subscribers += 1
+            self._ensure_running()
+        last_sequence = 0
+        try:
+            while True:
+                with self.condition:
+                    if self.sequence <= last_sequence:
+                        self.condition.wait(timeout=1.0)
+                    if self.sequence <= last_sequence:
+                        continue
+                    last_sequence = self.sequence
+                    payload = self.payload
+                yield payload
+        finally:
+            with self.condition:
+                self.subscribers -= 1
+                self.last_unsubscribe = time.time()
+
+    def status(self):
+        return {
+            "subscribers": self.subscribers,
+            "frames_encoded": self.frames_encoded,
+            "running": self.thread is not None and self.thread.is_alive()
+        }
+
+
+def error_frame_stream(lines, repeat=False):
+    """Yield an error frame for streams whose camera is unavailable.
+
+    lines is a list of (text, origin, scale); with repeat the frame is
+    re-sent every second so the client keeps showing it.
+    """
+    error_frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    for text, origin, scale in lines:
+        cv2.putText(error_frame, text, origin,
+                    cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 255), 2)
+    part = encode_mjpeg_part(error_frame)
+    if part is None:
+        return
+    yield part
+    while repeat:
+        time.sleep(1)
+        yield part
+
+
+def render_parking_frame():
+    """Render one parking console frame with detection overlays."""
+    # Check if we have a frozen frame (from confirm button)
+    with frozen_frame_lock:
+        if frozen_frame is not None:
+            # Use frozen frame instead of reading from camera
+            return frozen_frame
+
+    # Read from camera as normal
+    success, frame = read_frame_safe()
+    if not success or frame is None:
+        return None
+
+    # === CROP OUT iVCam logo area (adjust these pixel values) ===
+    # If the logo is on top and bottom, remove about 60px top and 40px bottom
+    if frame.shape[0] > 100:  # Make sure we have enough rows
+        frame = frame[60:-40, :]
+
+    # === Optionally resize for smoother display ===
+    frame = cv2.resize(frame, (960, 540))
+
+    # Run detection, re-evaluating only slots that changed since the last frame
+    _, _, statuses = analyze_parking_incremental(frame, state_key="display")
+    return detect_parking(frame, statuses=statuses)
+
+
+parking_broadcaster = FrameBroadcaster("parking", render_parking_frame)
+
+
+def generate_frames():
+    """Generate MJPEG video stream."""
+    if cap is None or not cap.isOpened():
+        yield from error_frame_stream([("Camera not connected!", (50, 240), 1)])
+        return
+    yield from parking_broadcaster.stream()
+
+
+class AssignRequest(BaseModel):
+    area: str = "Demo"
+
+
+class ReserveRequest(BaseModel):
+    area: str
+    spot_number: str = ""  # Optional, not required anymore
+    user_id: str = ""  # Optional; repeat reserves by the same user keep one hold
+
+
+class CancelRequest(BaseModel):
+    area: str
+    booking_id: int = None
+    user_id: str = ""
+    spot_number: str = ""
+
+
+@app.post("/reset-camera")
+def reset_camera():
+    """Reset frozen frame to restart camera feed."""
+    with frozen_frame_lock:
+        global frozen_frame, frozen_raw_frame
+        frozen_frame = None
+        frozen_raw_frame = None
+    return {"success": True, "message": "Camera feed restarted"}
+
+
+@app.get("/health")
+def health():
+    """Check if camera is connected."""
+    try:
+        if cap is None or not cap.isOpened():
             return JSONResponse(
                 status_code=200,
-                content={
-                    "success": True,
-                    "area": area,
-                    "available": int(empty_count),
-                    "available_slots": int(empty_count),  # For Flutter compatibility
-                    "empty": int(empty_count),  # Explicitly return "empty" for frontend
-                    "occupied": int(occupied_count),
-                    "total": int(total_spots),
-                    "slot_statuses": slot_statuses_list
-                }
+                content={"status": "error", "message": "Camera not connected. Ensure iVCam is running."}
             )
-        """
-        
+        with camera_captures_lock:
+            cameras = [capture.status() for capture in camera_captures.values()]
+        return JSONResponse(
+            status_code=200,
+            content={
+                "status": "ok",
+                "camera_index": camera_index,
+                "cameras": cameras,
+                "area_cameras": area_camera_indexes,
+                "area_config": area_config_reload_status,
+                "qr_decoder": dict(qr_decoder.status(), interval=QR_DETECT_INTERVAL),
+                "qr_dedupe": scanned_qr_codes.status(),
+                "visitor_index": visitor_index.status(),
+                "streams": {
+                    "parking": parking_broadcaster.status(),
+                    "visitor_qr": visitor_qr_broadcaster.status(),
+                    "car_plate": car_plate_broadcaster.status()
+                }
+            }
+        )
     except Exception as e:
-        print(f"Error in /api/parking/availability endpoint: {e}")
-        import traceback
+        print(f"Error in /health: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"status": "error", "error": str(e)}
+        )
+
+
+def snapshot_content(area, snapshot, holds=None):
+    """JSON body for an area snapshot (keys kept compatible with the Flutter app).
+
+    Spots held through /api/parking/reserve are not offered or counted as
+    available; holds is a ReservationEngine.hold_state() result (read here
+    when not given).
+    """
+    if holds is None:
+        holds = reservations.hold_state(lookup_area(area) or area)
+    held = holds[0]
+    free = [str(i + 1) for i, is_occupied in enumerate(snapshot.statuses)
+            if not is_occupied and str(i + 1) not in held]
+    content = {
+        "success": True,
+        "area": area,
+        "available": len(free),
+        "available_slots": len(free),
+        "empty": len(free),  # Explicitly return "empty" for frontend
+        "occupied": int(snapshot.occupied),
+        "total": int(snapshot.total),
+        "slot_statuses": list(snapshot.statuses),
+        "held_slots": sorted(int(spot) for spot in held if spot.isdigit()),
+        "timestamp": snapshot.timestamp,
+        "version": snapshot.version
+    }
+    # Add assigned spot number if available
+    if free:
+        content["assigned_spot_no"] = free[0]
+    return content
+
+
+def publish_hold_change(area):
+    """Push an area's hold-aware availability to SSE clients after a hold changes."""
+    snapshot = area_snapshots.get(area)
+    if snapshot is not None:
+        event_hub.publish("occupancy", snapshot_content(area, snapshot), area=area)
+
+
+def snapshot_delta_content(area, snapshot, since_version, holds=None):
+    """JSON body with only the slots that changed after since_version."""
+    content = snapshot_content(area, snapshot, holds)
+    del content["slot_statuses"]
+    content["since_version"] = since_version
+    content["changed_slots"] = [
+        {"slot": i + 1, "occupied": is_occupied}
+        for i, (is_occupied, slot_version) in enumerate(zip(snapshot.statuses, snapshot.slot_versions))
+        if slot_version > since_version
+    ]
+    return content
+
+
+def area_zone(area_name: str):
+    """Campus zone from an area name's suffix, e.g. "WC" for "DTAR (WC)"."""
+    name = area_name.strip()
+    if name.endswith(')') and '(' in name:
+        return name[name.rfind('(') + 1:-1].strip() or None
+    return None
+
+
+@app.get("/api/parking/availability")
+def get_parking_availability_batch(request: Request, areas: str = ""):
+    """Availability for every area, or a comma-separated subset, in one response.
+
+    All areas come from the same snapshot dict, so the counts are consistent
+    with each other. Zones roll up areas by their "(WC)"/"(EC)" suffix.
+    """
+    try:
+        snapshots = area_snapshots  # One consistent view for the whole response
+        if areas.strip():
+            requested = [name.strip() for name in areas.split(',') if name.strip()]
+        else:
+            requested = list(AREA_CONFIGS.keys())
+
+        results = {}
+        unknown = []
+        for name in requested:
+            key = lookup_area(name)
+            if key is None:
+                unknown.append(name)
+                continue
+            snapshot = snapshots.get(key)
+            if snapshot is None:
+                error = area_camera_errors.get(key, "No occupancy data yet for this area")
+                results[key] = {"success": False, "area": key, "error": error}
+            else:
+                results[key] = snapshot_content(key, snapshot)
+
+        zones = {}
+        for key, content in results.items():
+            zone = area_zone(key)
+            if zone is None or not content["success"]:
+                continue
+            rollup = zones.setdefault(zone, {"zone": zone, "areas": [], "available": 0, "occupied": 0, "total": 0})
+            rollup["areas"].append(key)
+            rollup["available"] += content["available"]
+            rollup["occupied"] += content["occupied"]
+            rollup["total"] += content["total"]
+
+        # The ETag changes whenever any included area's version or holds change
+        versions = ",".join(f"{key}:{content.get('version', 0)}.{reservations.hold_state(key)[1]}"
+                            for key, content in results.items())
+        etag = f'"{SNAPSHOT_EPOCH}-{zlib.crc32(versions.encode()):08x}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+
+        content = {
+            "success": True,
+            "areas": results,
+            "zones": zones,
+            "available": sum(area["available"] for area in results.values() if area["success"]),
+            "timestamp": time.time()
+        }
+        if unknown:
+            content["unknown_areas"] = unknown
+        return JSONResponse(status_code=200, content=content, headers=headers)
+    except Exception as e:
+        print(f"Error in /api/parking/availability: {e}")
         traceback.print_exc()
         return JSONResponse(
+            status_code=200,
+            content={"success": False, "areas": {}, "zones": {}, "error": str(e)}
+        )
+
+
+@app.get("/api/parking/availability/{area}")
+def get_parking_availability(area: str, request: Request, since: str = None):
+    """Get parking availability for a specific area (for Flutter app).
+
+    Responses carry an ETag; a matching If-None-Match gets 304 with no body.
+    since is the "cursor" of an earlier response (or its ETag); only the
+    slots changed after it are returned. Versions restart with the process,
+    so the full list is sent when the cursor is from another process or is
+    ahead of the current version.
+    """
+    try:
+        if lookup_area(area) is None:
+            return JSONResponse(
                 status_code=200,
                 content={
                     "success": False,
@@ -701,9 +2209,43 @@ def get_parking_availability(area: str):
                     "available": 0,
                     "occupied": 0,
                     "empty": 0,
-                    "error": f"Analysis error: {str(e)}"
+                    "error": unknown_area_error(area)
                 }
             )
+
+        # Served from the monitor's latest snapshot; never touches the camera
+        snapshot = get_area_snapshot(area)
+        if snapshot is not None:
+            holds = reservations.hold_state(lookup_area(area))
+            etag = snapshot_etag(snapshot, hold_revision=holds[1])
+            headers = {"ETag": etag, "Cache-Control": "no-cache"}
+            if etag_matches(request, etag):
+                return Response(status_code=304, headers=headers)
+            cursor = parse_since(since) if since else None
+            if cursor is not None and cursor[0] == SNAPSHOT_EPOCH and cursor[1] <= snapshot.version:
+                content = snapshot_delta_content(area, snapshot, cursor[1], holds)
+            else:
+                content = snapshot_content(area, snapshot, holds)
+            content["cursor"] = snapshot_cursor(snapshot)
+            return JSONResponse(
+                status_code=200,
+                content=content,
+                headers=headers
+            )
+        
+        return JSONResponse(
+            status_code=200,
+            content={
+                "success": False,
+                "area": area,
+                "available": 0,
+                "occupied": 0,
+                "empty": 0,
+                "error": area_camera_errors.get(
+                    lookup_area(area), "No occupancy data yet for this area. Check that its camera is connected."),
+                "message": "Parking area has not been scanned yet"
+            }
+        )
     except Exception as e:
         print(f"Error in /api/parking/availability/{area}: {e}")
         import traceback
@@ -716,54 +2258,52 @@ def get_parking_availability(area: str):
                 "available": 0,
                 "occupied": 0,
                 "empty": 0,
-                "error": str(e)
-            }
-        )
-
-
-@app.post("/api/parking/assign")
-def assign_parking(request: AssignRequest):
-    """Assign a parking spot to user (for Flutter app)."""
-    try:
-        area = request.area
-        
-        if cap is None or not cap.isOpened():
-            return {
-                "success": False,
-                "error": "Camera not connected",
-                "assigned_spot": None
-            }
-        
-        success, frame = read_frame_safe()
-        if not success or frame is None:
-            return {
-                "success": False,
-                "error": "Failed to read frame",
-                "assigned_spot": None
-            }
-        
-        # Crop iVCam logo if needed
-        if frame.shape[0] > 100:
-            frame = frame[60:-40, :]
-        
-        if frame is None or frame.size == 0:
+                "error": str(e)
+            }
+        )
+
+
+@app.post("/api/parking/assign")
+def assign_parking(request: AssignRequest):
+    """Assign a parking spot to user (for Flutter app)."""
+    try:
+        area = request.area
+        if lookup_area(area) is None:
             return {
                 "success": False,
-                "error": "Invalid frame after crop",
+                "error": unknown_area_error(area),
                 "assigned_spot": None
             }
         
-        # Resize to match processing size
-        frame = cv2.resize(frame, (960, 540))
-        
-        occupied_count, empty_count, statuses = analyze_parking(frame, area_name=area)
+        snapshot = get_area_snapshot(area)
+        if snapshot is not None:
+            occupied_count, empty_count, statuses = snapshot.occupied, snapshot.empty, snapshot.statuses
+        else:
+            camera = get_area_camera(area)
+            if camera is None or not camera.isOpened():
+                return {
+                    "success": False,
+                    "error": "Camera not connected",
+                    "assigned_spot": None
+                }
+            
+            # Newest frame from the camera watching this area, cropped and resized
+            success, frame = read_area_frame(area)
+            if not success or frame is None:
+                return {
+                    "success": False,
+                    "error": "Failed to read frame",
+                    "assigned_spot": None
+                }
+            
+            occupied_count, empty_count, statuses = analyze_parking(frame, area_name=area)
         
-        # Find first available slot (indexed from 1)
-        assigned_spot = None
-        for i, is_occupied in enumerate(statuses):
-            if not is_occupied:
-                assigned_spot = str(i + 1)  # Slot numbers start from 1
-                break
+        # Find first available slot (indexed from 1) that nobody is holding
+        held = reservations.held_spots(lookup_area(area))
+        free = [str(i + 1) for i, is_occupied in enumerate(statuses)
+                if not is_occupied and str(i + 1) not in held]
+        assigned_spot = free[0] if free else None  # Slot numbers start from 1
+        empty_count = len(free)
         
         if assigned_spot is None:
             return {
@@ -792,101 +2332,75 @@ def assign_parking(request: AssignRequest):
 
 @app.post("/api/parking/reserve")
 def reserve_parking(request: ReserveRequest):
-    """Reserve a parking spot and return available parking count (for Flutter app)."""
+    """Reserve a parking spot and return available parking count (for Flutter app).
+
+    The spot is held in the bookings table until it is cancelled or the hold
+    expires, and held spots are never handed out twice.
+    """
     try:
         area = request.area
-        spot_number = request.spot_number  # Spot number from frontend (the displayed one)
-        
-        # Priority 1: Use the spot number passed from frontend (the one displayed to user)
-        # Priority 2: Use the assigned spot number from frozen_analysis (from Confirm button)
-        # This ensures we ALWAYS use the same spot number that was displayed
-        assigned_spot_no = None
-        occupied_count = 0
-        empty_count = 0
-        
-        # Get counts from frozen_analysis if available
-        try:
-            with frozen_frame_lock:
-                global frozen_analysis
-                if frozen_analysis is not None:
-                    # frozen_analysis is a tuple: (occupied_count, empty_count, statuses, assigned_spot_no)
-                    if len(frozen_analysis) == 4:
-                        occupied_count, empty_count, _, frozen_assigned_spot = frozen_analysis
-                    else:
-                        # Backward compatibility
-                        occupied_count, empty_count, statuses = frozen_analysis[:3]
-                        frozen_assigned_spot = None
-                        # Calculate assigned spot if not stored
-                        for i, is_occupied in enumerate(statuses):
-                            if not is_occupied:
-                                frozen_assigned_spot = str(i + 1)
-                                break
-                    
-                    # Priority 1: Use spot number from frontend (the displayed one)
-                    if spot_number and spot_number.strip():
-                        assigned_spot_no = spot_number.strip()
-                        print(f"DEBUG: Using spot number from frontend (displayed): {assigned_spot_no}")
-                    # Priority 2: Use spot number from frozen_analysis
-                    elif frozen_assigned_spot:
-                        assigned_spot_no = frozen_assigned_spot
-                        print(f"DEBUG: Using assigned spot from frozen_analysis: {assigned_spot_no}")
-        except Exception as e:
-            print(f"Warning: Error accessing frozen_analysis in /api/parking/reserve: {e}")
-            # Continue to fallback analysis
+        key = lookup_area(area)
+        if key is None:
+            return {
+                "success": False,
+                "error": unknown_area_error(area),
+                "available": 0,
+                "empty": 0
+            }
         
-        # If still no spot number, do a fresh analysis (fallback - should not happen in normal flow)
-        if assigned_spot_no is None:
-            print("DEBUG: No frozen_analysis found, doing fresh analysis")
-            if cap is None or not cap.isOpened():
+        snapshot = get_area_snapshot(area)
+        if snapshot is not None:
+            statuses = snapshot.statuses
+        else:
+            # No snapshot yet (fallback - should not happen in normal flow)
+            print("DEBUG: No snapshot for area, doing fresh analysis")
+            camera = get_area_camera(area)
+            if camera is None or not camera.isOpened():
                 return {
                     "success": False,
-                    "error": "Camera not connected. Please click 'Confirm' on backend console first.",
+                    "error": "Camera not connected",
                     "available": 0,
                     "empty": 0
                 }
             
-            success, frame = read_frame_safe()
+            # Newest frame from the camera watching this area, cropped and resized
+            success, frame = read_area_frame(area)
             if not success or frame is None:
                 return {
                     "success": False,
-                    "error": "Failed to read frame. Please click 'Confirm' on backend console first.",
-                    "available": 0,
-                    "empty": 0
-                }
-            
-            # Crop iVCam logo if needed
-            if frame.shape[0] > 100:
-                frame = frame[60:-40, :]
-            
-            if frame is None or frame.size == 0:
-                return {
-                    "success": False,
-                    "error": "Invalid frame after crop",
+                    "error": "Failed to read frame",
                     "available": 0,
                     "empty": 0
                 }
             
-            # Resize to match processing size
-            frame = cv2.resize(frame, (960, 540))
-            
             # Get parking status
-            occupied_count, empty_count, statuses = analyze_parking(frame, area_name=area)
-            
-            # Auto-assign first available parking spot number (1-14)
-            for i, is_occupied in enumerate(statuses):
-                if not is_occupied:
-                    assigned_spot_no = str(i + 1)  # Spot numbers start from 1
-                    break
+            _, _, statuses = analyze_parking(frame, area_name=area)
+        
+        # Prefer the spot number displayed to the user if it is still free
+        spot_number = request.spot_number.strip() if request.spot_number else ""
+        hold, free_count = reservations.reserve(key, statuses, request.user_id or None, spot_number or None)
+        if hold is None:
+            return {
+                "success": False,
+                "error": "No available parking spots",
+                "available": 0,
+                "empty": 0
+            }
+        if spot_number and hold.spot != spot_number:
+            print(f"DEBUG: Spot {spot_number} in {key} is taken, assigned {hold.spot} instead")
+        publish_hold_change(key)
         
         return {
             "success": True,
             "message": f"Parking status updated for {area}",
             "area": area,
-            "available": empty_count,
-            "empty": empty_count,  # Backend returns "empty", frontend displays as "available"
-            "occupied": occupied_count,
-            "total": len(get_parking_spaces_for_area(area)) if get_parking_spaces_for_area(area) else 14,
-            "assigned_spot_no": assigned_spot_no  # Use the spot number from frozen_analysis (same as displayed)
+            "available": free_count,
+            "empty": free_count,  # Backend returns "empty", frontend displays as "available"
+            "occupied": sum(1 for is_occupied in statuses if is_occupied),
+            "total": len(statuses),
+            "assigned_spot_no": hold.spot,  # Same spot number as displayed when still free
+            "booking_id": hold.booking_id,
+            "expires_at": hold.expires_at
         }
     except Exception as e:
         print(f"Error in /api/parking/reserve: {e}")
@@ -900,77 +2414,71 @@ def reserve_parking(request: ReserveRequest):
         }
 
 
-@app.get("/status")
-def status():
-    """Get current parking status counts."""
+@app.post("/api/parking/cancel")
+def cancel_parking(request: CancelRequest):
+    """Release a held spot by booking id, user id or spot number."""
     try:
-        # Check if we have frozen analysis results first (from confirm button)
-        try:
-            with frozen_frame_lock:
-                global frozen_analysis
-                if frozen_analysis is not None:
-                    # Use stored analysis results from when confirm was clicked
-                    # frozen_analysis is a tuple: (occupied_count, empty_count, statuses, assigned_spot_no)
-                    if len(frozen_analysis) == 4:
-                        occupied_count, empty_count, _, assigned_spot_no = frozen_analysis
-                    else:
-                        occupied_count, empty_count, _ = frozen_analysis[:3]
-                        assigned_spot_no = None
-                    
-                    result = {
-                        "occupied": occupied_count, 
-                        "empty": empty_count,
-                        "available": empty_count  # Available parking is same as empty
-                    }
-                    
-                    # Add assigned spot number if available
-                    if assigned_spot_no is not None:
-                        result["assigned_spot_no"] = assigned_spot_no
-                    
-                    return result
-        except Exception as e:
-            print(f"Warning: Error accessing frozen_analysis in /status: {e}")
-            # Continue to live camera fallback
-        
-        # If no frozen frame, use live camera
-        if cap is None or not cap.isOpened():
-            return {"occupied": 0, "empty": 0, "available": 0, "error": "Camera not connected"}
+        area = request.area
+        key = lookup_area(area)
+        if key is None:
+            return {"success": False, "error": unknown_area_error(area)}
         
-        success, frame = read_frame_safe()
-        if not success or frame is None:
-            return {"occupied": 0, "empty": 0, "available": 0, "error": "Failed to read frame"}
+        user_id = request.user_id.strip() or None
+        spot_number = request.spot_number.strip() or None
+        if request.booking_id is None and user_id is None and spot_number is None:
+            return JSONResponse(
+                status_code=400,
+                content={"success": False, "error": "booking_id, user_id or spot_number is required"}
+            )
         
-        # Crop iVCam logo if needed
-        try:
-            if len(frame.shape) >= 2 and frame.shape[0] > 100:
-                frame = frame[60:-40, :]
-        except Exception as e:
-            print(f"Error cropping frame in /status: {e}")
-            # Continue with original frame
+        released = reservations.cancel(key, booking_id=request.booking_id,
+                                       user_id=user_id, spot_number=spot_number)
+        if not released:
+            return {
+                "success": True,
+                "message": f"No active reservation to cancel for {area}",
+                "released": []
+            }
+        publish_hold_change(key)
+        return {
+            "success": True,
+            "message": f"Reservation cancelled for {area}",
+            "released": [{"booking_id": hold.booking_id, "spot_no": hold.spot} for hold in released]
+        }
+    except Exception as e:
+        print(f"Error in /api/parking/cancel: {e}")
+        traceback.print_exc()
+        return {"success": False, "error": str(e)}
+
+
+@app.get("/status")
+def status(request: Request):
+    """Get current parking status counts (ETag / If-None-Match aware)."""
+    try:
+        # Latest console snapshot from the occupancy monitor
+        snapshot = console_snapshot
+        if snapshot is None:
+            if cap is None or not cap.isOpened():
+                return {"occupied": 0, "empty": 0, "available": 0, "error": "Camera not connected"}
+            return {"occupied": 0, "empty": 0, "available": 0, "error": "No occupancy data yet"}
         
-        # Validate frame after crop
-        if frame is None or frame.size == 0 or len(frame.shape) < 2:
-            return {"occupied": 0, "empty": 0, "available": 0, "error": "Invalid frame after crop"}
+        result = {
+            "occupied": snapshot.occupied, 
+            "empty": snapshot.empty,
+            "available": snapshot.empty,  # Available parking is same as empty
+            "timestamp": snapshot.timestamp,
+            "version": snapshot.version
+        }
         
-        # Resize to match processing size
-        try:
-            frame = cv2.resize(frame, (960, 540))
-        except Exception as e:
-            print(f"Error resizing frame in /status: {e}")
-            return {"occupied": 0, "empty": 0, "available": 0, "error": f"Resize error: {str(e)}"}
+        # Add assigned spot number if available
+        if snapshot.assigned_spot_no is not None:
+            result["assigned_spot_no"] = snapshot.assigned_spot_no
         
-        try:
-            occupied_count, empty_count, _ = analyze_parking(frame)
-            return {
-                "occupied": occupied_count, 
-                "empty": empty_count,
-                "available": empty_count  # Available parking is same as empty
-            }
-        except Exception as e:
-            print(f"Error analyzing parking in /status: {e}")
-            import traceback
-            traceback.print_exc()
-            return {"occupied": 0, "empty": 0, "available": 0, "error": f"Analysis error: {str(e)}"}
+        etag = snapshot_etag(snapshot, scope="console-")
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(content=result, headers=headers)
     except Exception as e:
         print(f"Error in /status endpoint: {e}")
         import traceback
@@ -978,6 +2486,141 @@ def status():
         return {"occupied": 0, "empty": 0, "available": 0, "error": str(e)}
 
 
+@app.get("/api/parking/stats")
+def parking_stats():
+    """Counters for the incremental occupancy engine."""
+    with incremental_stats_lock:
+        stats = dict(incremental_stats)
+    stats["frames_analyzed"] = stats["frames"] - stats["frames_skipped"]
+    stats["slots_analyzed"] = stats["slots"] - stats["slots_skipped"]
+    return {"success": True, "incremental": stats, "history": occupancy_recorder.status(),
+            "reservations": reservations.status()}
+
+
+@app.get("/api/parking/history/{area}")
+def parking_history(area: str, at: float = None):
+    """Slot statuses of an area as recorded at a Unix time (default: now)."""
+    try:
+        key = lookup_area(area)
+        if key is None:
+            return {"success": False, "area": area, "error": unknown_area_error(area)}
+        at = time.time() if at is None else at
+        recorded = query_area_status_at(key, at)
+        slots = [
+            {"slot": slot_id, "status": status, "since": since}
+            for slot_id, (status, since) in sorted(recorded.items(), key=lambda item: int(item[0]))
+        ]
+        occupied_count = sum(1 for slot in slots if slot["status"] == "occupied")
+        return {
+            "success": True,
+            "area": key,
+            "at": at,
+            "slots": slots,
+            "occupied": occupied_count,
+            "available": len(slots) - occupied_count
+        }
+    except Exception as e:
+        print(f"Error in /api/parking/history/{area}: {e}")
+        traceback.print_exc()
+        return {"success": False, "area": area, "error": str(e)}
+
+
+@app.get("/api/parking/summary")
+def parking_summary(area: str = "", granularity: str = "hour", start: float = None, end: float = None):
+    """Utilization report from the rollup tables (default: hourly, last 24 hours).
+
+    Per area: one entry per bucket, overall peak / average free spots /
+    utilization, and per-slot usage (fraction of samples the slot was occupied).
+    """
+    try:
+        if granularity not in ROLLUP_GRANULARITIES:
+            return {"success": False, "error": f"granularity must be one of {', '.join(ROLLUP_GRANULARITIES)}"}
+        key = None
+        if area:
+            key = lookup_area(area)
+            if key is None:
+                return {"success": False, "area": area, "error": unknown_area_error(area)}
+        end = time.time() if end is None else end
+        start = end - 86400 if start is None else start
+        # Include the bucket that contains `start`
+        buckets, slots = query_utilization(key, granularity, rollup_bucket_start(start, granularity), end)
+
+        areas = {}
+        for row_area, bucket_start, samples, occupied_sum, free_sum, peak, min_free, total in buckets:
+            report = areas.setdefault(row_area, {
+                "buckets": [], "samples": 0, "occupied_sum": 0, "free_sum": 0,
+                "peak_occupied": 0, "min_free": None, "total": total, "slots": {}
+            })
+            report["buckets"].append({
+                "start": bucket_start,
+                "avg_occupied": occupied_sum / samples,
+                "avg_free": free_sum / samples,
+                "peak_occupied": peak,
+                "min_free": min_free,
+                "utilization": occupied_sum / (samples * total) if total else 0.0
+            })
+            report["samples"] += samples
+            report["occupied_sum"] += occupied_sum
+            report["free_sum"] += free_sum
+            report["peak_occupied"] = max(report["peak_occupied"], peak)
+            report["min_free"] = min_free if report["min_free"] is None else min(report["min_free"], min_free)
+            report["total"] = total
+        for row_area, slot_id, samples, occupied_samples in slots:
+            if row_area in areas and samples:
+                areas[row_area]["slots"][slot_id] = occupied_samples / samples
+
+        for report in areas.values():
+            samples = report.pop("samples")
+            occupied_sum = report.pop("occupied_sum")
+            free_sum = report.pop("free_sum")
+            report["avg_occupied"] = occupied_sum / samples
+            report["avg_free"] = free_sum / samples
+            total_samples = samples * report["total"]
+            report["utilization"] = occupied_sum / total_samples if total_samples else 0.0
+            report["slots"] = dict(sorted(report["slots"].items(), key=lambda item: int(item[0])))
+
+        return {
+            "success": True,
+            "granularity": granularity,
+            "start": start,
+            "end": end,
+            "areas": areas
+        }
+    except Exception as e:
+        print(f"Error in /api/parking/summary: {e}")
+        traceback.print_exc()
+        return {"success": False, "error": str(e)}
+
+
+@app.get("/api/parking/transitions")
+def parking_transitions(area: str = "", start: float = 0.0, end: float = None, limit: int = 1000):
+    """Recorded slot transitions between two Unix times, optionally for one area."""
+    try:
+        key = None
+        if area:
+            key = lookup_area(area)
+            if key is None:
+                return {"success": False, "area": area, "error": unknown_area_error(area)}
+        end = time.time() if end is None else end
+        limit = max(1, min(limit, 10000))
+        rows = query_transitions(key, start, end, limit)
+        return {
+            "success": True,
+            "area": key,
+            "start": start,
+            "end": end,
+            "transitions": [
+                {"area": row_area, "slot": slot_id, "status": status, "timestamp": recorded_at}
+                for row_area, slot_id, status, recorded_at in rows
+            ],
+            "truncated": len(rows) == limit
+        }
+    except Exception as e:
+        print(f"Error in /api/parking/transitions: {e}")
+        traceback.print_exc()
+        return {"success": False, "area": area, "error": str(e)}
+
+
 @app.post("/confirm")
 def confirm():
     """Confirm and return parking status for frontend."""
@@ -1060,19 +2703,15 @@ def confirm():
             # Use original frame if detection fails
             processed_frame = frame.copy()
         
-        # Auto-assign first available parking spot number (1-14)
-        assigned_spot_no = None
-        for i, is_occupied in enumerate(statuses):
-            if not is_occupied:
-                assigned_spot_no = str(i + 1)  # Spot numbers start from 1
-                break
+        # Publish the fresh result right away instead of waiting for the monitor
+        snapshot = publish_console_snapshot(statuses)
+        assigned_spot_no = snapshot.assigned_spot_no  # Auto-assigned first free spot (1-14)
         
         try:
             with frozen_frame_lock:
-                global frozen_frame, frozen_raw_frame, frozen_analysis
+                global frozen_frame, frozen_raw_frame
                 frozen_frame = processed_frame.copy()  # For display
                 frozen_raw_frame = raw_frame.copy()  # For re-analysis if needed
-                frozen_analysis = (occupied_count, empty_count, statuses, assigned_spot_no)  # Store analysis results including assigned spot
         except Exception as e:
             print(f"Error storing frozen frame in /confirm: {e}")
             # Continue even if storage fails
@@ -1457,8 +3096,17 @@ def console():
                     resetCamera();
                 });
                 
-                // Update status every 2 seconds
-                setInterval(updateStatus, 2000);
+                // Live updates pushed by the server; fall back to polling without EventSource
+                if (window.EventSource) {
+                    const events = new EventSource('/api/events?types=status');
+                    events.addEventListener('status', function(event) {
+                        const data = JSON.parse(event.data);
+                        document.getElementById('occupied-value').textContent = data.occupied || 0;
+                        document.getElementById('empty-value').textContent = data.empty || 0;
+                    });
+                } else {
+                    setInterval(updateStatus, 2000);
+                }
                 // Initial update
                 updateStatus();
             </script>
@@ -1493,142 +3141,329 @@ def console():
 # === Visitor QR Code Detection Variables ===
 visitor_qr_camera = None
 visitor_qr_camera_index = None
-visitor_qr_camera_lock = threading.Lock()
-scanned_qr_codes = {}  # Store scanned QR codes to prevent duplicate processing
-scanned_qr_lock = threading.Lock()
+QR_DEDUPE_WINDOW = 5.0  # Seconds a QR code is not reported again
+QR_DEDUPE_CAPACITY = 256  # Codes remembered at once; the oldest go first
+
+
+class QRDedupeCache:
+    """Fixed-capacity record of recently reported QR codes with time-based expiry.
+
+    Entries are kept oldest first, so expired ones are dropped from the front
+    and memory stays bounded however many distinct codes pass the gate.
+    """
+
+    def __init__(self, window=QR_DEDUPE_WINDOW, capacity=QR_DEDUPE_CAPACITY):
+        self.window = window
+        self.capacity = capacity
+        self.entries = OrderedDict()  # QR code -> time it was last reported
+        self.lock = threading.Lock()
+        self.reported = 0
+        self.suppressed = 0
+        self.evictions = 0
+
+    def should_report(self, qr_data, now=None):
+        """Return True for a code not reported in the last window and record it."""
+        now = time.time() if now is None else now
+        with self.lock:
+            while self.entries:
+                oldest, reported_at = next(iter(self.entries.items()))
+                if now - reported_at <= self.window:
+                    break
+                del self.entries[oldest]
+                self.evictions += 1
+            if qr_data in self.entries:
+                self.suppressed += 1
+                return False
+            if len(self.entries) >= self.capacity:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            self.entries[qr_data] = now
+            self.reported += 1
+            return True
+
+    def status(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "capacity": self.capacity,
+                "reported": self.reported,
+                "suppressed": self.suppressed,
+                "evictions": self.evictions
+            }
+
+
+scanned_qr_codes = QRDedupeCache()  # Store scanned QR codes to prevent duplicate processing
+
+# Store last scanned QR code for API access
+last_scanned_qr = None
+last_scanned_qr_time = 0
+last_scanned_qr_lock = threading.Lock()
 
 def init_visitor_qr_camera():
     """Initialize camera for visitor QR code scanning."""
     global visitor_qr_camera, visitor_qr_camera_index
-    # Try to use same camera as parking detection, or try different index
+    # Try to use same camera as parking detection, or try different index.
+    # Devices that are already open are shared through their capture thread.
     for idx in [0, 1, 2]:
-        try:
-            test_cap = cv2.VideoCapture(idx, cv2.CAP_DSHOW)
-            if test_cap.isOpened():
-                ret, _ = test_cap.read()
-                if ret:
-                    test_cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-                    test_cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-                    visitor_qr_camera = test_cap
-                    visitor_qr_camera_index = idx
-                    print(f"Visitor QR camera connected (index: {idx})")
-                    return True
-                test_cap.release()
-        except Exception as e:
-            print(f"Error testing camera {idx}: {e}")
-            continue
+        capture = get_camera_capture(idx)
+        if capture is not None:
+            visitor_qr_camera = capture
+            visitor_qr_camera_index = idx
+            print(f"Visitor QR camera connected (index: {idx})")
+            return True
     print("Warning: Could not initialize visitor QR camera")
     return False
 
 # Initialize visitor QR camera
 init_visitor_qr_camera()
 
-def detect_qr_code(frame):
-    """Detect QR codes in frame using ZBar (pyzbar) as primary, OpenCV as fallback."""
-    try:
-        # Try ZBar first (more accurate)
+# QR decoding keeps its detector between frames, searches a grayscale pyramid
+# from coarse to fine and looks around the last hit before the whole frame.
+QR_PYRAMID_MIN_WIDTH = 480  # Coarsest level searched
+QR_FULL_RES_INTERVAL = 3  # On misses, the full-resolution level is searched every Nth frame
+QR_ROI_TTL = 1.0  # Seconds the last hit's region is searched first
+QR_ROI_MARGIN = 0.5  # Region grows by this fraction of the code size on each side
+QR_ROI_MAX_WIDTH = 640  # Larger regions are downscaled before decoding
+
+
+class QRDecoder:
+    """QR code decoder with a persistent detector, pyramid search and ROI tracking.
+
+    ZBar is tried on every image it searches. OpenCV's multi-code detector is
+    slower, so after a ZBar miss it only runs on the tracked ROI and on the
+    finest pyramid level searched, which is where the old whole-frame
+    fallback found the codes ZBar missed.
+    """
+
+    def __init__(self):
+        self.detector = cv2.QRCodeDetector()
+        self.lock = threading.Lock()
+        self.roi = None  # (x0, y0, x1, y1) of the last hit in full-frame pixels
+        self.roi_time = 0.0
+        self.misses_in_row = 0
+        self.frames = 0
+        self.roi_hits = 0
+        self.pyramid_hits = 0
+        self.misses = 0
+        self.seconds = 0.0
+
+    def _decode_gray(self, gray, opencv_fallback=True):
+        """Decode one grayscale image; returns (data, points) in its own pixels.
+
+        With opencv_fallback False a ZBar miss is final; without ZBar OpenCV
+        always runs.
+        """
         if ZBAR_AVAILABLE and ZBAR_DECODE is not None:
             try:
-                # Convert BGR to RGB for pyzbar
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                decoded_objects = ZBAR_DECODE(rgb_frame)
-                
+                # pyzbar reads 8-bit grayscale directly
+                decoded_objects = ZBAR_DECODE(gray)
                 if decoded_objects:
-                    # Return first QR code found
                     qr_data = decoded_objects[0].data.decode('utf-8')
-                    # Get bounding box points
                     points = decoded_objects[0].polygon
                     if points:
-                        # Convert to numpy array format
-                        pts = np.array([(p.x, p.y) for p in points], dtype=np.int32)
-                        return qr_data, pts
+                        return qr_data, np.array([(p.x, p.y) for p in points], dtype=np.float32)
                     return qr_data, None
+                if not opencv_fallback:
+                    return None, None
             except Exception as zbar_error:
                 print(f"ZBar detection error: {zbar_error}, falling back to OpenCV")
-        
-        # Fallback to OpenCV QRCodeDetector
-        detector = cv2.QRCodeDetector()
-        retval, decoded_info, points, straight_qrcode = detector.detectAndDecodeMulti(frame)
-        
+        retval, decoded_info, points, _ = self.detector.detectAndDecodeMulti(gray)
         if retval and decoded_info:
             # Return first detected QR code
             for i, data in enumerate(decoded_info):
-                if data:  # Non-empty QR code data
-                    return data, points[i] if points is not None and i < len(points) else None
+                if data:
+                    return data, points[i].reshape(-1, 2) if points is not None and i < len(points) else None
         return None, None
-    except Exception as e:
-        print(f"Error detecting QR code: {e}")
-        traceback.print_exc()
+
+    def _search(self, gray, scale, offset=(0, 0), opencv_fallback=True):
+        """Decode gray and map the points back to full-frame pixels."""
+        qr_data, points = self._decode_gray(gray, opencv_fallback)
+        if qr_data and points is not None:
+            points = points * scale + offset
+        return qr_data, points
+
+    def _track(self, points, frame_shape):
+        if points is None:
+            return
+        x0, y0 = points.min(axis=0)
+        x1, y1 = points.max(axis=0)
+        margin_x = (x1 - x0) * QR_ROI_MARGIN
+        margin_y = (y1 - y0) * QR_ROI_MARGIN
+        self.roi = (
+            max(0, int(x0 - margin_x)), max(0, int(y0 - margin_y)),
+            min(frame_shape[1], int(x1 + margin_x)), min(frame_shape[0], int(y1 + margin_y))
+        )
+        self.roi_time = time.time()
+
+    def decode(self, frame):
+        """Return (qr_data, points) for the first QR code in a BGR frame, or (None, None)."""
+        started = time.perf_counter()
+        with self.lock:
+            try:
+                result = self._decode(frame)
+            except Exception as e:
+                print(f"Error detecting QR code: {e}")
+                traceback.print_exc()
+                result = (None, None)
+            self.frames += 1
+            self.seconds += time.perf_counter() - started
+        return result
+
+    def _decode(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+        # 1. Region around the last hit
+        if self.roi is not None and time.time() - self.roi_time < QR_ROI_TTL:
+            x0, y0, x1, y1 = self.roi
+            region = gray[y0:y1, x0:x1]
+            if region.size:
+                scale = max(1.0, region.shape[1] / QR_ROI_MAX_WIDTH)
+                if scale > 1.0:
+                    region = cv2.resize(region, None, fx=1 / scale, fy=1 / scale, interpolation=cv2.INTER_AREA)
+                qr_data, points = self._search(region, scale, (x0, y0))
+                if qr_data:
+                    self.roi_hits += 1
+                    self._track(points, gray.shape)
+                    return qr_data, points
+        else:
+            self.roi = None
+
+        # 2. Pyramid from the coarsest level to full resolution
+        levels = [(gray, 1.0)]
+        while levels[-1][0].shape[1] // 2 >= QR_PYRAMID_MIN_WIDTH:
+            levels.append((cv2.pyrDown(levels[-1][0]), levels[-1][1] * 2))
+        levels.reverse()
+        if len(levels) > 1 and self.misses_in_row % QR_FULL_RES_INTERVAL:
+            levels.pop()
+        for i, (level, scale) in enumerate(levels):
+            qr_data, points = self._search(level, scale, opencv_fallback=i == len(levels) - 1)
+            if qr_data:
+                self.pyramid_hits += 1
+                self.misses_in_row = 0
+                self._track(points, gray.shape)
+                return qr_data, points
+
+        self.misses += 1
+        self.misses_in_row += 1
         return None, None
 
-def generate_visitor_qr_frames():
-    """Generate video stream with QR code detection overlay."""
-    if visitor_qr_camera is None or not visitor_qr_camera.isOpened():
-        error_frame = np.zeros((480, 640, 3), dtype=np.uint8)
-        cv2.putText(error_frame, "Camera not connected!", (50, 240),
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-        ret, buffer = cv2.imencode('.jpg', error_frame)
-        if ret:
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-        return
+    def status(self):
+        with self.lock:
+            return {
+                "frames": self.frames,
+                "roi_hits": self.roi_hits,
+                "pyramid_hits": self.pyramid_hits,
+                "misses": self.misses,
+                "tracking": self.roi is not None,
+                "avg_ms": round(self.seconds / self.frames * 1000, 2) if self.frames else None
+            }
+
+
+qr_decoder = QRDecoder()
+
+
+def detect_qr_code(frame):
+    """Detect QR codes in frame using ZBar (pyzbar) as primary, OpenCV as fallback."""
+    return qr_decoder.decode(frame)
+
+# A detection worker decodes the newest visitor camera frame at its own rate
+# and publishes the result; the video stream only draws the latest result, so
+# decode time never limits the display frame rate or scales with viewers.
+QR_DETECT_INTERVAL = 0.1  # Seconds between QR decodes (10 per second)
+QR_OVERLAY_TTL = 0.5  # Seconds a detection stays drawn on the stream
+
+QRDetection = namedtuple('QRDetection', ['qr_data', 'points', 'frame_shape', 'timestamp'])
+latest_qr_detection = QRDetection(None, None, None, 0.0)
+
+
+def detect_visitor_qr(frame):
+    """Decode one visitor camera frame and publish the result."""
+    global latest_qr_detection
+    # Crop out iVCam logo if present
+    if frame.shape[0] > 100:
+        frame = frame[60:-40, :]
+    
+    qr_data, qr_points = detect_qr_code(frame)
+    current_time = time.time()
+    latest_qr_detection = QRDetection(qr_data, qr_points, frame.shape[:2], current_time)
     
+    if qr_data:
+        # Update last scanned QR for API access (detection only, no auto-processing)
+        # New QR code or old one (>5 seconds), update for display
+        if scanned_qr_codes.should_report(qr_data, current_time):
+            # Update last scanned QR for API access
+            with last_scanned_qr_lock:
+                global last_scanned_qr, last_scanned_qr_time
+                last_scanned_qr = qr_data
+                last_scanned_qr_time = current_time
+            event_hub.publish("qr", {"qr_code": qr_data, "timestamp": current_time})
+
+
+def visitor_qr_detect_loop():
+    """Decode each new visitor camera frame, at most once per QR_DETECT_INTERVAL."""
+    last_sequence = 0
     while True:
+        started = time.time()
         try:
-            with visitor_qr_camera_lock:
-                if visitor_qr_camera is None or not visitor_qr_camera.isOpened():
-                    break
-                success, frame = visitor_qr_camera.read()
-                if not success or frame is None:
-                    break
-                
-                # Crop out iVCam logo if present
-                if frame.shape[0] > 100:
-                    frame = frame[60:-40, :]
-                
-                # Resize for display
-                display_frame = cv2.resize(frame.copy(), (960, 540))
-                
-                # Detect QR code
-                qr_data, qr_points = detect_qr_code(frame)
-                
-                if qr_data:
-                    # Draw QR code bounding box
-                    if qr_points is not None:
-                        pts = qr_points.astype(int)
-                        # Scale points to display size
-                        scale_x = 960 / frame.shape[1]
-                        scale_y = 540 / frame.shape[0]
-                        pts_scaled = (pts * [scale_x, scale_y]).astype(int)
-                        cv2.polylines(display_frame, [pts_scaled], True, (0, 255, 0), 3)
-                    
-                    # Display QR code data
-                    cv2.putText(display_frame, f"QR: {qr_data}", (10, 30),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                    
-                    # Update last scanned QR for API access (detection only, no auto-processing)
-                    current_time = time.time()
-                    with scanned_qr_lock:
-                        if qr_data not in scanned_qr_codes or (current_time - scanned_qr_codes[qr_data]) > 5:
-                            # New QR code or old one (>5 seconds), update for display
-                            scanned_qr_codes[qr_data] = current_time
-                            # Update last scanned QR for API access
-                            with last_scanned_qr_lock:
-                                global last_scanned_qr, last_scanned_qr_time
-                                last_scanned_qr = qr_data
-                                last_scanned_qr_time = current_time
-            
-            # Encode frame
-            ret, buffer = cv2.imencode('.jpg', display_frame)
-            if not ret:
+            if visitor_qr_camera is None or not visitor_qr_camera.isOpened():
+                time.sleep(1.0)
                 continue
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-            
-            time.sleep(0.033)  # ~30 FPS
+            entry = visitor_qr_camera.wait_for_frame(last_sequence, timeout=1.0)
+            if entry is not None and time.time() - entry[1] <= STALE_FRAME_SECONDS:
+                last_sequence = entry[0]
+                detect_visitor_qr(entry[2])
         except Exception as e:
-            print(f"Error in visitor QR frame generation: {e}")
-            break
+            print(f"Error in visitor QR detection: {e}")
+            traceback.print_exc()
+        time.sleep(max(0.0, QR_DETECT_INTERVAL - (time.time() - started)))
+
+
+visitor_qr_detect_thread = threading.Thread(
+    target=visitor_qr_detect_loop, name="visitor-qr-detect", daemon=True)
+
+
+def render_visitor_qr_frame():
+    """Render one visitor gate frame with the latest QR detection drawn on it."""
+    if visitor_qr_camera is None or not visitor_qr_camera.isOpened():
+        return None
+    success, frame = visitor_qr_camera.read()
+    if not success or frame is None:
+        return None
+    
+    # Crop out iVCam logo if present
+    if frame.shape[0] > 100:
+        frame = frame[60:-40, :]
+    
+    # Resize for display
+    display_frame = cv2.resize(frame, (960, 540))
+    
+    detection = latest_qr_detection
+    if detection.qr_data and time.time() - detection.timestamp <= QR_OVERLAY_TTL:
+        # Draw QR code bounding box
+        if detection.points is not None:
+            pts = detection.points.astype(int)
+            # Scale points to display size
+            scale_x = 960 / detection.frame_shape[1]
+            scale_y = 540 / detection.frame_shape[0]
+            pts_scaled = (pts * [scale_x, scale_y]).astype(int)
+            cv2.polylines(display_frame, [pts_scaled], True, (0, 255, 0), 3)
+        
+        # Display QR code data
+        cv2.putText(display_frame, f"QR: {detection.qr_data}", (10, 30),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+    
+    return display_frame
+
+
+visitor_qr_broadcaster = FrameBroadcaster("visitor-qr", render_visitor_qr_frame)
+
+
+def generate_visitor_qr_frames():
+    """Generate video stream with QR code detection overlay."""
+    if visitor_qr_camera is None or not visitor_qr_camera.isOpened():
+        yield from error_frame_stream([("Camera not connected!", (50, 240), 1)])
+        return
+    yield from visitor_qr_broadcaster.stream()
 
 @app.get("/visitor-qr", response_class=HTMLResponse)
 def visitor_qr():
@@ -1813,8 +3648,20 @@ def visitor_qr():
                     });
             }
             
-            // Auto-check every 2 seconds
-            setInterval(checkQRStatus, 2000);
+            // Re-check when the server pushes a QR detection; fall back to polling without EventSource
+            let qrExpiryTimer = null;
+            if (window.EventSource) {
+                const events = new EventSource('/api/events?types=qr');
+                events.addEventListener('qr', function() {
+                    checkQRStatus();
+                    // Detections expire after 30 seconds on the server
+                    clearTimeout(qrExpiryTimer);
+                    qrExpiryTimer = setTimeout(checkQRStatus, 31000);
+                });
+            } else {
+                setInterval(checkQRStatus, 2000);
+            }
+            checkQRStatus();
         </script>
     </body>
     </html>
@@ -1824,7 +3671,6 @@ def visitor_qr():
 # === Car Plate Detection Variables ===
 car_plate_camera = None
 car_plate_camera_index = None
-car_plate_camera_lock = threading.Lock()
 last_detected_plate = None
 last_detected_plate_time = 0
 last_detected_plate_lock = threading.Lock()
@@ -1834,59 +3680,29 @@ def init_car_plate_camera():
     global car_plate_camera, car_plate_camera_index
     print("[Car Plate Camera] Initializing camera...")
     
-    # If camera is already initialized and working, don't reinitialize
-    if car_plate_camera is not None and car_plate_camera.isOpened():
-        try:
-            # Test if we can read a frame
-            ret, _ = car_plate_camera.read()
-            if ret:
-                print(f"[Car Plate Camera] Camera already initialized and working (index: {car_plate_camera_index})")
-                return True
-        except:
-            pass
+    # If camera is already initialized and working, don't reinitialize
+    if car_plate_camera is not None and car_plate_camera.isOpened():
+        print(f"[Car Plate Camera] Camera already initialized and working (index: {car_plate_camera_index})")
+        return True
     
-    # Try to use same camera as parking detection first (share the camera object)
+    # Try to use same camera as parking detection first (share its capture thread)
     if cap is not None and cap.isOpened():
-        try:
-            # Test if we can read from it
-            ret, _ = cap.read()
-            if ret:
-                car_plate_camera = cap
-                car_plate_camera_index = camera_index
-                print(f"[Car Plate Camera] ✓ Using same camera as parking detection (index: {camera_index})")
-                return True
-        except Exception as e:
-            print(f"[Car Plate Camera] Parking camera exists but error reading: {e}")
+        car_plate_camera = cap
+        car_plate_camera_index = camera_index
+        print(f"[Car Plate Camera] ✓ Using same camera as parking detection (index: {camera_index})")
+        return True
     
     # Otherwise, try to find a camera
     print("[Car Plate Camera] Searching for available camera...")
     for idx in [0, 1, 2]:
-        try:
-            print(f"[Car Plate Camera] Trying camera index {idx}...")
-            test_cap = cv2.VideoCapture(idx, cv2.CAP_DSHOW)
-            if test_cap.isOpened():
-                ret, test_frame = test_cap.read()
-                if ret and test_frame is not None:
-                    test_cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-                    test_cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-                    # Release old camera if exists
-                    if car_plate_camera is not None:
-                        try:
-                            car_plate_camera.release()
-                        except:
-                            pass
-                    car_plate_camera = test_cap
-                    car_plate_camera_index = idx
-                    print(f"[Car Plate Camera] ✓ Camera connected successfully (index: {idx})")
-                    return True
-                else:
-                    print(f"[Car Plate Camera] Camera {idx} opened but failed to read frame")
-                    test_cap.release()
-            else:
-                print(f"[Car Plate Camera] Camera {idx} could not be opened")
-        except Exception as e:
-            print(f"[Car Plate Camera] Error testing camera {idx}: {e}")
-            continue
+        print(f"[Car Plate Camera] Trying camera index {idx}...")
+        capture = get_camera_capture(idx)
+        if capture is not None:
+            car_plate_camera = capture
+            car_plate_camera_index = idx
+            print(f"[Car Plate Camera] ✓ Camera connected successfully (index: {idx})")
+            return True
+        print(f"[Car Plate Camera] Camera {idx} could not be opened")
     
     print("[Car Plate Camera] ✗ WARNING: Could not initialize car plate camera")
     print("[Car Plate Camera] Make sure iVCam is running and connected")
@@ -1896,114 +3712,345 @@ def init_car_plate_camera():
 # Don't initialize at startup to avoid conflicts
 print("[Car Plate Camera] Camera will be initialized when video feed is accessed")
 
-def detect_car_plate(frame):
-    """Detect car plate number from frame using EasyOCR."""
-    global easyocr_reader, EASYOCR_AVAILABLE, easyocr_init_error
-    try:
-        # Lazy initialization - try to load EasyOCR if not already loaded
-        if easyocr_reader is None:
-            print("[Car Plate Detection] EasyOCR not initialized, attempting to load...")
-            easyocr_reader, EASYOCR_AVAILABLE = _try_load_easyocr()
-        
-        if not EASYOCR_AVAILABLE or easyocr_reader is None:
-            error_msg = easyocr_init_error or "EasyOCR not available"
-            print(f"[Car Plate Detection] {error_msg}")
-            return None
-        
-        # Try multiple preprocessing methods - start with original frame first
-        images_to_try = []
-        
-        # 1. Original frame (try this first - often works best)
-        images_to_try.append(("original", frame))
-        
-        # 2. Grayscale
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        images_to_try.append(("grayscale", gray))
-        
-        # 3. Enhanced contrast (CLAHE)
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-        enhanced = clahe.apply(gray)
-        images_to_try.append(("enhanced", enhanced))
-        
-        # 4. Thresholded
-        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        images_to_try.append(("threshold", thresh))
-        
-        # 5. Adaptive threshold
-        adaptive_thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
-        images_to_try.append(("adaptive", adaptive_thresh))
-        
-        all_candidates = []
-        
-        # Try OCR on each preprocessed image
-        for method_name, img in images_to_try:
-            try:
-                results = easyocr_reader.readtext(img, paragraph=False)
-                print(f"[Car Plate Detection] Method: {method_name}, Found {len(results)} text regions")
-                
-                for (bbox, text, confidence) in results:
-                    # Keep original text for display, but also create cleaned version
-                    original_text = text.strip().upper()
-                    # Clean text: keep only alphanumeric and spaces
-                    cleaned_text = ''.join(c.upper() if c.isalnum() or c.isspace() else '' for c in text).strip()
-                    # Remove extra spaces
-                    cleaned_text = ' '.join(cleaned_text.split())
-                    
-                    # Debug: print ALL detected text
-                    print(f"  - Detected: '{text}' -> '{cleaned_text}' (confidence: {confidence:.3f})")
-                    
-                    # Very permissive: accept ANY text that has both letters AND numbers
-                    # This is the key requirement for license plates
-                    has_letter = any(c.isalpha() for c in cleaned_text)
-                    has_digit = any(c.isdigit() for c in cleaned_text)
-                    
-                    # Accept if it has both letters and numbers (license plate requirement)
-                    if has_letter and has_digit:
-                        # Accept text with 3-12 characters (very permissive)
-                        if len(cleaned_text.replace(' ', '')) >= 3 and len(cleaned_text.replace(' ', '')) <= 12:
-                            # Accept with very low confidence threshold (0.1)
-                            if confidence > 0.1:
-                                all_candidates.append((cleaned_text, confidence, method_name, original_text))
-                                print(f"    ✓ ACCEPTED: '{cleaned_text}' (confidence: {confidence:.3f}, method: {method_name})")
-            except Exception as e:
-                print(f"Error processing {method_name} image: {e}")
-                traceback.print_exc()
-                continue
-        
-        # Return the highest confidence result
-        if all_candidates:
-            # Sort by confidence (highest first)
-            all_candidates.sort(key=lambda x: x[1], reverse=True)
-            detected_plate, confidence, method, original = all_candidates[0]
-            print(f"[Car Plate Detection] ✓ SUCCESS! Selected: '{detected_plate}' (confidence: {confidence:.3f}, method: {method})")
-            
-            # Format the plate nicely: "ABC 1234" style
-            # Remove all spaces first
-            plate_no_spaces = detected_plate.replace(' ', '').replace('-', '')
-            
-            # Try to format as "ABC 1234" if it has at least 6 characters
-            if len(plate_no_spaces) >= 6:
-                # Check if first 3 are letters and rest are numbers
-                if plate_no_spaces[:3].isalpha() and plate_no_spaces[3:].isdigit():
-                    formatted = plate_no_spaces[:3] + ' ' + plate_no_spaces[3:]
-                    return formatted
-                # Or try to split at any point where letters end and numbers begin
-                for i in range(2, min(5, len(plate_no_spaces))):
-                    if plate_no_spaces[:i].isalpha() and plate_no_spaces[i:].isdigit():
-                        formatted = plate_no_spaces[:i] + ' ' + plate_no_spaces[i:]
-                        return formatted
-            
-            # If formatting doesn't work, return the cleaned text as-is
-            return detected_plate
+# === Car plate OCR worker pool ===
+# EasyOCR takes seconds per frame and holds the GIL, so it runs in separate
+# worker processes. Each worker is its own single-process executor that loads
+# the model once, so a hung job only costs that worker a restart while scans
+# on the other workers carry on. Jobs are awaited from async handlers, so the
+# event loop keeps serving other requests during a scan.
+OCR_WORKERS = max(1, min(4, (os.cpu_count() or 2) // 2))  # Each worker holds its own model in memory
+OCR_JOB_TIMEOUT = 30.0  # Seconds per plate recognition job
+OCR_STARTUP_TIMEOUT = 180.0  # Loading the model plus the warm-up inference
+OCR_READY_WAIT = 5.0  # A scan waits this long for a loading reader before giving up
+
+
+class OcrPoolNotReady(Exception):
+    """No OCR worker has a loaded model to take the job."""
+
+
+class OcrWorker:
+    """One OCR worker process and its readiness."""
+
+    def __init__(self, index):
+        self.index = index
+        self.executor = None
+        self.pid = None  # Reported by the worker's warm-up job
+        self.ready = False
+        self.warming = False  # A warm-up job is loading the model in this worker
+        self.in_flight = 0
+        self.restarts = 0
+
+    def status(self):
+        return {
+            "pid": self.pid,
+            "ready": self.ready,
+            "warming": self.warming,
+            "in_flight": self.in_flight,
+            "restarts": self.restarts
+        }
+
+
+class PlateOcrPool:
+    """Plate OCR workers with per-job timeouts and a warm-up readiness state.
+
+    state is "idle" before the first warm-up, then "loading", "ready" or
+    "failed". The pool is ready once every worker process has loaded the
+    model and reported its pid. After that it stays ready while any worker
+    is, and goes back to "loading" while every worker is reloading after a
+    restart.
+    """
+
+    def __init__(self, workers=OCR_WORKERS):
+        self.workers = [OcrWorker(index) for index in range(workers)]
+        self.lock = threading.Lock()
+        self.state = "idle"
+        self.error = None
+        self.timings = {}
+        self.ready_event = threading.Event()
+        self.jobs = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.restarts = 0
+
+    def _get_executor(self, worker):
+        # Caller holds self.lock
+        if worker.executor is None:
+            # spawn on every platform: forking a process with camera threads is unsafe
+            worker.executor = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=plate_ocr.init_worker
+            )
+        return worker.executor
+
+    def start_warm_up(self):
+        """Load the model in every worker in the background (only one warm-up at a time)."""
+        with self.lock:
+            if self.state == "loading":
+                return
+            self.state = "loading"
+            self.error = None
+            self.timings = {"started_at": time.time()}
+            self.ready_event.clear()
+        threading.Thread(target=self._warm_up, name="ocr-warm-up", daemon=True).start()
+
+    def _warm_up_worker(self, worker, deadline):
+        """Run the warm-up job on one worker; returns its result dict."""
+        with self.lock:
+            worker.ready = False
+            worker.warming = True
+            executor = self._get_executor(worker)
+        try:
+            future = executor.submit(plate_ocr.warm_up)
+            result = future.result(timeout=max(0.0, deadline - time.time()))
+        except Exception as e:
+            result = {"ready": False, "pid": None, "error": f"{type(e).__name__}: {e}"}
+            if isinstance(e, (FuturesTimeoutError, BrokenProcessPool)):
+                with self.lock:
+                    worker.warming = False
+                self._restart(worker, executor, warm_up=False)
+        with self.lock:
+            worker.warming = False
+            worker.pid = result.get("pid")
+            worker.ready = bool(result["ready"]) and worker.executor is executor
+        return result
+
+    def _rewarm_worker(self, worker):
+        """Reload the model in a restarted worker, then update the pool state."""
+        result = self._warm_up_worker(worker, time.time() + OCR_STARTUP_TIMEOUT)
+        with self.lock:
+            if not result["ready"]:
+                self.error = result["error"]
+            self._refresh_state()
+        print(f"[OCR Pool] Worker {worker.index} "
+              + ("ready again" if result["ready"] else f"failed to reload: {result['error']}"))
+
+    def _refresh_state(self):
+        # Caller holds self.lock; only after the first warm-up has finished
+        if self.state not in ("ready", "loading") or "finished_at" not in self.timings:
+            return
+        if any(worker.ready for worker in self.workers):
+            if self.state == "loading":
+                self.timings["finished_at"] = time.time()
+            self.state = "ready"
+            self.ready_event.set()
+        elif any(worker.warming for worker in self.workers):
+            self.state = "loading"
+            self.timings["started_at"] = time.time()
+            self.ready_event.clear()
         else:
-            print("[Car Plate Detection] ✗ FAILED: No text with both letters AND numbers found")
-            print("[Car Plate Detection] Make sure the plate is clearly visible with both letters and numbers")
+            self.state = "failed"
+            self.ready_event.set()
+
+    def _warm_up(self):
+        started = self.timings["started_at"]
+        deadline = started + OCR_STARTUP_TIMEOUT
+        # Each worker gets exactly one warm-up job, so every process loads the model
+        with ThreadPoolExecutor(max_workers=len(self.workers)) as waiters:
+            results = list(waiters.map(lambda worker: self._warm_up_worker(worker, deadline), self.workers))
+        failed = [result for result in results if not result["ready"]]
+        pids = {result.get("pid") for result in results if result["ready"]}
+        with self.lock:
+            self.timings = {
+                "started_at": started,
+                "finished_at": time.time(),
+                "total_seconds": time.time() - started,
+                "load_seconds": max((r.get("load_seconds") or 0.0) for r in results),
+                "warmup_seconds": max((r.get("warmup_seconds") or 0.0) for r in results)
+            }
+            ready = not failed and len(pids) == len(self.workers)
+            self.state = "ready" if ready else "failed"
+            self.error = None if ready else (failed[0]["error"] if failed else "OCR workers did not all report")
+            self.ready_event.set()
+        print(f"[OCR Pool] Reader {self.state} after {self.timings['total_seconds']:.1f}s"
+              f" ({len(pids)}/{len(self.workers)} workers)"
+              + (f": {self.error}" if self.error else ""))
+
+    async def wait_ready(self, timeout=OCR_READY_WAIT):
+        """Wait briefly for a loading reader; returns the resulting state."""
+        if self.state == "idle":
+            self.start_warm_up()
+        deadline = time.time() + timeout
+        while not self.ready_event.is_set() and time.time() < deadline:
+            await asyncio.sleep(0.1)
+        return self.state
+
+    def _restart(self, worker, executor, warm_up=True):
+        """Replace one worker whose job hung or whose process died."""
+        with self.lock:
+            # A worker still loading the model is left to its warm-up deadline
+            if worker.executor is not executor or worker.warming:
+                return
+            worker.executor = None
+            worker.ready = False
+            worker.pid = None
+            worker.restarts += 1
+            self.restarts += 1
+            if warm_up:
+                # Marked before the thread starts so no job is routed here meanwhile
+                worker.warming = True
+                self._refresh_state()
+        # shutdown() cannot interrupt a running job, so stop the process directly
+        processes = list((getattr(executor, '_processes', None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+        if warm_up:
+            # The new process loads the model again before taking scans
+            threading.Thread(
+                target=self._rewarm_worker, args=(worker,),
+                name=f"ocr-warm-up-{worker.index}", daemon=True).start()
+
+    def _pick_worker(self):
+        # Caller holds self.lock; least busy ready worker, or None while none is
+        ready = [worker for worker in self.workers if worker.ready]
+        return min(ready, key=lambda worker: worker.in_flight) if ready else None
+
+    async def run(self, func, *args, timeout=OCR_JOB_TIMEOUT):
+        """Run func(*args) in a worker and await the result.
+
+        Raises asyncio.TimeoutError if the job does not finish in time; only
+        the worker running it is restarted, so it does not block later jobs.
+        Raises OcrPoolNotReady at once if no worker has the model loaded,
+        rather than queueing the job behind a warm-up.
+        """
+        with self.lock:
+            worker = self._pick_worker()
+            if worker is None:
+                raise OcrPoolNotReady("Car plate reader is reloading. Please try again shortly.")
+            executor = self._get_executor(worker)
+            worker.in_flight += 1
+        loop = asyncio.get_running_loop()
+        self.jobs += 1
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(executor, func, *args), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            print(f"[OCR Pool] Job timed out after {timeout:.1f}s, restarting worker {worker.index}")
+            self._restart(worker, executor)
+            raise
+        except BrokenProcessPool:
+            self.failures += 1
+            print(f"[OCR Pool] Worker {worker.index} died, restarting it")
+            self._restart(worker, executor)
+            raise
+        finally:
+            with self.lock:
+                worker.in_flight -= 1
+
+    def status(self):
+        with self.lock:
+            return {
+                "state": self.state,
+                "error": self.error,
+                "timings": self.timings,
+                "workers": len(self.workers),
+                "ready_workers": sum(1 for worker in self.workers if worker.ready),
+                "worker_status": [worker.status() for worker in self.workers],
+                "running": any(worker.executor is not None for worker in self.workers),
+                "jobs": self.jobs,
+                "timeouts": self.timeouts,
+                "failures": self.failures,
+                "restarts": self.restarts
+            }
+
+
+plate_ocr_pool = PlateOcrPool()
+
+# Hit rates of the OCR preprocessing variants, collected from every scan. The
+# cascade tries variants with the most hits per second of OCR time first.
+OCR_ADAPTIVE_ORDER = True
+OCR_VARIANT_MIN_ATTEMPTS = 10  # Keep the default order until this many variant attempts are recorded
+ocr_variant_stats = {name: {"attempts": 0, "hits": 0, "seconds": 0.0} for name in plate_ocr.PLATE_VARIANTS}
+ocr_variant_stats_lock = threading.Lock()
+
+
+def record_ocr_variants(attempts):
+    """Fold the (variant, seconds, hit) list returned by a scan into the stats."""
+    with ocr_variant_stats_lock:
+        for name, seconds, hit in attempts:
+            stats = ocr_variant_stats.setdefault(name, {"attempts": 0, "hits": 0, "seconds": 0.0})
+            stats["attempts"] += 1
+            stats["hits"] += int(hit)
+            stats["seconds"] += seconds
+
+
+def ocr_variant_order():
+    """Cascade order for the next scan."""
+    if not OCR_ADAPTIVE_ORDER:
+        return list(plate_ocr.PLATE_VARIANTS)
+    with ocr_variant_stats_lock:
+        stats = {name: dict(ocr_variant_stats[name]) for name in plate_ocr.PLATE_VARIANTS}
+    tried = [s for s in stats.values() if s["attempts"]]
+    if sum(s["attempts"] for s in tried) < OCR_VARIANT_MIN_ATTEMPTS:
+        return list(plate_ocr.PLATE_VARIANTS)
+    # Variants that early exits never reached are assumed to cost the average
+    mean_seconds = sum(s["seconds"] for s in tried) / sum(s["attempts"] for s in tried)
+
+    def score(name):
+        s = stats[name]
+        seconds = s["seconds"] / s["attempts"] if s["attempts"] else mean_seconds
+        # Smoothed hit rate per second of OCR; default position breaks ties
+        return -((s["hits"] + 1) / (s["attempts"] + 2)) / (seconds + 1e-3)
+
+    return sorted(plate_ocr.PLATE_VARIANTS, key=lambda name: (score(name), plate_ocr.PLATE_VARIANTS.index(name)))
+
+
+def ocr_variant_status():
+    with ocr_variant_stats_lock:
+        return {
+            name: {
+                "attempts": s["attempts"],
+                "hits": s["hits"],
+                "hit_rate": s["hits"] / s["attempts"] if s["attempts"] else None,
+                "avg_seconds": s["seconds"] / s["attempts"] if s["attempts"] else None
+            }
+            for name, s in ocr_variant_stats.items()
+        }
+
+
+def render_car_plate_frame():
+    """Render one car plate gate frame with the last detected plate overlay."""
+    if car_plate_camera is None or not car_plate_camera.isOpened():
+        # Try to reinitialize
+        init_car_plate_camera()
+        if car_plate_camera is None or not car_plate_camera.isOpened():
             return None
-            
-    except Exception as e:
-        print(f"Error detecting car plate: {e}")
-        traceback.print_exc()
+    
+    success, frame = car_plate_camera.read()
+    if not success or frame is None:
+        print("[Car Plate Video Feed] Failed to read frame, retrying...")
         return None
+    
+    # Crop out iVCam logo if present
+    if frame.shape[0] > 100:
+        frame = frame[60:-40, :]
+    
+    # Resize for display
+    display_frame = cv2.resize(frame, (960, 540))
+    
+    # Don't run OCR on every frame - it's too slow
+    # Only show the camera feed, OCR will run when scan button is clicked
+    # Draw instruction text on frame
+    cv2.putText(display_frame, "Point camera at car plate", (10, 30),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    cv2.putText(display_frame, "Click 'Scan Car Plate' to detect", (10, 60),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    
+    # Show last detected plate if available (from scan button)
+    with last_detected_plate_lock:
+        if last_detected_plate:
+            current_time = time.time()
+            # Only show if detected within last 10 seconds
+            if (current_time - last_detected_plate_time) < 10:
+                cv2.putText(display_frame, f"Last detected: {last_detected_plate}", (10, 90),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+    
+    return display_frame
+
+
+car_plate_broadcaster = FrameBroadcaster("car-plate", render_car_plate_frame)
+
 
 def generate_car_plate_frames():
     """Generate video stream with car plate detection overlay."""
@@ -2014,75 +4061,14 @@ def generate_car_plate_frames():
         init_car_plate_camera()
     
     if car_plate_camera is None or not car_plate_camera.isOpened():
-        error_frame = np.zeros((480, 640, 3), dtype=np.uint8)
-        cv2.putText(error_frame, "Camera not connected!", (50, 200),
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-        cv2.putText(error_frame, "Ensure iVCam is running", (30, 250),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-        ret, buffer = cv2.imencode('.jpg', error_frame)
-        if ret:
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
         # Keep streaming error frame
-        while True:
-            time.sleep(1)
-            ret, buffer = cv2.imencode('.jpg', error_frame)
-            if ret:
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+        yield from error_frame_stream([
+            ("Camera not connected!", (50, 200), 1),
+            ("Ensure iVCam is running", (30, 250), 0.7)
+        ], repeat=True)
         return
     
-    while True:
-        try:
-            with car_plate_camera_lock:
-                if car_plate_camera is None or not car_plate_camera.isOpened():
-                    # Try to reinitialize
-                    init_car_plate_camera()
-                    if car_plate_camera is None or not car_plate_camera.isOpened():
-                        time.sleep(0.1)
-                        continue
-                
-                success, frame = car_plate_camera.read()
-                if not success or frame is None:
-                    print("[Car Plate Video Feed] Failed to read frame, retrying...")
-                    time.sleep(0.1)
-                    continue
-                
-                # Crop out iVCam logo if present
-                if frame.shape[0] > 100:
-                    frame = frame[60:-40, :]
-                
-                # Resize for display
-                display_frame = cv2.resize(frame.copy(), (960, 540))
-                
-                # Don't run OCR on every frame - it's too slow
-                # Only show the camera feed, OCR will run when scan button is clicked
-                # Draw instruction text on frame
-                cv2.putText(display_frame, "Point camera at car plate", (10, 30),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-                cv2.putText(display_frame, "Click 'Scan Car Plate' to detect", (10, 60),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-                
-                # Show last detected plate if available (from scan button)
-                with last_detected_plate_lock:
-                    if last_detected_plate:
-                        current_time = time.time()
-                        # Only show if detected within last 10 seconds
-                        if (current_time - last_detected_plate_time) < 10:
-                            cv2.putText(display_frame, f"Last detected: {last_detected_plate}", (10, 90),
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-            
-            # Encode frame
-            ret, buffer = cv2.imencode('.jpg', display_frame)
-            if not ret:
-                continue
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-            
-            time.sleep(0.033)  # ~30 FPS
-        except Exception as e:
-            print(f"Error in car plate frame generation: {e}")
-            break
+    yield from car_plate_broadcaster.stream()
 
 @app.get("/car-plate", response_class=HTMLResponse)
 def car_plate():
@@ -2199,7 +4185,7 @@ def car_plate():
                 statusDiv.textContent = 'Scanning car plate...';
                 statusDiv.className = 'status';
                 
-                fetch('/api/car-plate/scan', {
+                fetch('/api/car-plate/scan?mode=burst', {
                     method: 'POST',
                     headers: {'Content-Type': 'application/json'}
                 })
@@ -2229,6 +4215,53 @@ def car_plate():
     """
 
 
+@app.get("/api/events")
+async def events(request: Request, types: str = "", area: str = ""):
+    """Server-Sent Events stream of occupancy, console status, QR and plate updates.
+
+    types is an optional comma-separated filter (occupancy, status, qr, plate)
+    and area limits occupancy events to one parking area.
+    """
+    wanted = {t.strip() for t in types.split(',') if t.strip()}
+    area_key = (lookup_area(area) or area) if area else None
+
+    async def stream():
+        subscriber = event_hub.subscribe()
+        _, event_queue = subscriber
+        try:
+            # Start every client from the current state
+            if not wanted or "occupancy" in wanted:
+                for name, snapshot in area_snapshots.items():
+                    if area_key is None or name == area_key:
+                        yield format_sse("occupancy", snapshot_content(name, snapshot))
+            if (not wanted or "status" in wanted) and console_snapshot is not None:
+                yield format_sse("status", {
+                    "occupied": console_snapshot.occupied,
+                    "empty": console_snapshot.empty,
+                    "available": console_snapshot.empty,
+                    "version": console_snapshot.version
+                })
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event_type, event_area, message = await asyncio.wait_for(
+                        event_queue.get(), timeout=EVENT_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if wanted and event_type not in wanted:
+                    continue
+                if area_key is not None and event_area is not None and event_area != area_key:
+                    continue
+                yield message
+        finally:
+            event_hub.unsubscribe(subscriber)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @app.get("/video_feed")
 def video_feed():
     """MJPEG video stream route."""
@@ -2247,11 +4280,6 @@ def car_plate_video_feed():
     return StreamingResponse(generate_car_plate_frames(),
                              media_type="multipart/x-mixed-replace; boundary=frame")
 
-# Store last scanned QR code for API access
-last_scanned_qr = None
-last_scanned_qr_time = 0
-last_scanned_qr_lock = threading.Lock()
-
 @app.post("/api/visitor/scan-qr")
 async def scan_visitor_qr(request: Request):
     """Manually trigger QR code scan and process."""
@@ -2340,23 +4368,89 @@ async def approve_visitor(request: Request):
             content={"success": False, "error": str(e)}
         )
 
+PLATE_BURST_FRAMES = 5  # Frames voted on by a burst scan
+
+# Repeated scans of the same car reuse the last read: the plate region a read
+# came from is keyed by a perceptual hash, and a scan whose candidate regions
+# include a near-duplicate within the TTL skips OCR entirely.
+PLATE_CACHE_SIZE = 32
+PLATE_CACHE_TTL = 10.0  # Seconds a read stays valid for the car at the barrier
+PLATE_CACHE_MAX_DISTANCE = 4  # Differing hash bits (of 256) still counted as the same plate
+
+
+class PlateResultCache:
+    """Bounded, TTL-evicted plate reads keyed by perceptual plate-region hash."""
+
+    def __init__(self, max_entries=PLATE_CACHE_SIZE, ttl=PLATE_CACHE_TTL, max_distance=PLATE_CACHE_MAX_DISTANCE):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.entries = {}  # hash -> (plate number, stored at), oldest first
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, region_hashes):
+        """Plate number cached for a near-duplicate of any of the regions, or None."""
+        now = time.time()
+        with self.lock:
+            expired = [key for key, (_, stored_at) in self.entries.items() if now - stored_at > self.ttl]
+            for key in expired:
+                del self.entries[key]
+            self.evictions += len(expired)
+            for key, (plate_number, _) in self.entries.items():
+                if any((key ^ region_hash).bit_count() <= self.max_distance for region_hash in region_hashes):
+                    self.hits += 1
+                    return plate_number
+            self.misses += 1
+            return None
+
+    def store(self, region_hash, plate_number):
+        with self.lock:
+            self.entries.pop(region_hash, None)
+            if len(self.entries) >= self.max_entries:
+                # Dicts keep insertion order, so the first key is the oldest
+                del self.entries[next(iter(self.entries))]
+                self.evictions += 1
+            self.entries[region_hash] = (plate_number, time.time())
+
+    def status(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "ttl": self.ttl
+            }
+
+
+plate_result_cache = PlateResultCache()
+
+
 @app.post("/api/car-plate/scan")
-async def scan_car_plate():
-    """Scan car plate from camera and return detected plate number."""
+async def scan_car_plate(mode: str = "single"):
+    """Scan car plate from camera and return detected plate number.
+
+    mode=burst reads the last few frames in batched OCR calls and returns
+    their per-character consensus instead of a single-frame read.
+    """
     try:
-        # Check if EasyOCR is available (try lazy initialization)
-        global easyocr_reader, EASYOCR_AVAILABLE, easyocr_init_error
-        if easyocr_reader is None:
-            print("[API] EasyOCR not initialized, attempting to load...")
-            easyocr_reader, EASYOCR_AVAILABLE = _try_load_easyocr()
-        
-        if not EASYOCR_AVAILABLE or easyocr_reader is None:
-            error_msg = easyocr_init_error or "EasyOCR not available. Please install: pip install easyocr"
+        # Fail fast while the reader is still loading or could not be loaded
+        state = await plate_ocr_pool.wait_ready()
+        if state != "ready":
+            if state == "loading":
+                elapsed = time.time() - plate_ocr_pool.timings.get("started_at", time.time())
+                error_msg = f"Car plate reader is still loading ({elapsed:.0f}s so far). Please try again shortly."
+            else:
+                error_msg = plate_ocr_pool.error or "EasyOCR not available. Please install: pip install easyocr"
             return JSONResponse(
                 status_code=200,
                 content={
                     "success": False,
                     "error": error_msg,
+                    "reader_state": state,
                     "plate_number": None
                 }
             )
@@ -2375,35 +4469,100 @@ async def scan_car_plate():
                     }
                 )
         
-        # Read frame from camera
-        with car_plate_camera_lock:
+        # Take the newest frame(s) from the capture thread
+        if mode == "burst" and hasattr(car_plate_camera, "burst"):
+            frames = await asyncio.to_thread(car_plate_camera.burst, PLATE_BURST_FRAMES)
+            success, frame = bool(frames), (frames[-1] if frames else None)
+        else:
+            frames = None
             success, frame = car_plate_camera.read()
-            if not success or frame is None:
-                return JSONResponse(
-                    status_code=200,
-                    content={
-                        "success": False,
-                        "error": "Failed to read frame from camera",
-                        "plate_number": None
-                    }
-                )
-            
-            # Crop iVCam logo if needed
-            if frame.shape[0] > 100:
-                frame = frame[60:-40, :]
+        if not success or frame is None:
+            return JSONResponse(
+                status_code=200,
+                content={
+                    "success": False,
+                    "error": "Failed to read frame from camera",
+                    "plate_number": None
+                }
+            )
+        
+        # Crop iVCam logo if needed
+        if frame.shape[0] > 100:
+            frame = frame[60:-40, :]
+            if frames:
+                frames = [burst_frame[60:-40, :] for burst_frame in frames]
+        
+        # Same car still at the barrier: answer from the cache without OCR
+        region_hashes = await asyncio.to_thread(plate_ocr.plate_region_hashes, frame)
+        plate_number = plate_result_cache.lookup(list(region_hashes.values()))
+        if plate_number:
+            current_time = time.time()
+            with last_detected_plate_lock:
+                global last_detected_plate, last_detected_plate_time
+                last_detected_plate = plate_number
+                last_detected_plate_time = current_time
+            event_hub.publish("plate", {"plate_number": plate_number, "timestamp": current_time})
+            print(f"[Car Plate Scan] Cache hit: {plate_number}")
+            return JSONResponse(
+                status_code=200,
+                content={
+                    "success": True,
+                    "plate_number": plate_number,
+                    "cached": True,
+                    "message": f"Car plate detected: {plate_number}"
+                }
+            )
         
-        print(f"[Car Plate Scan] Frame size: {frame.shape}, Starting detection...")
+        print(f"[Car Plate Scan] Frame size: {frame.shape}, {len(frames) if frames else 1} frame(s), Starting detection...")
         
-        # Detect car plate
-        plate_number = detect_car_plate(frame)
+        # Detect car plate in an OCR worker process
+        try:
+            if frames:
+                result = await plate_ocr_pool.run(plate_ocr.detect_car_plate_burst, frames, ocr_variant_order())
+            else:
+                result = await plate_ocr_pool.run(plate_ocr.detect_car_plate, frame, ocr_variant_order())
+        except asyncio.TimeoutError:
+            return JSONResponse(
+                status_code=200,
+                content={
+                    "success": False,
+                    "error": "Car plate recognition timed out. Please try again.",
+                    "plate_number": None
+                }
+            )
+        except OcrPoolNotReady as e:
+            return JSONResponse(
+                status_code=200,
+                content={
+                    "success": False,
+                    "error": str(e),
+                    "reader_state": plate_ocr_pool.state,
+                    "plate_number": None
+                }
+            )
+        record_ocr_variants(result["variants"])
+        if result["error"]:
+            return JSONResponse(
+                status_code=200,
+                content={
+                    "success": False,
+                    "error": result["error"],
+                    "plate_number": None
+                }
+            )
+        plate_number = result["plate_number"]
         
         if plate_number:
+            # Only reads from a located plate region are cached, never whole-frame reads
+            region = result.get("region")
+            if region is not None and tuple(region) in region_hashes:
+                plate_result_cache.store(region_hashes[tuple(region)], plate_number)
             # Update last detected plate
             current_time = time.time()
             with last_detected_plate_lock:
-                global last_detected_plate, last_detected_plate_time
                 last_detected_plate = plate_number
                 last_detected_plate_time = current_time
+            event_hub.publish("plate", {"plate_number": plate_number, "timestamp": current_time})
             
             print(f"[Car Plate Scan] Successfully detected: {plate_number}")
             return JSONResponse(
@@ -2464,11 +4623,11 @@ async def check_car_plate_scan():
 @app.get("/api/car-plate/status")
 async def check_easyocr_status():
     """Check EasyOCR initialization status and camera status."""
-    global easyocr_reader, EASYOCR_AVAILABLE, easyocr_init_error
-    # Try to initialize if not already done
-    if easyocr_reader is None:
-        print("[Status Check] EasyOCR not initialized, attempting to load...")
-        easyocr_reader, EASYOCR_AVAILABLE = _try_load_easyocr()
+    # Readiness from the background warm-up; never waits for the model
+    if plate_ocr_pool.state == "idle":
+        plate_ocr_pool.start_warm_up()
+    easyocr_available = plate_ocr_pool.state == "ready"
+    easyocr_init_error = plate_ocr_pool.error
     
     # Check camera status
     camera_status = "connected" if (car_plate_camera is not None and car_plate_camera.isOpened()) else "disconnected"
@@ -2478,16 +4637,231 @@ async def check_easyocr_status():
         camera_status = "connected" if (car_plate_camera is not None and car_plate_camera.isOpened()) else "disconnected"
     
     return JSONResponse(content={
-        "easyocr_available": EASYOCR_AVAILABLE,
-        "easyocr_initialized": easyocr_reader is not None,
+        "easyocr_available": easyocr_available,
+        "easyocr_initialized": easyocr_available,
+        "ocr_pool": plate_ocr_pool.status(),
+        "plate_cache": plate_result_cache.status(),
+        "ocr_variant_order": ocr_variant_order(),
+        "ocr_variants": ocr_variant_status(),
         "camera_status": camera_status,
         "camera_index": car_plate_camera_index,
         "error": easyocr_init_error,
-        "message": f"EasyOCR: {'ready' if EASYOCR_AVAILABLE else 'not available'}, Camera: {camera_status}"
+        "reader_state": plate_ocr_pool.state,
+        "message": f"EasyOCR: {plate_ocr_pool.state if plate_ocr_pool.state != 'failed' else 'not available'}, Camera: {camera_status}"
     })
 
-async def process_visitor_qr(qr_code: str):
-    """Process scanned QR code and update visitor status to History."""
+# === Visitor reservation index ===
+# Upcoming visitor reservations are mirrored in memory, keyed by vstQR and
+# vstRsvtID, so scanning an upcoming visitor resolves without a Firestore
+# round trip. A snapshot listener keeps the mirror current and a periodic full
+# sync repairs it if the listener drops (or replaces the listener when it
+# cannot attach). The index also keeps every code of every reservation, read
+# with a vstQR/vstRsvtID projection, so unknown codes are rejected locally
+# while the index is current; only finished reservations (and any code while
+# the index is stale) are looked up in Firestore directly.
+VISITOR_INDEX_SYNC_INTERVAL = 60.0  # Seconds between full syncs
+VISITOR_CODE_SYNC_INTERVAL = 900.0  # Seconds between full reads of all reservation codes
+VISITOR_INDEX_MAX_AGE = 180.0  # Unknown codes are only rejected locally within this age
+
+VisitorReservation = namedtuple('VisitorReservation', ['id', 'reference', 'data'])
+
+
+class VisitorReservationIndex:
+    """In-memory index of 'Up Coming' visitorReservation documents.
+
+    client is a Firestore client, or any object with the same
+    collection().where().limit().get()/on_snapshot() interface (None when
+    Firebase is not configured). start() is called from the app's startup.
+    """
+
+    def __init__(self, client, collection='visitorReservation'):
+        self.client = client
+        self.collection = collection
+        self.lock = threading.Lock()
+        self.reservations = {}  # document id -> VisitorReservation
+        self.by_qr = {}  # vstQR -> document id
+        self.by_rsvt_id = {}  # vstRsvtID -> document id
+        self.known_codes = set()  # vstQR and vstRsvtID of every reservation, any status
+        self.last_code_sync = 0.0
+        self.watch = None
+        self.thread = None
+        self.last_sync = 0.0
+        self.error = None
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self.syncs = 0
+        self.snapshots = 0
+
+    def _query(self):
+        return self.client.collection(self.collection).where('vstStatus', '==', 'Up Coming')
+
+    def _add(self, reservation):
+        # Caller holds self.lock
+        self.reservations[reservation.id] = reservation
+        for field, index in (('vstQR', self.by_qr), ('vstRsvtID', self.by_rsvt_id)):
+            code = reservation.data.get(field)
+            if code:
+                index[str(code)] = reservation.id
+                # New reservations arrive as Up Coming, which keeps the code set complete
+                self.known_codes.add(str(code))
+
+    def _drop(self, doc_id):
+        # Caller holds self.lock
+        reservation = self.reservations.pop(doc_id, None)
+        if reservation is None:
+            return
+        for field, index in (('vstQR', self.by_qr), ('vstRsvtID', self.by_rsvt_id)):
+            code = reservation.data.get(field)
+            if code and index.get(str(code)) == doc_id:
+                del index[str(code)]
+
+    def start(self):
+        """Attach the snapshot listener and start the sync thread."""
+        if self.client is None or self.thread is not None:
+            return
+        try:
+            self.watch = self._query().on_snapshot(self._on_snapshot)
+        except Exception as e:
+            self.watch = None
+            self.error = f"Snapshot listener unavailable: {e}"
+            print(f"[Visitor Index] {self.error}; falling back to periodic sync")
+        self.thread = threading.Thread(target=self._run, name="visitor-index-sync", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.sync()
+            except Exception as e:
+                self.error = f"Sync failed: {e}"
+                print(f"[Visitor Index] {self.error}")
+            time.sleep(VISITOR_INDEX_SYNC_INTERVAL)
+
+    def _on_snapshot(self, docs, changes, read_time):
+        with self.lock:
+            for change in changes:
+                document = change.document
+                self._drop(document.id)
+                if change.type.name != 'REMOVED':
+                    self._add(VisitorReservation(document.id, document.reference, document.to_dict() or {}))
+            self.snapshots += 1
+            self.last_sync = time.time()
+
+    def sync_codes(self):
+        """Replace the known codes with a projected read of every reservation."""
+        codes = set()
+        for doc in self.client.collection(self.collection).select(['vstQR', 'vstRsvtID']).get():
+            data = doc.to_dict() or {}
+            codes.update(str(data[field]) for field in ('vstQR', 'vstRsvtID') if data.get(field))
+        with self.lock:
+            # Keep codes the listener added while the read was running
+            self.known_codes = codes | {
+                str(reservation.data[field])
+                for reservation in self.reservations.values()
+                for field in ('vstQR', 'vstRsvtID') if reservation.data.get(field)
+            }
+            self.last_code_sync = time.time()
+        print(f"[Visitor Index] Loaded {len(codes)} reservation code(s)")
+
+    def sync(self):
+        """Replace the index with a full read of upcoming reservations."""
+        if time.time() - self.last_code_sync >= VISITOR_CODE_SYNC_INTERVAL:
+            try:
+                self.sync_codes()
+            except Exception as e:
+                # Without the code set every miss falls back to a direct query
+                print(f"[Visitor Index] Code sync failed: {e}")
+        reservations = [
+            VisitorReservation(doc.id, doc.reference, doc.to_dict() or {})
+            for doc in self._query().get()
+        ]
+        with self.lock:
+            self.reservations = {}
+            self.by_qr = {}
+            self.by_rsvt_id = {}
+            for reservation in reservations:
+                self._add(reservation)
+            self.syncs += 1
+            self.last_sync = time.time()
+            self.error = None
+        print(f"[Visitor Index] Synced {len(reservations)} upcoming reservation(s)")
+
+    def query(self, code):
+        """Look a code up in Firestore directly, by vstQR then vstRsvtID."""
+        reservations_ref = self.client.collection(self.collection)
+        # Find visitor reservation by vstQR
+        print(f"[Visitor QR] Searching for visitor reservation with vstQR: {code}")
+        docs = reservations_ref.where('vstQR', '==', code).limit(1).get()
+        print(f"[Visitor QR] Found {len(docs)} document(s) matching vstQR: {code}")
+        
+        if len(docs) == 0:
+            # Also try searching by vstRsvtID in case the field name is different
+            print(f"[Visitor QR] Trying alternative search by vstRsvtID...")
+            docs = reservations_ref.where('vstRsvtID', '==', code).limit(1).get()
+            print(f"[Visitor QR] Found {len(docs)} document(s) matching vstRsvtID: {code}")
+        
+        for doc in docs:
+            return VisitorReservation(doc.id, doc.reference, doc.to_dict() or {})
+        return None
+
+    def is_current(self):
+        """True while syncs or snapshots keep arriving."""
+        return self.last_sync > 0 and time.time() - self.last_sync < VISITOR_INDEX_MAX_AGE
+
+    def may_exist(self, code):
+        """False only when a current index knows the code belongs to no reservation."""
+        with self.lock:
+            if self.last_code_sync == 0 or not self.is_current() or code in self.known_codes:
+                return True
+            self.rejected += 1
+            return False
+
+    def lookup(self, code):
+        """Return the VisitorReservation for a vstQR or vstRsvtID, or None."""
+        with self.lock:
+            doc_id = self.by_qr.get(code) or self.by_rsvt_id.get(code)
+            if doc_id is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self.reservations[doc_id]
+
+    def apply_update(self, reservation, update_data):
+        """Reflect a write made by this process before the listener echoes it."""
+        data = dict(reservation.data, **update_data)
+        with self.lock:
+            self._drop(reservation.id)
+            if data.get('vstStatus') == 'Up Coming':
+                self._add(reservation._replace(data=data))
+
+    def status(self):
+        with self.lock:
+            return {
+                "reservations": len(self.reservations),
+                "listening": self.watch is not None,
+                "current": self.is_current(),
+                "last_sync_age": round(time.time() - self.last_sync, 1) if self.last_sync else None,
+                "known_codes": len(self.known_codes),
+                "hits": self.hits,
+                "misses": self.misses,
+                "rejected": self.rejected,
+                "syncs": self.syncs,
+                "snapshots": self.snapshots,
+                "error": self.error
+            }
+
+
+visitor_index = VisitorReservationIndex(firestore_db)
+
+
+async def process_visitor_qr(qr_code: str, index=None):
+    """Process scanned QR code and update visitor status to History.
+
+    index is the VisitorReservationIndex to resolve the code with (and whose
+    client is updated); defaults to the app's visitor_index.
+    """
+    index = index or visitor_index
     try:
         print(f"[Visitor QR] Processing QR code: {qr_code}")
         
@@ -2498,7 +4872,7 @@ async def process_visitor_qr(qr_code: str):
             last_scanned_qr_time = time.time()
         
         # Update Firebase if available
-        if firestore_db is None:
+        if index.client is None:
             print(f"[Visitor QR] Firebase not available. QR code {qr_code} detected but not updated.")
             return {
                 "success": False,
@@ -2507,26 +4881,18 @@ async def process_visitor_qr(qr_code: str):
             }
         
         try:
-            # Find visitor reservation by vstQR
-            print(f"[Visitor QR] Searching for visitor reservation with vstQR: {qr_code}")
-            reservations_ref = firestore_db.collection('visitorReservation')
-            query = reservations_ref.where('vstQR', '==', qr_code).limit(1)
-            
-            # Use get() instead of stream() for simpler synchronous access
-            docs = query.get()
-            
-            print(f"[Visitor QR] Found {len(docs)} document(s) matching vstQR: {qr_code}")
+            # Upcoming reservations resolve from the local index and unknown
+            # codes are rejected by it; only other known codes (e.g. a
+            # reservation already in History) are looked up in Firestore
+            reservation = index.lookup(qr_code)
+            if reservation is None and index.may_exist(qr_code):
+                reservation = await asyncio.to_thread(index.query, qr_code)
             
-            if len(docs) == 0:
-                # Also try searching by vstRsvtID in case the field name is different
-                print(f"[Visitor QR] Trying alternative search by vstRsvtID...")
-                query2 = reservations_ref.where('vstRsvtID', '==', qr_code).limit(1)
-                docs = query2.get()
-                print(f"[Visitor QR] Found {len(docs)} document(s) matching vstRsvtID: {qr_code}")
+            docs = [reservation] if reservation else []
             
             updated = False
             for doc in docs:
-                doc_data = doc.to_dict()
+                doc_data = doc.data
                 print(f"[Visitor QR] Found document ID: {doc.id}")
                 print(f"[Visitor QR] Current vstStatus: {doc_data.get('vstStatus', 'N/A')}")
                 print(f"[Visitor QR] Document stdID: {doc_data.get('stdID', 'NOT SET')}")
@@ -2534,7 +4900,6 @@ async def process_visitor_qr(qr_code: str):
                 
                 # Check if this is first scan (no startTime) or second scan (has startTime but no endTime)
                 from datetime import datetime
-                from google.cloud.firestore import SERVER_TIMESTAMP
                 
                 start_time = doc_data.get('startTime')
                 end_time = doc_data.get('endTime')
@@ -2547,6 +4912,7 @@ async def process_visitor_qr(qr_code: str):
                         'startTime': current_time_utc,
                     }
                     doc.reference.update(update_data)
+                    index.apply_update(doc, update_data)
                     print(f"[Visitor QR] First scan - Set startTime (car in) for reservation {doc.id}")
                     scan_type = "first"
                     updated = True
@@ -2558,6 +4924,7 @@ async def process_visitor_qr(qr_code: str):
                         'vstStatus': 'History',
                     }
                     doc.reference.update(update_data)
+                    index.apply_update(doc, update_data)
                     print(f"[Visitor QR] Second scan - Set endTime (car out) and updated status to History for reservation {doc.id}")
                     scan_type = "second"
                     updated = True
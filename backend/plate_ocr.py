@@ -0,0 +1,476 @@
+"""Car plate OCR that runs inside the worker processes of main.py's OCR pool.
+
+Kept separate from main.py so that spawned workers only import OpenCV and
+EasyOCR, not the FastAPI app, cameras and background threads. Each worker
+loads the EasyOCR model once, in init_worker().
+"""
+import os
+import re
+import time
+import traceback
+
+import cv2
+import numpy as np
+
+# Plate localization works on a downscaled copy of the frame
+LOCALIZE_WIDTH = 640
+PLATE_MIN_ASPECT = 2.0  # Width / height of a plate rectangle
+PLATE_MAX_ASPECT = 8.0  # The character blob of a one-row plate is longer than the plate
+PLATE_MIN_AREA = 0.001  # Fraction of the frame area
+PLATE_MAX_AREA = 0.15
+MAX_PLATE_CANDIDATES = 4
+OCR_CROP_HEIGHT = 96  # Small crops are upscaled to about this height for the recognizer
+
+# Preprocessing variants in their default (cheapest first) cascade order
+PLATE_VARIANTS = ("original", "grayscale", "enhanced", "threshold", "adaptive")
+# Stop the cascade once a read is at least this confident and looks like a plate
+EARLY_EXIT_CONFIDENCE = 0.5
+PLATE_FORMAT = re.compile(r'^[A-Z]{1,3}[0-9]{1,4}[A-Z]{0,2}$')
+# A burst consensus is final once this many frames agree on it
+BURST_MIN_AGREEING = 2
+
+# Per-process reader, set by init_worker()
+easyocr_reader = None
+easyocr_init_error = None
+easyocr_load_seconds = None
+
+
+def _try_load_easyocr():
+    """Try to load EasyOCR for car plate recognition."""
+    global easyocr_init_error
+    try:
+        print("[EasyOCR] Attempting to import easyocr...")
+        import easyocr
+        print("[EasyOCR] Import successful, initializing reader (this may take a minute on first run)...")
+        # Initialize EasyOCR reader (English only for license plates)
+        # This will download models on first run, which can take time
+        reader = easyocr.Reader(['en'], gpu=False, verbose=False)
+        print("[EasyOCR] Reader initialized successfully!")
+        easyocr_init_error = None
+        return reader
+    except ImportError as e:
+        error_msg = f"EasyOCR not installed: {str(e)}"
+        print(f"[EasyOCR] ERROR: {error_msg}")
+        print("[EasyOCR] Install with: pip install easyocr")
+        easyocr_init_error = error_msg
+        return None
+    except Exception as e:
+        error_msg = f"EasyOCR initialization failed: {type(e).__name__}: {str(e)}"
+        print(f"[EasyOCR] ERROR: {error_msg}")
+        traceback.print_exc()
+        easyocr_init_error = error_msg
+        return None
+
+
+def init_worker():
+    """Process pool initializer: load the model once per worker."""
+    global easyocr_reader, easyocr_load_seconds
+    # OpenCV's own thread pool would compete with the other workers
+    cv2.setNumThreads(1)
+    started = time.time()
+    easyocr_reader = _try_load_easyocr()
+    easyocr_load_seconds = time.time() - started
+
+
+def warm_up():
+    """Run one dummy inference so the first real scan does not pay for lazy setup.
+
+    Returns {"ready", "pid", "error", "load_seconds", "warmup_seconds"} for
+    this worker; the pool uses the pid to check every worker has loaded.
+    """
+    if easyocr_reader is None:
+        return {"ready": False, "pid": os.getpid(), "error": easyocr_init_error or "EasyOCR not available",
+                "load_seconds": easyocr_load_seconds, "warmup_seconds": None}
+    image = np.full((OCR_CROP_HEIGHT, 320), 255, np.uint8)
+    cv2.putText(image, "ABC 1234", (10, 65), cv2.FONT_HERSHEY_SIMPLEX, 1.6, 0, 4)
+    started = time.time()
+    try:
+        easyocr_reader.readtext(image, paragraph=False)
+    except Exception as e:
+        return {"ready": False, "pid": os.getpid(), "error": f"Warm-up inference failed: {type(e).__name__}: {e}",
+                "load_seconds": easyocr_load_seconds, "warmup_seconds": None}
+    return {"ready": True, "pid": os.getpid(), "error": None, "load_seconds": easyocr_load_seconds,
+            "warmup_seconds": time.time() - started}
+
+
+def format_plate(detected_plate):
+    """Format a plate nicely, "ABC 1234" style, when letters are followed by digits."""
+    # Remove all spaces first
+    plate_no_spaces = detected_plate.replace(' ', '').replace('-', '')
+
+    # Try to format as "ABC 1234" if it has at least 6 characters
+    if len(plate_no_spaces) >= 6:
+        # Check if first 3 are letters and rest are numbers
+        if plate_no_spaces[:3].isalpha() and plate_no_spaces[3:].isdigit():
+            return plate_no_spaces[:3] + ' ' + plate_no_spaces[3:]
+        # Or try to split at any point where letters end and numbers begin
+        for i in range(2, min(5, len(plate_no_spaces))):
+            if plate_no_spaces[:i].isalpha() and plate_no_spaces[i:].isdigit():
+                return plate_no_spaces[:i] + ' ' + plate_no_spaces[i:]
+
+    # If formatting doesn't work, return the cleaned text as-is
+    return detected_plate
+
+
+def locate_plate_candidates(gray, max_candidates=MAX_PLATE_CANDIDATES):
+    """Propose plate rectangles (x, y, w, h) in full-frame coordinates, best first.
+
+    Plates are dense clusters of vertical strokes: horizontal gradient edges
+    are closed into blobs with a wide kernel, and blobs with a plate-like
+    aspect ratio and size are ranked by their edge density.
+    """
+    frame_h, frame_w = gray.shape[:2]
+    scale = min(1.0, LOCALIZE_WIDTH / float(frame_w))
+    small = cv2.resize(gray, (int(frame_w * scale), int(frame_h * scale)),
+                       interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+    small_h, small_w = small.shape[:2]
+
+    # Dark characters on a light plate (and the reverse) stand out after blackhat/tophat
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (13, 5))
+    contrast = cv2.max(cv2.morphologyEx(small, cv2.MORPH_BLACKHAT, kernel),
+                       cv2.morphologyEx(small, cv2.MORPH_TOPHAT, kernel))
+    grad = cv2.convertScaleAbs(cv2.Sobel(contrast, cv2.CV_16S, 1, 0, ksize=3))
+    _, edges = cv2.threshold(grad, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    # Join the characters into one blob, then drop thin noise
+    closed = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (17, 5)))
+    closed = cv2.morphologyEx(closed, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (5, 3)))
+
+    contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    frame_area = float(small_w * small_h)
+    scored = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if h < 8 or w < 24:
+            continue
+        aspect = w / float(h)
+        area = w * h / frame_area
+        if not (PLATE_MIN_ASPECT <= aspect <= PLATE_MAX_ASPECT and PLATE_MIN_AREA <= area <= PLATE_MAX_AREA):
+            continue
+        density = np.count_nonzero(edges[y:y + h, x:x + w]) / float(w * h)
+        scored.append((density, x, y, w, h))
+    scored.sort(reverse=True)
+
+    candidates = []
+    for density, x, y, w, h in scored[:max_candidates]:
+        # Back to full resolution with a margin so edge characters are not clipped
+        pad_x, pad_y = int(w * 0.1) + 2, int(h * 0.4) + 2
+        x0 = max(0, int((x - pad_x) / scale))
+        y0 = max(0, int((y - pad_y) / scale))
+        x1 = min(frame_w, int((x + w + pad_x) / scale))
+        y1 = min(frame_h, int((y + h + pad_y) / scale))
+        candidates.append((x0, y0, x1 - x0, y1 - y0))
+    return candidates
+
+
+def preprocess_variant(image, name, gray=None):
+    """One preprocessed version of an image to try OCR on."""
+    # 1. Original image (often works best)
+    if name == "original":
+        return image
+
+    # 2. Grayscale
+    if gray is None:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    if name == "grayscale":
+        return gray
+
+    # 3. Enhanced contrast (CLAHE)
+    if name == "enhanced":
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        return clahe.apply(gray)
+
+    # 4. Thresholded
+    if name == "threshold":
+        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return thresh
+
+    # 5. Adaptive threshold
+    if name == "adaptive":
+        return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+    raise ValueError(f"Unknown preprocessing variant '{name}'")
+
+
+def perceptual_hash(image, width=32, height=8):
+    """Average hash of an image as an int of width * height bits.
+
+    Each bit says whether a cell is brighter than the image mean. On a plate
+    crop the light background cells stay clearly above the mean, so sensor
+    noise and brightness changes flip almost no bits while different
+    characters do. The default grid follows the wide shape of a plate.
+    """
+    # Subsample before resizing so hashing stays well under a millisecond
+    step = max(1, min(image.shape[0] // (height * 4), image.shape[1] // (width * 4)))
+    small = cv2.resize(np.float32(image[::step, ::step]), (width, height), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    bits = np.packbits((small > small.mean()).ravel())
+    return int.from_bytes(bits.tobytes(), 'big')
+
+
+def plate_region_hashes(frame):
+    """Perceptual hash of every candidate plate region: {(x, y, w, h): hash}.
+
+    Keying on the plate crop rather than the whole frame keeps the background
+    from dominating the hash, so a different car in the same spot does not
+    look like the same scene.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    hashes = {}
+    for box in locate_plate_candidates(gray):
+        x, y, w, h = box
+        crop = gray[y:y + h, x:x + w]
+        if crop.size:
+            hashes[box] = perceptual_hash(crop)
+    return hashes
+
+
+def is_plate_format(text):
+    """True when text reads like a plate: letters, then digits, then optional letters."""
+    return bool(PLATE_FORMAT.match(text.replace(' ', '').replace('-', '')))
+
+
+def plate_crops(frame, candidates):
+    """Cut candidate rectangles out of the frame, upscaling small ones for OCR."""
+    crops = []
+    for x, y, w, h in candidates:
+        crop = frame[y:y + h, x:x + w]
+        if crop.size == 0:
+            continue
+        if h < OCR_CROP_HEIGHT:
+            factor = OCR_CROP_HEIGHT / float(h)
+            crop = cv2.resize(crop, (int(w * factor), OCR_CROP_HEIGHT), interpolation=cv2.INTER_CUBIC)
+        crops.append(crop)
+    return crops
+
+
+def accept_plate_text(text, confidence):
+    """Clean an OCR read; returns the cleaned text if it can be a plate, else None."""
+    # Clean text: keep only alphanumeric and spaces
+    cleaned_text = ' '.join(''.join(c.upper() if c.isalnum() or c.isspace() else '' for c in text).split())
+    compact = cleaned_text.replace(' ', '')
+    # Needs both letters and numbers, 3-12 characters, very low confidence bar (0.1)
+    if (any(c.isalpha() for c in compact) and any(c.isdigit() for c in compact)
+            and 3 <= len(compact) <= 12 and confidence > 0.1):
+        return cleaned_text
+    return None
+
+
+def read_text_batch(images):
+    """OCR same-sized images in one batched inference; returns one result list per image."""
+    if len(images) > 1 and hasattr(easyocr_reader, 'readtext_batched'):
+        return easyocr_reader.readtext_batched(images, paragraph=False)
+    return [easyocr_reader.readtext(image, paragraph=False) for image in images]
+
+
+def vote_plate(reads):
+    """Per-character consensus of (text, confidence) reads, weighted by confidence.
+
+    reads holds at most one read per frame, all of the same plate region.
+    Reads are compared without spaces; the length with the most total
+    confidence wins, then each position takes its highest weighted character.
+    Returns (plate, confidence, agreeing frames) or None.
+    """
+    by_length = {}
+    for text, confidence in reads:
+        compact = text.replace(' ', '')
+        if compact:
+            by_length.setdefault(len(compact), []).append((compact, confidence))
+    if not by_length:
+        return None
+    length, group = max(by_length.items(), key=lambda item: sum(conf for _, conf in item[1]))
+
+    plate = []
+    position_shares = []
+    for position in range(length):
+        weights = {}
+        for compact, confidence in group:
+            weights[compact[position]] = weights.get(compact[position], 0.0) + confidence
+        char, weight = max(weights.items(), key=lambda item: item[1])
+        plate.append(char)
+        position_shares.append(weight / sum(weights.values()))
+    plate = ''.join(plate)
+    agreeing = [conf for compact, conf in group if compact == plate]
+    # Mean confidence of the reads that match, scaled by how contested the positions were
+    mean_confidence = sum(conf for _, conf in group) / len(group)
+    confidence = mean_confidence * min(position_shares)
+    return plate, confidence, len(agreeing)
+
+
+def detect_car_plate_burst(frames, variant_order=None, early_exit_confidence=EARLY_EXIT_CONFIDENCE):
+    """Read a plate from a short burst of frames of the same scene (newest last).
+
+    Plate regions are located in the newest frame and cut from every frame at
+    the same place. Each variant of the cascade OCRs all crops of a region in
+    one batched inference. Every region keeps the most confident read of each
+    frame across variants, and each region is voted on separately, so texts
+    from different regions are never mixed. The cascade stops once enough
+    different frames agree on a confident plate-shaped consensus. Returns the
+    same keys as detect_car_plate plus "reads" (frame reads that were voted on).
+    """
+    attempts = []
+    region_reads = []  # Per region: {frame index: best (text, confidence)}
+    try:
+        if easyocr_reader is None:
+            error_msg = easyocr_init_error or "EasyOCR not available"
+            print(f"[Car Plate Burst] {error_msg}")
+            return {"plate_number": None, "error": error_msg, "variants": attempts, "reads": 0, "region": None}
+
+        order = [name for name in (variant_order or PLATE_VARIANTS) if name in PLATE_VARIANTS]
+        newest = frames[-1]
+        candidates = locate_plate_candidates(cv2.cvtColor(newest, cv2.COLOR_BGR2GRAY) if newest.ndim == 3 else newest)
+        print(f"[Car Plate Burst] {len(frames)} frames, {len(candidates)} candidate plate regions: {candidates}")
+        # One batch per region (crops of a region have the same size in every frame)
+        batches = []
+        batch_boxes = []
+        for box in candidates:
+            crops = [plate_crops(frame, [box]) for frame in frames]
+            if all(crops):
+                batches.append([frame_crops[0] for frame_crops in crops])
+                batch_boxes.append(box)
+
+        consensus = None
+        region = None
+        # Nothing plate-like in the proposed regions: read the whole frames as before
+        for groups, boxes in ((batches, batch_boxes), ([list(frames)], [None])):
+            if not groups or any(region_reads):
+                continue
+            region_reads = [{} for _ in groups]
+            for name in order:
+                started = time.time()
+                for images, frame_reads in zip(groups, region_reads):
+                    results = read_text_batch([preprocess_variant(image, name) for image in images])
+                    for frame_index, frame_results in enumerate(results):
+                        # Best acceptable read of this region in this frame
+                        accepted = [(accept_plate_text(text, conf), conf) for (bbox, text, conf) in frame_results]
+                        accepted = [(text, conf) for text, conf in accepted if text]
+                        if not accepted:
+                            continue
+                        read = max(accepted, key=lambda read: read[1])
+                        # One vote per frame: keep the most confident read over all variants
+                        if frame_index not in frame_reads or read[1] > frame_reads[frame_index][1]:
+                            frame_reads[frame_index] = read
+                # The region whose consensus the most frames agree on wins
+                votes = [(vote_plate(list(frame_reads.values())), box) for frame_reads, box in zip(region_reads, boxes)]
+                votes = [(vote, box) for vote, box in votes if vote]
+                consensus, region = (max(votes, key=lambda item: (item[0][2], item[0][1]))
+                                     if votes else (None, None))
+                hit = bool(consensus and consensus[2] >= min(BURST_MIN_AGREEING, len(frames))
+                           and consensus[1] >= early_exit_confidence and is_plate_format(consensus[0]))
+                attempts.append((name, time.time() - started, hit))
+                print(f"[Car Plate Burst] Variant '{name}': {[len(r) for r in region_reads]} frame reads per region, consensus {consensus}")
+                if hit:
+                    break
+
+        reads = sum(len(frame_reads) for frame_reads in region_reads)
+        if consensus:
+            plate, confidence, agreeing = consensus
+            print(f"[Car Plate Burst] ✓ SUCCESS! Consensus '{plate}' (confidence: {confidence:.3f}, {agreeing}/{len(frames)} frames agree)")
+            return {"plate_number": format_plate(plate), "error": None, "variants": attempts, "reads": reads,
+                    "region": region}
+        print("[Car Plate Burst] ✗ FAILED: No text with both letters AND numbers found")
+        return {"plate_number": None, "error": None, "variants": attempts, "reads": reads, "region": None}
+
+    except Exception as e:
+        print(f"Error detecting car plate from burst: {e}")
+        traceback.print_exc()
+        return {"plate_number": None, "error": str(e), "variants": attempts,
+                "reads": sum(len(frame_reads) for frame_reads in region_reads), "region": None}
+
+
+def read_plate_candidates(images_to_try):
+    """OCR each (method name, image) and return accepted (text, confidence, method, original) tuples."""
+    all_candidates = []
+
+    # Try OCR on each preprocessed image
+    for method_name, img in images_to_try:
+        try:
+            results = easyocr_reader.readtext(img, paragraph=False)
+            print(f"[Car Plate Detection] Method: {method_name}, Found {len(results)} text regions")
+
+            for (bbox, text, confidence) in results:
+                # Keep original text for display, but also create cleaned version
+                original_text = text.strip().upper()
+                cleaned_text = accept_plate_text(text, confidence)
+
+                # Debug: print ALL detected text
+                print(f"  - Detected: '{text}' -> '{cleaned_text}' (confidence: {confidence:.3f})")
+
+                # Very permissive: any text with both letters AND numbers is a plate candidate
+                if cleaned_text:
+                    all_candidates.append((cleaned_text, confidence, method_name, original_text))
+                    print(f"    ✓ ACCEPTED: '{cleaned_text}' (confidence: {confidence:.3f}, method: {method_name})")
+        except Exception as e:
+            print(f"Error processing {method_name} image: {e}")
+            traceback.print_exc()
+            continue
+    return all_candidates
+
+
+def detect_car_plate(frame, variant_order=None, early_exit_confidence=EARLY_EXIT_CONFIDENCE):
+    """Detect car plate number from frame using EasyOCR.
+
+    Preprocessing variants are tried one at a time in variant_order (default
+    PLATE_VARIANTS), first on the likely plate regions and, only if those
+    yield nothing, on the whole frame. The cascade stops at the first read
+    that passes early_exit_confidence and the plate format check; otherwise the
+    most confident accepted read wins.
+
+    Returns {"plate_number": str or None, "error": str or None, "variants":
+    [(variant, seconds, hit), ...], "region": (x, y, w, h) or None} so the
+    caller can track hit rates; region is the candidate the plate was read
+    from (None for a whole-frame read).
+    """
+    attempts = []
+    try:
+        if easyocr_reader is None:
+            error_msg = easyocr_init_error or "EasyOCR not available"
+            print(f"[Car Plate Detection] {error_msg}")
+            return {"plate_number": None, "error": error_msg, "variants": attempts, "region": None}
+
+        order = [name for name in (variant_order or PLATE_VARIANTS) if name in PLATE_VARIANTS]
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        candidates = locate_plate_candidates(gray)
+        print(f"[Car Plate Detection] {len(candidates)} candidate plate regions: {candidates}")
+        regions = [(box, crop) for box in candidates for crop in plate_crops(frame, [box])]
+        crops = [crop for _, crop in regions]
+        # Method labels start with "region<n>", which maps a read back to its box
+        region_boxes = {f"region{index + 1}": box for index, (box, _) in enumerate(regions)}
+
+        all_candidates = []
+        # Nothing plate-like in the proposed regions: read the whole frame as before
+        for images, label in ((crops, "region"), ([frame], "frame")):
+            if not images or all_candidates:
+                continue
+            for name in order:
+                started = time.time()
+                variant_candidates = []
+                for index, image in enumerate(images):
+                    variant = preprocess_variant(image, name, gray if label == "frame" else None)
+                    variant_candidates.extend(read_plate_candidates([(f"{label}{index + 1}-{name}", variant)]))
+                confident = [c for c in variant_candidates
+                             if c[1] >= early_exit_confidence and is_plate_format(c[0])]
+                attempts.append((name, time.time() - started, bool(confident)))
+                all_candidates.extend(variant_candidates)
+                if confident:
+                    print(f"[Car Plate Detection] Early exit after '{name}' ({len(attempts)} OCR passes)")
+                    all_candidates = confident
+                    break
+
+        # Return the highest confidence result
+        if all_candidates:
+            # Sort by confidence (highest first)
+            all_candidates.sort(key=lambda x: x[1], reverse=True)
+            detected_plate, confidence, method, original = all_candidates[0]
+            print(f"[Car Plate Detection] ✓ SUCCESS! Selected: '{detected_plate}' (confidence: {confidence:.3f}, method: {method})")
+            return {"plate_number": format_plate(detected_plate), "error": None, "variants": attempts,
+                    "region": region_boxes.get(method.split('-', 1)[0])}
+        else:
+            print("[Car Plate Detection] ✗ FAILED: No text with both letters AND numbers found")
+            print("[Car Plate Detection] Make sure the plate is clearly visible with both letters and numbers")
+            return {"plate_number": None, "error": None, "variants": attempts, "region": None}
+
+    except Exception as e:
+        print(f"Error detecting car plate: {e}")
+        traceback.print_exc()
+        return {"plate_number": None, "error": str(e), "variants": attempts, "region": None}
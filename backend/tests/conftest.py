@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Importing main opens the history database; keep the tests off data.db
+os.environ.setdefault('PARKING_DB_PATH', os.path.join(tempfile.mkdtemp(prefix='parking-tests-'), 'data.db'))
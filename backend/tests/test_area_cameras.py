@@ -0,0 +1,76 @@
+"""Areas whose own camera is down get no snapshot instead of another camera's frame."""
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+client = TestClient(main.app)
+AREA = 'Demo'
+
+
+class FakeCapture:
+    def __init__(self, device_index):
+        self.device_index = device_index
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        return False, None
+
+
+@pytest.fixture
+def cameras(monkeypatch):
+    # The main camera (0) is up; the area's own camera (7) is not
+    monkeypatch.setattr(main, 'cap', FakeCapture(0))
+    monkeypatch.setattr(main, 'camera_captures', {0: main.cap})
+    monkeypatch.setattr(main, 'area_camera_indexes', {AREA: 7})
+    monkeypatch.setattr(main, 'read_area_frame', lambda area_name=None: (False, None))
+    yield main.camera_captures
+    main.area_camera_errors.pop(AREA, None)
+    main.withdrawn_area_snapshots.pop(AREA, None)
+
+
+def test_area_without_its_camera_has_no_capture(cameras):
+    assert main.get_area_camera(AREA) is None
+    assert main.get_area_camera() is main.cap
+    assert main.analyze_all_areas([AREA]) == {AREA: None}
+
+
+def test_snapshot_is_withdrawn_while_the_camera_is_down(cameras, monkeypatch):
+    statuses = [False] * len(main.get_parking_spaces_for_area(AREA))
+    before = main.publish_area_snapshot(AREA, statuses)
+
+    main.run_occupancy_round()
+    assert main.get_area_snapshot(AREA) is None
+    body = client.get(f'/api/parking/availability/{AREA}').json()
+    assert body['success'] is False
+    assert 'Camera 7' in body['error']
+    batch = client.get('/api/parking/availability', params={'areas': AREA}).json()
+    assert 'Camera 7' in batch['areas'][AREA]['error']
+
+    # Once the device is back the version carries on from before the outage
+    cameras[7] = FakeCapture(7)
+    monkeypatch.setattr(main, 'analyze_all_areas', lambda: {AREA: (1, len(statuses) - 1, [True] + statuses[1:])})
+    main.run_occupancy_round()
+    after = main.get_area_snapshot(AREA)
+    assert after.version == before.version + 1
+    assert AREA not in main.area_camera_errors
+
+
+def test_missing_cameras_are_reopened(cameras, monkeypatch):
+    opened = []
+
+    def open_capture(idx, open_device=True, width=1280, height=720):
+        if idx in cameras:
+            return cameras[idx]
+        if open_device:
+            opened.append(idx)
+            cameras[idx] = FakeCapture(idx)
+            return cameras[idx]
+        return None
+
+    monkeypatch.setattr(main, 'get_camera_capture', open_capture)
+    main.reopen_area_cameras()
+    assert opened == [7]
+    assert main.get_area_camera(AREA) is cameras[7]
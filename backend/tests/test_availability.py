@@ -0,0 +1,61 @@
+"""Availability ETags and since cursors."""
+from fastapi.testclient import TestClient
+
+import main
+
+client = TestClient(main.app)
+
+
+def publish(area, statuses):
+    return main.publish_area_snapshot(area, statuses)
+
+
+def spaces(area):
+    return len(main.get_parking_spaces_for_area(area))
+
+
+def test_since_cursor_returns_only_changed_slots():
+    area = 'DK (EC)'
+    statuses = [False] * spaces(area)
+    publish(area, statuses)
+    first = client.get(f'/api/parking/availability/{area}').json()
+    statuses[1] = True
+    publish(area, statuses)
+
+    delta = client.get(f'/api/parking/availability/{area}', params={'since': first['cursor']}).json()
+    assert delta['changed_slots'] == [{'slot': 2, 'occupied': True}]
+    assert 'slot_statuses' not in delta
+    assert delta['cursor'] != first['cursor']
+
+
+def test_etag_works_as_a_since_cursor():
+    area = 'SG (EC)'
+    statuses = [False] * spaces(area)
+    publish(area, statuses)
+    etag = client.get(f'/api/parking/availability/{area}').headers['etag']
+    statuses[0] = True
+    publish(area, statuses)
+    delta = client.get(f'/api/parking/availability/{area}', params={'since': etag}).json()
+    assert delta['changed_slots'] == [{'slot': 1, 'occupied': True}]
+
+
+def test_cursor_from_another_process_gets_the_full_list():
+    area = 'Block K (WC)'
+    publish(area, [False] * spaces(area))
+    current = client.get(f'/api/parking/availability/{area}').json()
+    for since in (f"{main.SNAPSHOT_EPOCH - 1}-1", "1", "garbage", f"{main.SNAPSHOT_EPOCH}-999999"):
+        body = client.get(f'/api/parking/availability/{area}', params={'since': since}).json()
+        assert body['slot_statuses'] == current['slot_statuses']
+        assert 'changed_slots' not in body
+
+
+def test_areas_at_the_same_version_have_different_etags():
+    first, second = 'DTAR (WC)', 'Sport Complex (WC)'
+    for area in (first, second):
+        main.area_snapshots.pop(area, None)
+        publish(area, [False] * spaces(area))
+    etag = client.get(f'/api/parking/availability/{first}').headers['etag']
+    assert client.get(f'/api/parking/availability/{first}', headers={'If-None-Match': etag}).status_code == 304
+    response = client.get(f'/api/parking/availability/{second}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['etag'] != etag
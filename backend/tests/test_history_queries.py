@@ -0,0 +1,54 @@
+"""History reads reuse a per-thread read-only connection."""
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import main
+
+
+@pytest.fixture(autouse=True)
+def recorder():
+    # The writer thread starts with the server, not on import
+    main.occupancy_recorder.start()
+
+
+def wait_for_writes(written):
+    deadline = time.time() + 5
+    while main.occupancy_recorder.written < written and time.time() < deadline:
+        time.sleep(0.05)
+    assert main.occupancy_recorder.written >= written
+
+
+def test_queries_read_recorded_transitions():
+    area = f"history-{time.time()}"
+    before = main.occupancy_recorder.written
+    now = time.time()
+    main.occupancy_recorder.record(area, [True, False], now - 10)
+    main.occupancy_recorder.record(area, [False, False], now - 5)
+    wait_for_writes(before + 3)
+
+    assert main.query_area_status_at(area, now) == {
+        "1": ("available", pytest.approx(now - 5)),
+        "2": ("available", pytest.approx(now - 10)),
+    }
+    rows = main.query_transitions(area, now - 60, now, 10)
+    assert [(slot_id, status) for _, slot_id, status, _ in rows] == [
+        ("1", "occupied"), ("2", "available"), ("1", "available")]
+    buckets, slots = main.query_utilization(area, 'day', main.rollup_bucket_start(now - 60, 'day'), now + 1)
+    assert sum(row[2] for row in buckets) == 2
+    assert sorted((row[1], row[2], row[3]) for row in slots) == [("1", 2, 1), ("2", 2, 0)]
+
+
+def test_read_connection_is_reused_per_thread_and_read_only():
+    conn = main.read_database()
+    assert main.read_database() is conn
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute("DELETE FROM slot_events")
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(main.read_database()))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
@@ -0,0 +1,125 @@
+"""The vectorized occupancy engine must match the per-slot reference."""
+import numpy as np
+import pytest
+
+import main
+
+
+def reference_statuses(gray, geometry):
+    return [main.is_slot_occupied(gray, slot) for slot in geometry['slots']]
+
+
+def random_frame(rng, height, width):
+    """Noise whose local variance straddles the occupancy threshold of 300."""
+    frame = np.empty((height, width), np.uint8)
+    for y in range(0, height, 40):
+        for x in range(0, width, 40):
+            # Uniform noise of width w has variance w ** 2 / 12, so ~60 is the threshold
+            spread = int(rng.integers(0, 120))
+            base = int(rng.integers(0, 256 - spread))
+            block = frame[y:y + 40, x:x + 40]
+            block[:] = rng.integers(base, base + spread + 1, block.shape)
+    # Zero pixels are ignored by the rule
+    frame[rng.random(frame.shape) < 0.05] = 0
+    return frame
+
+
+def random_slot(rng, max_x, max_y):
+    x = int(rng.integers(-100, max_x))
+    y = int(rng.integers(-100, max_y))
+    w = int(rng.integers(1, 200))
+    h = int(rng.integers(1, 200))
+    return [(x, y), (x + w, y + int(rng.integers(-20, 20))), (x + w, y + h), (x + int(rng.integers(-20, 20)), y + h)]
+
+
+def random_layout(rng, count):
+    """Slots in base coordinates, several of them reaching past the frame edges."""
+    return [random_slot(rng, main.BASE_WIDTH, main.BASE_HEIGHT) for _ in range(count)]
+
+
+def non_overlapping_layout(rng, count):
+    """Slots on a grid of cells so no two share a pixel; edge cells hang off the frame."""
+    columns = 8
+    cell_w = main.BASE_WIDTH // (columns - 1)
+    cell_h = 110
+    slots = []
+    for idx in range(count):
+        x = (idx % columns) * cell_w - cell_w // 2
+        y = (idx // columns) * cell_h - cell_h // 3
+        w = int(rng.integers(5, cell_w - 20))
+        h = int(rng.integers(5, cell_h - 20))
+        slots.append([(x + 5, y + 5), (x + 5 + w, y + 5), (x + 5 + w, y + 5 + h), (x + 5, y + 5 + h)])
+    return slots
+
+
+def assert_same_results(gray, geometry):
+    expected = reference_statuses(gray, geometry)
+    statuses = main.compute_slot_statuses(gray, geometry)
+    assert statuses == expected
+    assert all(type(status) is bool for status in statuses)
+    if expected:
+        assert sum(statuses) / len(statuses) == sum(expected) / len(expected)
+
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('frame_size', [(960, 540), (640, 480), (1245, 807)])
+def test_vectorized_matches_reference_on_disjoint_slots(seed, frame_size):
+    rng = np.random.default_rng(seed)
+    width, height = frame_size
+    geometry = main.compile_slot_geometry(non_overlapping_layout(rng, 60), width, height)
+    assert not geometry['overlapping']
+    assert_same_results(random_frame(rng, height, width), geometry)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_vectorized_matches_reference_on_overlapping_slots(seed):
+    rng = np.random.default_rng(1000 + seed)
+    geometry = main.compile_slot_geometry(random_layout(rng, 40), 960, 540)
+    assert geometry['overlapping']
+    assert_same_results(random_frame(rng, 540, 960), geometry)
+
+
+def test_slots_partly_or_fully_off_frame():
+    rng = np.random.default_rng(7)
+    layout = [
+        [(-50, 100), (100, 100), (100, 300), (-50, 300)],  # starts left of the frame
+        [(1100, 700), (1400, 700), (1400, 900), (1100, 900)],  # runs past the bottom right
+        [(2000, 2000), (2100, 2000), (2100, 2100), (2000, 2100)],  # entirely outside
+        [(300, 300), (500, 300), (500, 500), (300, 500)],
+    ]
+    geometry = main.compile_slot_geometry(layout, 960, 540)
+    assert geometry['slots'][0]['mask'] is None
+    assert geometry['slots'][2]['mask'] is None
+    assert_same_results(random_frame(rng, 540, 960), geometry)
+
+
+def test_empty_masks_and_blank_frames():
+    layout = [
+        [(100, 100), (100, 100), (100, 100), (100, 100)],  # degenerate polygon
+        [(200, 200), (300, 200), (300, 200), (200, 200)],  # zero-height polygon
+        [(400, 100), (600, 100), (600, 300), (400, 300)],
+    ]
+    geometry = main.compile_slot_geometry(layout, 960, 540)
+    # All-zero pixels are ignored, so nothing can be occupied
+    assert_same_results(np.zeros((540, 960), np.uint8), geometry)
+    assert main.compute_slot_statuses(np.zeros((540, 960), np.uint8), geometry) == [False] * 3
+    # A flat frame has no variance
+    assert_same_results(np.full((540, 960), 128, np.uint8), geometry)
+    assert_same_results(random_frame(np.random.default_rng(3), 540, 960), geometry)
+
+
+def test_layout_without_any_visible_slot():
+    layout = [[(-300, -300), (-100, -300), (-100, -100), (-300, -100)]] * 3
+    geometry = main.compile_slot_geometry(layout, 960, 540)
+    assert geometry['labels'] is None
+    assert_same_results(random_frame(np.random.default_rng(5), 540, 960), geometry)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_analyze_parking_matches_reference(monkeypatch, seed):
+    rng = np.random.default_rng(2000 + seed)
+    layout = non_overlapping_layout(rng, 40) if seed % 2 else random_layout(rng, 40)
+    area = f"test-area-{seed}"
+    monkeypatch.setattr(main, 'get_parking_spaces_for_area', lambda name: layout)
+    frame = np.stack([random_frame(rng, 540, 960)] * 3, axis=2)
+    assert main.analyze_parking(frame, area) == main.analyze_parking_reference(frame, area)
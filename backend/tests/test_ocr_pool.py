@@ -0,0 +1,82 @@
+"""PlateOcrPool routing and restart rules, without starting worker processes."""
+import asyncio
+import time
+
+import pytest
+
+import main
+import plate_ocr
+
+
+class FakeExecutor:
+    def __init__(self):
+        self.shut_down = False
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def warmed_pool(workers=1):
+    pool = main.PlateOcrPool(workers=workers)
+    pool.state = "ready"
+    pool.timings = {"started_at": time.time(), "finished_at": time.time()}
+    pool.ready_event.set()
+    for worker in pool.workers:
+        worker.executor = FakeExecutor()
+        worker.ready = True
+    return pool
+
+
+def test_jobs_fail_fast_while_no_worker_is_ready():
+    pool = warmed_pool()
+    pool.workers[0].ready = False
+    pool.workers[0].warming = True
+    with pytest.raises(main.OcrPoolNotReady):
+        asyncio.run(pool.run(plate_ocr.warm_up))
+    assert pool.jobs == 0
+
+
+def test_jobs_go_to_the_least_busy_ready_worker():
+    pool = warmed_pool(workers=3)
+    pool.workers[0].in_flight = 2
+    pool.workers[1].ready = False
+    pool.workers[1].warming = True
+    assert pool._pick_worker() is pool.workers[2]
+
+
+def test_warming_worker_is_not_restarted():
+    pool = warmed_pool()
+    worker = pool.workers[0]
+    worker.ready = False
+    worker.warming = True
+    executor = worker.executor
+    pool._restart(worker, executor)
+    assert worker.executor is executor
+    assert not executor.shut_down
+    assert pool.restarts == 0
+
+
+def test_pool_reports_loading_while_its_only_worker_reloads():
+    pool = warmed_pool()
+    worker = pool.workers[0]
+    pool._restart(worker, worker.executor, warm_up=False)
+    assert pool.restarts == 1
+    with pool.lock:
+        worker.warming = True
+        pool._refresh_state()
+    assert pool.state == "loading"
+    assert not pool.ready_event.is_set()
+    with pool.lock:
+        worker.warming = False
+        worker.ready = True
+        pool._refresh_state()
+    assert pool.state == "ready"
+    assert pool.ready_event.is_set()
+
+
+def test_pool_stays_ready_while_another_worker_is_ready():
+    pool = warmed_pool(workers=2)
+    pool._restart(pool.workers[0], pool.workers[0].executor, warm_up=False)
+    with pool.lock:
+        pool._refresh_state()
+    assert pool.state == "ready"
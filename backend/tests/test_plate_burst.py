@@ -0,0 +1,96 @@
+"""Burst plate voting: one vote per frame, regions voted on separately."""
+import numpy as np
+import pytest
+
+import plate_ocr
+
+FRAMES = 5
+REGION_A = (20, 20, 120, 40)
+REGION_B = (220, 20, 120, 40)
+
+
+def burst_frames():
+    """Frames whose left half (region A) and right half (region B) encode the frame index."""
+    frames = []
+    for index in range(FRAMES):
+        frame = np.zeros((120, 400, 3), np.uint8)
+        frame[:, :200] = 10 + index
+        frame[:, 200:] = 100 + index
+        frames.append(frame)
+    return frames
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    """Install a reader whose output is looked up by (region, frame, variant)."""
+    table = {}
+    calls = []
+
+    def read_text_batch(images):
+        results = []
+        for image, name in images:
+            value = int(image[0, 0, 0])
+            region, frame_index = ('A', value - 10) if value < 100 else ('B', value - 100)
+            calls.append((region, frame_index, name))
+            read = table.get((region, frame_index, name))
+            results.append([(None, read[0], read[1])] if read else [])
+        return results
+
+    monkeypatch.setattr(plate_ocr, 'easyocr_reader', object())
+    monkeypatch.setattr(plate_ocr, 'locate_plate_candidates', lambda gray: [REGION_A, REGION_B])
+    monkeypatch.setattr(plate_ocr, 'preprocess_variant', lambda image, name, gray=None: (image, name))
+    monkeypatch.setattr(plate_ocr, 'read_text_batch', read_text_batch)
+    return table, calls
+
+
+def test_reads_from_different_regions_are_not_mixed(fake_ocr):
+    table, _ = fake_ocr
+    # Pooled character by character these same-length reads would give
+    # "ABC5674", which no frame read
+    table[('A', 0, 'original')] = ('ABC1234', 0.9)
+    table[('A', 1, 'original')] = ('ABC1234', 0.9)
+    table[('B', 2, 'original')] = ('XYZ5678', 0.7)
+    table[('B', 3, 'original')] = ('XYZ5678', 0.7)
+    table[('B', 4, 'original')] = ('ABC5679', 0.7)
+    result = plate_ocr.detect_car_plate_burst(burst_frames())
+    assert result['plate_number'] == 'ABC 1234'
+    assert result['reads'] == FRAMES
+    assert [hit for _, _, hit in result['variants']] == [True]
+
+
+def test_one_frame_read_by_several_variants_is_one_vote(fake_ocr):
+    table, _ = fake_ocr
+    for name in plate_ocr.PLATE_VARIANTS:
+        table[('A', 0, name)] = ('ABC1234', 0.9)
+    result = plate_ocr.detect_car_plate_burst(burst_frames())
+    # The read is still returned, but one frame never counts as frames agreeing
+    assert result['plate_number'] == 'ABC 1234'
+    assert result['reads'] == 1
+    assert len(result['variants']) == len(plate_ocr.PLATE_VARIANTS)
+    assert not any(hit for _, _, hit in result['variants'])
+
+
+def test_each_frame_keeps_its_most_confident_read(fake_ocr):
+    table, _ = fake_ocr
+    table[('A', 0, 'original')] = ('ABC1284', 0.3)
+    table[('A', 0, 'grayscale')] = ('ABC1234', 0.9)
+    table[('A', 1, 'grayscale')] = ('ABC1234', 0.8)
+    result = plate_ocr.detect_car_plate_burst(burst_frames(), variant_order=['original', 'grayscale'])
+    assert result['plate_number'] == 'ABC 1234'
+    assert result['reads'] == 2
+    assert [hit for _, _, hit in result['variants']] == [False, True]
+
+
+def test_vote_plate_counts_agreeing_frames():
+    plate, confidence, agreeing = plate_ocr.vote_plate([('ABC1234', 0.9), ('ABC1234', 0.8), ('ABC1284', 0.4)])
+    assert (plate, agreeing) == ('ABC1234', 2)
+    assert 0 < confidence < 0.9
+    assert plate_ocr.vote_plate([]) is None
+
+
+def test_no_consensus_reports_the_reads_made(fake_ocr):
+    result = plate_ocr.detect_car_plate_burst(burst_frames())
+    assert result['plate_number'] is None
+    assert result['reads'] == 0
+    # Every variant ran on both regions, then on the whole frames
+    assert len(result['variants']) == 2 * len(plate_ocr.PLATE_VARIANTS)
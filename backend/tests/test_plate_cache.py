@@ -0,0 +1,92 @@
+"""Plate result cache keyed by perceptual hashes of plate regions."""
+import cv2
+import numpy as np
+import pytest
+
+import main
+import plate_ocr
+
+
+def scene(plate_text, seed=0):
+    """A textured car park scene with one white plate in the middle."""
+    rng = np.random.default_rng(seed)
+    frame = cv2.GaussianBlur(rng.integers(60, 120, (620, 1280, 3), dtype=np.uint8), (15, 15), 0)
+    cv2.rectangle(frame, (500, 400), (780, 470), (235, 235, 235), -1)
+    cv2.putText(frame, plate_text, (512, 452), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (20, 20, 20), 5)
+    return frame
+
+
+def with_noise(frame, seed):
+    noise = np.random.default_rng(seed).integers(-4, 5, frame.shape)
+    return np.clip(frame.astype(int) + noise, 0, 255).astype(np.uint8)
+
+
+def plate_hash(frame):
+    hashes = plate_ocr.plate_region_hashes(frame)
+    # The located region containing the plate
+    boxes = [box for box in hashes if box[0] < 640 < box[0] + box[2] and box[1] < 435 < box[1] + box[3]]
+    assert boxes, hashes
+    return hashes[boxes[0]]
+
+
+def test_same_plate_in_a_new_frame_stays_within_the_distance():
+    frame = scene("ABC 1234")
+    assert (plate_hash(frame) ^ plate_hash(with_noise(frame, 1))).bit_count() <= main.PLATE_CACHE_MAX_DISTANCE
+
+
+def test_brightness_change_stays_within_the_distance():
+    frame = scene("ABC 1234")
+    darker = (frame * 0.8).astype(np.uint8)
+    assert (plate_hash(frame) ^ plate_hash(darker)).bit_count() <= main.PLATE_CACHE_MAX_DISTANCE
+
+
+@pytest.mark.parametrize("other", ["WXY 9876", "QRS 5555", "BCA 4321", "ABD 1234", "ABC 1235"])
+def test_different_plate_in_the_same_spot_is_not_a_match(other):
+    assert (plate_hash(scene("ABC 1234")) ^ plate_hash(scene(other))).bit_count() > main.PLATE_CACHE_MAX_DISTANCE
+
+
+def test_lookup_matches_any_candidate_region():
+    cache = main.PlateResultCache()
+    cache.store(0b1011, "ABC 1234")
+    assert cache.lookup([1 << 60, 0b1011 ^ 0b1111]) == "ABC 1234"
+    assert cache.lookup([0b1011 ^ 0b11111]) is None
+    assert cache.lookup([]) is None
+    assert cache.status()["hits"] == 1
+    assert cache.status()["misses"] == 2
+
+
+def test_entries_expire_and_capacity_is_bounded(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(main.time, 'time', lambda: now[0])
+    cache = main.PlateResultCache(max_entries=2, ttl=10.0)
+    cache.store(0xFF, "AAA 1")
+    cache.store(0xFF00, "BBB 2")
+    cache.store(0xFF0000, "CCC 3")
+    assert cache.lookup([0xFF]) is None
+    assert cache.lookup([0xFF0000]) == "CCC 3"
+    now[0] += 11
+    assert cache.lookup([0xFF0000]) is None
+    assert cache.status()["entries"] == 0
+    assert cache.status()["evictions"] == 3
+
+
+@pytest.mark.parametrize("mode", ["single", "burst"])
+def test_detection_reports_the_region_it_read(monkeypatch, mode):
+    monkeypatch.setattr(plate_ocr, 'easyocr_reader', object())
+    monkeypatch.setattr(plate_ocr, 'locate_plate_candidates', lambda gray: [(10, 10, 100, 30), (500, 400, 280, 70)])
+
+    def readtext(image):
+        # Only the second (wider) region holds text
+        return [(None, 'ABC1234', 0.9)] if image.shape[1] > 350 else []
+
+    monkeypatch.setattr(plate_ocr, 'read_plate_candidates',
+                        lambda images: [('ABC1234', 0.9, images[0][0], 'ABC1234')
+                                        for _, image in images if readtext(image)])
+    monkeypatch.setattr(plate_ocr, 'read_text_batch', lambda images: [readtext(image) for image in images])
+    frame = scene("ABC 1234")
+    if mode == "single":
+        result = plate_ocr.detect_car_plate(frame)
+    else:
+        result = plate_ocr.detect_car_plate_burst([frame, frame])
+    assert result["plate_number"] == "ABC 1234"
+    assert result["region"] == (500, 400, 280, 70)
@@ -0,0 +1,53 @@
+"""QRDecoder falls back to OpenCV when ZBar misses a code."""
+import cv2
+import numpy as np
+import pytest
+
+import main
+
+
+def qr_frame(text, size=1280):
+    code = cv2.QRCodeEncoder.create().encode(text)
+    code = cv2.resize(code, None, fx=8, fy=8, interpolation=cv2.INTER_NEAREST)
+    frame = np.full((size * 9 // 16, size, 3), 255, np.uint8)
+    y = (frame.shape[0] - code.shape[0]) // 2
+    x = (frame.shape[1] - code.shape[1]) // 2
+    frame[y:y + code.shape[0], x:x + code.shape[1]] = code[..., None]
+    return frame
+
+
+@pytest.fixture
+def zbar_misses(monkeypatch):
+    calls = []
+
+    def decode(image):
+        calls.append(image.shape)
+        return []
+
+    monkeypatch.setattr(main, 'ZBAR_AVAILABLE', True)
+    monkeypatch.setattr(main, 'ZBAR_DECODE', decode)
+    return calls
+
+
+def test_opencv_decodes_what_zbar_misses(zbar_misses):
+    decoder = main.QRDecoder()
+    qr_data, points = decoder.decode(qr_frame('VST-0001'))
+    assert qr_data == 'VST-0001'
+    assert points.shape == (4, 2)
+    # Every pyramid level went through ZBar before OpenCV ran on the finest one
+    assert len(zbar_misses) >= 2
+
+
+def test_tracked_roi_also_falls_back_to_opencv(zbar_misses):
+    decoder = main.QRDecoder()
+    frame = qr_frame('VST-0002')
+    decoder.decode(frame)
+    assert decoder.roi is not None
+    assert decoder.decode(frame)[0] == 'VST-0002'
+    assert decoder.status()['roi_hits'] == 1
+
+
+def test_blank_frame_is_a_miss(zbar_misses):
+    decoder = main.QRDecoder()
+    assert decoder.decode(np.full((720, 1280, 3), 255, np.uint8)) == (None, None)
+    assert decoder.status()['misses'] == 1
@@ -0,0 +1,106 @@
+"""Spot holds: reserving, expiry, cancelling and their effect on availability."""
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+client = TestClient(main.app)
+AREA = 'Demo'
+
+
+def hold_spot(user_id):
+    statuses = [False] * len(main.get_parking_spaces_for_area(AREA))
+    hold, _ = main.reservations.reserve(AREA, statuses, user_id, None)
+    return hold
+
+
+def test_cancel_by_user_id_releases_the_hold():
+    hold = hold_spot('student-1')
+    response = client.post('/api/parking/cancel', json={'area': AREA, 'user_id': 'student-1'})
+    assert response.status_code == 200
+    body = response.json()
+    assert body['success'] is True
+    assert body['released'] == [{'booking_id': hold.booking_id, 'spot_no': hold.spot}]
+    assert hold.spot not in main.reservations.held_spots(AREA)
+
+
+def test_cancel_by_booking_id_releases_only_that_hold():
+    first = hold_spot('student-2')
+    second = hold_spot('student-3')
+    body = client.post('/api/parking/cancel', json={'area': AREA, 'booking_id': first.booking_id}).json()
+    assert [released['booking_id'] for released in body['released']] == [first.booking_id]
+    assert second.spot in main.reservations.held_spots(AREA)
+    main.reservations.cancel(AREA, booking_id=second.booking_id)
+
+
+def test_cancel_without_an_identifier_is_rejected():
+    hold = hold_spot('student-4')
+    response = client.post('/api/parking/cancel', json={'area': AREA, 'user_id': '  '})
+    assert response.status_code == 400
+    assert response.json()['success'] is False
+    assert hold.spot in main.reservations.held_spots(AREA)
+    main.reservations.cancel(AREA, booking_id=hold.booking_id)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    path = str(tmp_path / 'holds.db')
+    main.init_database(path)
+    return main.ReservationEngine(path)
+
+
+def test_concurrent_reserves_never_share_a_spot(engine):
+    statuses = [False] * 6
+    start = threading.Barrier(12)
+    holds = []
+
+    def reserve(user_id):
+        start.wait()
+        holds.append(engine.reserve('Lot', statuses, user_id)[0])
+
+    threads = [threading.Thread(target=reserve, args=(f'student-{i}',)) for i in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    spots = [hold.spot for hold in holds if hold is not None]
+    assert sorted(spots) == ['1', '2', '3', '4', '5', '6']
+    assert holds.count(None) == 6
+
+
+def test_expired_holds_free_their_spot(engine):
+    engine.hold_seconds = 0.05
+    hold, free = engine.reserve('Lot', [False, True], 'student-1')
+    assert (hold.spot, free) == ('1', 0)
+    assert engine.reserve('Lot', [False, True], 'student-2') == (None, 0)
+    time.sleep(0.1)
+    assert engine.held_spots('Lot') == set()
+    status = engine._conn().execute('SELECT status FROM bookings WHERE id = ?', (hold.booking_id,)).fetchone()
+    assert status == ('expired',)
+    assert engine.reserve('Lot', [False, True], 'student-2')[0].spot == '1'
+
+
+def test_availability_does_not_offer_held_spots(monkeypatch):
+    statuses = [False] * len(main.get_parking_spaces_for_area(AREA))
+    main.publish_area_snapshot(AREA, statuses)
+    before = client.get(f'/api/parking/availability/{AREA}')
+    offered = before.json()['assigned_spot_no']
+
+    reserved = client.post('/api/parking/reserve', json={
+        'area': AREA, 'user_id': 'student-5', 'spot_number': offered}).json()
+    assert reserved['assigned_spot_no'] == offered
+
+    after = client.get(f'/api/parking/availability/{AREA}', headers={'If-None-Match': before.headers['etag']})
+    assert after.status_code == 200
+    body = after.json()
+    assert body['assigned_spot_no'] != offered
+    assert body['available'] == body['empty'] == before.json()['available'] - 1
+    assert int(offered) in body['held_slots']
+    batch = client.get('/api/parking/availability', params={'areas': AREA}).json()
+    assert batch['areas'][AREA]['available'] == body['available']
+
+    client.post('/api/parking/cancel', json={'area': AREA, 'user_id': 'student-5'})
+    assert client.get(f'/api/parking/availability/{AREA}').json()['assigned_spot_no'] == offered
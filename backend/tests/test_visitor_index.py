@@ -0,0 +1,192 @@
+"""Visitor QR resolution through VisitorReservationIndex with a local Firestore fake."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import main
+
+
+class FakeReference:
+    def __init__(self, store, doc_id):
+        self.store = store
+        self.id = doc_id
+
+    def update(self, data):
+        self.store.update(self.id, data)
+
+
+class FakeSnapshot:
+    def __init__(self, store, doc_id):
+        self.id = doc_id
+        self.reference = FakeReference(store, doc_id)
+        self._data = dict(store.docs[doc_id])
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeQuery:
+    def __init__(self, store, filters=(), limit=None):
+        self.store = store
+        self.filters = tuple(filters)
+        self.limit_count = limit
+
+    def where(self, field, op, value):
+        assert op == '=='
+        return FakeQuery(self.store, self.filters + ((field, value),), self.limit_count)
+
+    def limit(self, count):
+        return FakeQuery(self.store, self.filters, count)
+
+    def select(self, fields):
+        self.store.projections.append(tuple(fields))
+        return self
+
+    def matches(self, doc_id):
+        return all(self.store.docs[doc_id].get(field) == value for field, value in self.filters)
+
+    def get(self):
+        self.store.reads.append(self.filters)
+        docs = [FakeSnapshot(self.store, doc_id) for doc_id in self.store.docs if self.matches(doc_id)]
+        return docs[:self.limit_count] if self.limit_count else docs
+
+    def on_snapshot(self, callback):
+        matching = [doc_id for doc_id in self.store.docs if self.matches(doc_id)]
+        self.store.listeners.append((self, callback, set(matching)))
+        callback(None, [self.store.change('ADDED', doc_id) for doc_id in matching], None)
+        return SimpleNamespace(unsubscribe=lambda: None)
+
+
+class FakeFirestore:
+    """Just enough of the Firestore client for one collection and its listeners."""
+
+    def __init__(self, docs):
+        self.docs = {doc_id: dict(data) for doc_id, data in docs.items()}
+        self.listeners = []
+        self.reads = []
+        self.projections = []
+
+    def collection(self, name):
+        assert name == 'visitorReservation'
+        return FakeQuery(self)
+
+    def change(self, kind, doc_id):
+        return SimpleNamespace(type=SimpleNamespace(name=kind), document=FakeSnapshot(self, doc_id))
+
+    def update(self, doc_id, data):
+        self.docs[doc_id].update(data)
+        self.notify(doc_id)
+
+    def add(self, doc_id, data):
+        self.docs[doc_id] = dict(data)
+        self.notify(doc_id)
+
+    def notify(self, doc_id):
+        for query, callback, members in self.listeners:
+            if query.matches(doc_id):
+                kind = 'MODIFIED' if doc_id in members else 'ADDED'
+                members.add(doc_id)
+            elif doc_id in members:
+                kind = 'REMOVED'
+                members.discard(doc_id)
+            else:
+                continue
+            callback(None, [self.change(kind, doc_id)], None)
+
+
+@pytest.fixture
+def firestore():
+    return FakeFirestore({
+        'upcoming': {'vstQR': 'QR-1', 'vstRsvtID': 'RSVT-1', 'vstStatus': 'Up Coming'},
+        'finished': {'vstQR': 'QR-2', 'vstRsvtID': 'RSVT-2', 'vstStatus': 'History',
+                     'startTime': 1, 'endTime': 2},
+    })
+
+
+@pytest.fixture
+def index(firestore):
+    index = main.VisitorReservationIndex(firestore)
+    index.sync()
+    index.watch = firestore.collection('visitorReservation').where(
+        'vstStatus', '==', 'Up Coming').on_snapshot(index._on_snapshot)
+    firestore.reads.clear()
+    return index
+
+
+def scan(code, index):
+    return asyncio.run(main.process_visitor_qr(code, index=index))
+
+
+def test_index_holds_upcoming_reservations_by_both_codes(index):
+    assert index.lookup('QR-1').id == 'upcoming'
+    assert index.lookup('RSVT-1').id == 'upcoming'
+    assert index.lookup('QR-2') is None
+    assert index.status()['reservations'] == 1
+
+
+def test_upcoming_visitor_scans_resolve_without_queries(firestore, index):
+    assert scan('QR-1', index)['scan_type'] == 'first'
+    assert 'startTime' in firestore.docs['upcoming']
+    assert scan('RSVT-1', index)['scan_type'] == 'second'
+    assert firestore.docs['upcoming']['vstStatus'] == 'History'
+    assert firestore.reads == []
+    # The listener removed the finished reservation from the index
+    assert index.lookup('QR-1') is None
+
+
+def test_finished_reservation_is_still_acknowledged(firestore, index):
+    result = scan('QR-2', index)
+    assert result['success'] is True
+    assert result['scan_type'] == 'already_scanned'
+    assert firestore.reads == [(('vstQR', 'QR-2'),)]
+
+
+def test_rescanning_after_car_out_is_acknowledged(index):
+    scan('QR-1', index)
+    scan('QR-1', index)
+    result = scan('QR-1', index)
+    assert result['success'] is True
+    assert result['scan_type'] == 'already_scanned'
+
+
+def test_index_knows_the_codes_of_every_reservation(firestore, index):
+    assert firestore.projections == [('vstQR', 'vstRsvtID')]
+    assert index.known_codes == {'QR-1', 'RSVT-1', 'QR-2', 'RSVT-2'}
+    assert index.status()['known_codes'] == 4
+
+
+def test_unknown_code_is_rejected_without_queries(firestore, index):
+    result = scan('NOPE', index)
+    assert result['success'] is False
+    assert 'not found' in result['message']
+    assert firestore.reads == []
+    assert index.status()['rejected'] == 1
+
+
+def test_stale_index_falls_back_to_firestore(firestore, index):
+    index.last_sync -= main.VISITOR_INDEX_MAX_AGE + 1
+    result = scan('NOPE', index)
+    assert result['success'] is False
+    assert firestore.reads == [(('vstQR', 'NOPE'),), (('vstRsvtID', 'NOPE'),)]
+
+
+def test_listener_picks_up_new_reservations(firestore, index):
+    firestore.add('later', {'vstQR': 'QR-3', 'vstRsvtID': 'RSVT-3', 'vstStatus': 'Up Coming'})
+    assert index.lookup('RSVT-3').id == 'later'
+    assert 'QR-3' in index.known_codes
+    assert scan('QR-3', index)['scan_type'] == 'first'
+    assert firestore.reads == []
+
+
+def test_start_attaches_the_listener(firestore):
+    index = main.VisitorReservationIndex(firestore)
+    index.start()
+    assert index.watch is not None
+    assert index.lookup('QR-1').id == 'upcoming'
+
+
+def test_without_a_client_scans_report_firebase_disabled():
+    index = main.VisitorReservationIndex(None)
+    index.start()
+    assert scan('QR-1', index)['success'] is False
@@ -508,6 +508,7 @@ class _ParkingDisplayPageState extends State<ParkingDisplayPage> {
   bool isLoading = true;
   bool isReserving = false;
   int? assignedSpotNumber;
+  int? _bookingId;  // Hold returned by the backend reserve call
   final FirebaseFirestore _firestore = FirebaseFirestore.instance;
   final Random _random = Random();
 
@@ -718,12 +719,15 @@ class _ParkingDisplayPageState extends State<ParkingDisplayPage> {
         body: json.encode({
           'area': widget.selectedArea,
           'spot_number': assignedSpotNumber?.toString() ?? '',  // Pass the displayed spot number
+          'user_id': widget.studentId,  // Repeat reserves by the same student keep one hold
         }),
       );
       
       if (response.statusCode == 200) {
         final data = json.decode(response.body);
         if (data['success']) {
+          _bookingId = data['booking_id'] as int?;
+          
           // Get assigned spot number from backend
           // Use the spot number from backend response, or keep the one already displayed
           final assignedSpotNo = data['assigned_spot_no']?.toString();
@@ -841,9 +845,13 @@ class _ParkingDisplayPageState extends State<ParkingDisplayPage> {
     try {
       // Cancel reservation on backend
       final response = await http.post(
-        Uri.parse('http://localhost:5000/api/parking/cancel'),
+        Uri.parse('$_backendUrl/api/parking/cancel'),
         headers: {'Content-Type': 'application/json'},
-        body: json.encode({'area': widget.selectedArea}),
+        body: json.encode({
+          'area': widget.selectedArea,
+          'user_id': widget.studentId,
+          if (_bookingId != null) 'booking_id': _bookingId,
+        }),
       );
       
       if (response.statusCode == 200) {